@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+O fluxo de eventos em tempo real (/api/eventos/) só funciona neste modo:
+    uvicorn dividendos_planner.asgi:application --workers 2
 """
 
 import os
@@ -3,7 +3,10 @@ Configuração do Django Admin para facilitar testes e gerenciamento.
 """
 
 from django.contrib import admin
-from .models import Ativo, HistoricoDividendo, MetaRenda, Simulacao
+from .models import (
+    Ativo, EventoDividendo, HistoricoDividendo, MetaRenda, Simulacao, PerfilRequisicao, TickerCatalogo, Tarefa,
+    PainelUsuario, IndicadorTicker, EventoCorporativo
+)
 
 
 # Configuração do Django Admin para Ativo.
@@ -38,3 +41,61 @@ class SimulacaoAdmin(admin.ModelAdmin):
     list_filter = ['data_execucao', 'meta_renda']
     search_fields = ['meta_renda__nome']
 
+
+
+# Configuração do Django Admin para TickerCatalogo.
+@admin.register(TickerCatalogo)
+class TickerCatalogoAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'nome', 'setor', 'tipo', 'data_atualizacao']
+    list_filter = ['tipo', 'setor']
+    search_fields = ['ticker', 'nome']
+
+
+# Configuração do Django Admin para EventoDividendo.
+@admin.register(EventoDividendo)
+class EventoDividendoAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'data_pagamento', 'valor_por_acao', 'data_criacao']
+    list_filter = ['data_pagamento']
+    search_fields = ['ticker']
+
+
+# Configuração do Django Admin para EventoCorporativo.
+@admin.register(EventoCorporativo)
+class EventoCorporativoAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'data', 'tipo', 'fator', 'fator_acumulado', 'descricao']
+    list_filter = ['tipo']
+    search_fields = ['ticker']
+    readonly_fields = ['fator_acumulado']
+
+
+# Configuração do Django Admin para IndicadorTicker.
+@admin.register(IndicadorTicker)
+class IndicadorTickerAdmin(admin.ModelAdmin):
+    list_display = ['ticker', 'ano_referencia', 'data_calculo']
+    search_fields = ['ticker']
+    readonly_fields = ['dados', 'ano_referencia']
+
+
+# Configuração do Django Admin para PerfilRequisicao.
+@admin.register(PerfilRequisicao)
+class PerfilRequisicaoAdmin(admin.ModelAdmin):
+    list_display = ['metodo', 'caminho', 'status_code', 'duracao_ms', 'motivo', 'usuario', 'data_criacao']
+    list_filter = ['motivo', 'metodo', 'data_criacao']
+    search_fields = ['caminho']
+    exclude = ['estatisticas']
+    readonly_fields = ['metodo', 'caminho', 'status_code', 'duracao_ms', 'usuario', 'motivo', 'resumo', 'consultas_sql']
+
+
+# Configuração do Django Admin para Tarefa.
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ['tipo', 'status', 'progresso', 'usuario', 'worker', 'tentativas', 'data_criacao', 'data_conclusao']
+    list_filter = ['status', 'tipo', 'data_criacao']
+    readonly_fields = ['resultado', 'erro', 'worker', 'expira_em', 'data_inicio', 'data_conclusao']
+
+
+# Configuração do Django Admin para PainelUsuario.
+@admin.register(PainelUsuario)
+class PainelUsuarioAdmin(admin.ModelAdmin):
+    list_display = ['usuario', 'carteira_pendente', 'metas_pendente', 'data_referencia', 'data_atualizacao']
+    readonly_fields = ['dados', 'versao', 'data_referencia']
@@ -0,0 +1,56 @@
+"""
+Eventos corporativos (desdobramentos, grupamentos e bonificações) e fatores de ajuste por ticker.
+
+Sem ajuste, a série de dividendos por ação salta em cada evento (um desdobramento 1:2 parece um corte
+de 50% nos dividendos), corrompendo yield e crescimento. Os eventos vêm de stockDividends da Brapi e
+ficam em EventoCorporativo; a cada alteração o fator acumulado (produto dos fatores do evento e dos
+posteriores) é recalculado uma vez e gravado também na série colunar 'eventos' (planner.series).
+Na leitura, cada valor é dividido pelo fator do primeiro evento com data >= a sua data (busca binária),
+sem recalcular produtos por consulta; nos dividendos, a data comparada é a data com, quando conhecida.
+"""
+
+from decimal import Decimal
+from typing import Dict, List
+
+from django.db import transaction
+
+from . import series
+from .models import EventoCorporativo
+
+
+# Grava os eventos extraídos por BrapiService.get_stock_events (os já existentes são ignorados)
+# e recalcula os fatores do ticker. Retorna a quantidade de eventos novos.
+def gravar_eventos_corporativos(ticker: str, eventos: List[Dict]) -> int:
+    ticker = ticker.upper().strip()
+    with transaction.atomic():
+        antes = EventoCorporativo.objects.filter(ticker=ticker).count()
+        EventoCorporativo.objects.bulk_create([
+            EventoCorporativo(
+                ticker=ticker, data=evento['data'], tipo=evento['tipo'],
+                fator=evento['fator'], descricao=evento.get('descricao', '')
+            ) for evento in eventos
+        ], ignore_conflicts=True)
+        novos = EventoCorporativo.objects.filter(ticker=ticker).count() - antes
+        recalcular_fatores(ticker)
+    return novos
+
+# e regrava a série 'eventos' depois do commit.
+# Recalcula o fator acumulado de cada evento do ticker (do mais recente para o mais antigo)
+# e regrava a série 'eventos'.
+def recalcular_fatores(ticker: str) -> None:
+    eventos = list(EventoCorporativo.objects.filter(ticker=ticker).order_by('-data', '-id'))
+    acumulado = Decimal('1')
+    for evento in eventos:
+        acumulado *= evento.fator
+        evento.fator_acumulado = acumulado.quantize(Decimal('0.000000000001'))
+    EventoCorporativo.objects.bulk_update(eventos, ['fator_acumulado'])
+    series.gravar_apos_commit(series.gravar_eventos, ticker)
+
+
+# Receptor de post_save/post_delete de EventoCorporativo (conectado em apps.ready): edições manuais
+# (ex: admin) recalculam os fatores e descartam os indicadores em cache do ticker.
+def ao_alterar_evento_corporativo(sender, instance, **kwargs):
+    from .indicadores import invalidar
+
+    recalcular_fatores(instance.ticker)
+    invalidar([instance.ticker])
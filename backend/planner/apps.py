@@ -1,4 +1,6 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class PlannerConfig(AppConfig):
@@ -6,3 +8,35 @@ class PlannerConfig(AppConfig):
     name = 'planner'
     verbose_name = 'Planejador de Dividendos'
 
+    def ready(self):
+        from .db import configurar_conexao_sqlite
+        from .busca import instalar_indices_busca
+        connection_created.connect(configurar_conexao_sqlite, dispatch_uid='planner_sqlite_wal')
+        post_migrate.connect(instalar_indices_busca, sender=self, dispatch_uid='planner_indices_busca')
+
+        # Painel pré-calculado: alterações marcam a seção afetada como pendente
+        from . import painel
+        from .models import Ativo, HistoricoDividendo, MetaRenda, Simulacao
+        for modelo, receptor in (
+            (Ativo, painel.ao_alterar_ativo),
+            (HistoricoDividendo, painel.ao_alterar_dividendo),
+            (MetaRenda, painel.ao_alterar_meta),
+            (Simulacao, painel.ao_alterar_simulacao),
+        ):
+            for sinal in (post_save, post_delete):
+                sinal.connect(receptor, sender=modelo, dispatch_uid=f'planner_painel_{modelo.__name__}_{id(sinal)}')
+
+        # Eventos compartilhados editados fora da importação: série colunar e indicadores do ticker
+        from . import ajustes, indicadores
+        from .models import EventoCorporativo, EventoDividendo
+        for sinal in (post_save, post_delete):
+            sinal.connect(indicadores.ao_alterar_evento, sender=EventoDividendo,
+                          dispatch_uid=f'planner_indicadores_evento_{id(sinal)}')
+            sinal.connect(ajustes.ao_alterar_evento_corporativo, sender=EventoCorporativo,
+                          dispatch_uid=f'planner_ajustes_evento_{id(sinal)}')
+
+        # Registro de exclusões da sincronização incremental (?since= nas listagens)
+        from . import sincronizacao
+        for modelo in (Ativo, HistoricoDividendo, MetaRenda, Simulacao, EventoDividendo):
+            post_delete.connect(sincronizacao.ao_excluir, sender=modelo,
+                                dispatch_uid=f'planner_sincronizacao_{modelo.__name__}')
@@ -0,0 +1,204 @@
+"""
+Backtest histórico de uma meta com reinvestimento de dividendos (DRIP).
+
+Reproduz, mês a mês, aportes mensais distribuídos entre os ativos escolhidos, comprados pelo
+preço de fechamento guardado nas séries colunares (planner.series), e os dividendos realmente
+pagos (histórico consolidado do usuário), ambos ajustados por eventos corporativos (a quantidade
+de cotas fica na base de ações atual), dos quais percentual_reinvestimento da meta é recomprado
+no próprio ativo e o restante é sacado como renda. Roda só sobre dados locais, sem chamar a Brapi.
+
+Todos os ativos e meses são calculados em uma única passada vetorizada: com g = 1 + r * D / P
+(reinvestimento) e b = aporte * peso / P (compra mensal), as cotas seguem s[m] = g[m] * s[m-1] + b[m],
+cuja solução fechada é s = G * cumsum(b / G), com G = cumprod(g) ao longo dos meses.
+"""
+
+import math
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.utils import timezone
+
+from . import series
+from .dividendos import arrays_consolidados
+from .models import Ativo, Simulacao
+
+
+# Chave composta (ativo, dia) para buscar preços de todos os ativos com um único searchsorted.
+_DESLOCAMENTO = np.int64(1) << 32
+
+
+# Erro de parâmetros do backtest (mensagem exibida ao usuário).
+class BacktestErro(ValueError):
+    pass
+
+
+# Converte o corpo da requisição (ou os parâmetros de uma tarefa) nos argumentos de executar_backtest.
+def parametros_backtest(dados: Dict) -> Dict:
+    ativos_ids = dados.get('ativos_ids') or None
+    if ativos_ids is not None and (not isinstance(ativos_ids, list) or not all(
+        (isinstance(i, int) and not isinstance(i, bool)) or (isinstance(i, str) and i.strip().isdigit()) for i in ativos_ids
+    )):
+        raise BacktestErro('ativos_ids deve ser uma lista de ids de ativos.')
+    parametros = {'ativos_ids': [int(i) for i in ativos_ids] if ativos_ids else None}
+
+    aporte = dados.get('aporte_mensal')
+    try:
+        parametros['aporte_mensal'] = Decimal(str(aporte)) if aporte not in (None, '') else None
+    except (InvalidOperation, ValueError):
+        raise BacktestErro('aporte_mensal inválido.')
+    # Decimal aceita "NaN" e "Infinity", que quebrariam as comparações seguintes
+    if parametros['aporte_mensal'] is not None and not parametros['aporte_mensal'].is_finite():
+        raise BacktestErro('aporte_mensal inválido.')
+
+    for nome in ('data_inicio', 'data_fim'):
+        try:
+            parametros[nome] = datetime.strptime(dados[nome], '%Y-%m-%d').date() if dados.get(nome) else None
+        except (TypeError, ValueError):
+            raise BacktestErro(f'{nome} deve estar no formato AAAA-MM-DD.')
+
+    pesos = dados.get('pesos')
+    if pesos is not None and not isinstance(pesos, dict):
+        raise BacktestErro('pesos deve ser um objeto {ticker: peso}.')
+    try:
+        parametros['pesos'] = {str(t).upper(): float(p) for t, p in pesos.items()} if pesos else None
+    except (TypeError, ValueError):
+        raise BacktestErro('Os pesos devem ser números.')
+    if parametros['pesos'] and not all(math.isfinite(p) for p in parametros['pesos'].values()):
+        raise BacktestErro('Os pesos devem ser números.')
+    return parametros
+
+
+# Cotas de cada ativo (linhas) ao fim de cada mês (colunas) para s[m] = g[m] * s[m-1] + b[m], s[-1] = 0,
+# pela solução fechada s = G * cumsum(b / G), G = cumprod(g).
+def evoluir_cotas(g: np.ndarray, b: np.ndarray) -> np.ndarray:
+    G = np.cumprod(g, axis=1)
+    return G * np.cumsum(b / G, axis=1)
+
+
+# Fim de cada mês (dias desde 1970-01-01) de inicio a fim, inclusive.
+def _fins_de_mes(inicio: date, fim: date) -> np.ndarray:
+    meses = np.arange(np.datetime64(inicio, 'M'), np.datetime64(fim, 'M') + 1)
+    return ((meses + 1).astype('datetime64[D]') - 1).astype(np.int64)
+
+
+# Executa o backtest da meta. pesos: {ticker: peso} (normalizados); sem pesos, divisão igual.
+# Sem aporte_mensal, usa o da simulação mais recente da meta.
+def executar_backtest(meta, usuario_id: int, ativos_ids: Optional[List[int]] = None,
+                      aporte_mensal: Optional[Decimal] = None, data_inicio: Optional[date] = None,
+                      data_fim: Optional[date] = None, pesos: Optional[Dict[str, float]] = None) -> Dict:
+    if aporte_mensal is None:
+        aporte_mensal = Simulacao.objects.filter(meta_renda=meta).order_by('-data_execucao', '-id') \
+            .values_list('aporte_mensal', flat=True).first()
+        if aporte_mensal is None:
+            raise BacktestErro('Informe aporte_mensal ou simule a meta antes do backtest.')
+    if aporte_mensal <= 0:
+        raise BacktestErro('aporte_mensal deve ser positivo.')
+
+    ativos = Ativo.objects.filter(usuario_id=usuario_id)
+    if ativos_ids:
+        ativos = ativos.filter(id__in=ativos_ids)
+    ativos = list(ativos.order_by('ticker').values('id', 'ticker'))
+
+    # Apenas ativos com preços guardados (gravados na importação de dividendos da Brapi)
+    ignorados, selecionados, precos = [], [], []
+    for ativo in ativos:
+        serie = series.precos_ajustados(ativo['ticker'])
+        if serie is None or not len(serie.datas):
+            ignorados.append({'ticker': ativo['ticker'], 'motivo': 'Sem histórico de preços; importe os dividendos do ativo.'})
+        else:
+            selecionados.append(ativo)
+            precos.append(serie)
+    if not selecionados:
+        raise BacktestErro('Nenhum dos ativos tem histórico de preços para o backtest.')
+
+    # Período: todos os ativos precisam ter preço no primeiro mês
+    hoje = timezone.localdate()
+    data_fim = min(data_fim or hoje, hoje)
+    primeiro_preco = series.para_data(max(int(s.datas[0]) for s in precos))
+    if data_inicio is None:
+        data_inicio = date(data_fim.year - meta.anos_para_atingir, data_fim.month, 1)
+    data_inicio = max(data_inicio, primeiro_preco)
+    if data_inicio > data_fim:
+        raise BacktestErro('Período sem preços para todos os ativos escolhidos.')
+
+    fins = _fins_de_mes(data_inicio, data_fim)
+    quantidade, meses = len(selecionados), len(fins)
+
+    # Preços: último fechamento até o fim de cada mês, de todos os ativos em uma busca
+    chaves_precos = np.concatenate([g * _DESLOCAMENTO + s.datas.astype(np.int64) for g, s in enumerate(precos)])
+    valores_precos = np.concatenate([np.asarray(s.valores, dtype=np.float64) for s in precos])
+    consultas = (np.arange(quantidade, dtype=np.int64)[:, None] * _DESLOCAMENTO + fins[None, :]).ravel()
+    P = valores_precos[np.searchsorted(chaves_precos, consultas, side='right') - 1].reshape(quantidade, meses)
+
+    # Dividendos por ação pagos em cada mês (histórico consolidado: lançamentos próprios + eventos)
+    ids = np.array([a['id'] for a in selecionados])
+    pagamentos, dias, valores = arrays_consolidados(
+        usuario_id, ids.tolist(), data_inicio=series.para_data(fins[0]).replace(day=1), data_fim=series.para_data(fins[-1]),
+        ajustado=True
+    )
+    ordem = np.argsort(ids)
+    D = np.zeros((quantidade, meses))
+    np.add.at(D, (ordem[np.searchsorted(ids[ordem], pagamentos)], np.searchsorted(fins, dias, side='left')), valores)
+
+    if pesos:
+        w = np.array([max(float(pesos.get(a['ticker'], 0)), 0.0) for a in selecionados])
+        if w.sum() <= 0:
+            raise BacktestErro('Os pesos informados não correspondem aos ativos escolhidos.')
+    else:
+        w = np.ones(quantidade)
+    w = w / w.sum()
+
+    aporte = float(aporte_mensal)
+    reinvestimento = float(meta.percentual_reinvestimento) / 100
+    cotas = evoluir_cotas(1 + reinvestimento * D / P, aporte * w[:, None] / P)
+
+    # Dividendos do mês são pagos sobre as cotas do fim do mês anterior
+    cotas_anteriores = np.concatenate([np.zeros((quantidade, 1)), cotas[:, :-1]], axis=1)
+    dividendos = cotas_anteriores * D
+    renda = dividendos.sum(axis=0)
+    patrimonio = (cotas * P).sum(axis=0)
+    aportado = aporte * np.arange(1, meses + 1)
+
+    # Renda média mensal dos últimos 12 meses (janela móvel), comparada à renda desejada da meta
+    acumulada = np.concatenate([[0.0], np.cumsum(renda)])
+    janela = np.minimum(np.arange(1, meses + 1), 12)
+    renda_media_12m = (acumulada[1:] - acumulada[np.arange(1, meses + 1) - janela]) / janela
+    desejada = float(meta.renda_mensal_desejada)
+    atingiu = np.flatnonzero(renda_media_12m >= desejada)
+    rotulos = fins.astype('datetime64[D]').astype('datetime64[M]').astype(str)
+    total_dividendos = float(renda.sum())
+    return {
+        'meta': meta.id,
+        'data_inicio': series.para_data(fins[0]).replace(day=1),
+        'data_fim': data_fim,
+        'meses': meses,
+        'aporte_mensal': round(aporte, 2),
+        'percentual_reinvestimento': float(meta.percentual_reinvestimento),
+        'total_aportado': round(float(aportado[-1]), 2),
+        'patrimonio_final': round(float(patrimonio[-1]), 2),
+        'dividendos_recebidos': round(total_dividendos, 2),
+        'dividendos_reinvestidos': round(total_dividendos * reinvestimento, 2),
+        'renda_sacada': round(total_dividendos * (1 - reinvestimento), 2),
+        'renda_mensal_realizada': round(float(renda_media_12m[-1]), 2),
+        'renda_mensal_desejada': round(desejada, 2),
+        'percentual_meta': round(float(renda_media_12m[-1]) / desejada * 100, 2) if desejada else None,
+        'meta_atingida': bool(renda_media_12m[-1] >= desejada),
+        'mes_meta_atingida': rotulos[atingiu[0]] if len(atingiu) else None,
+        'ativos': [{
+            'ativo': ativo['id'],
+            'ticker': ativo['ticker'],
+            'peso': round(float(w[i]), 4),
+            'cotas': round(float(cotas[i, -1]), 4),
+            'valor_final': round(float(cotas[i, -1] * P[i, -1]), 2),
+            'dividendos_recebidos': round(float(dividendos[i].sum()), 2),
+        } for i, ativo in enumerate(selecionados)],
+        'ignorados': ignorados,
+        'evolucao': [{
+            'mes': rotulos[m],
+            'aportado': round(float(aportado[m]), 2),
+            'patrimonio': round(float(patrimonio[m]), 2),
+            'renda': round(float(renda[m]), 2),
+        } for m in range(meses)],
+    }
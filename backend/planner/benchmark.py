@@ -0,0 +1,253 @@
+"""
+Ferramentas de benchmark para os caminhos críticos da API do planner.
+
+Inclui a geração de uma base sintética (usuários, ativos, dividendos e metas),
+um stub local da API Brapi com latência configurável e funções de medição
+(latência p50/p95/p99, consultas por requisição e pico de memória).
+"""
+
+import json
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .models import Ativo, HistoricoDividendo, MetaRenda
+
+
+SETORES = ['Petróleo', 'Mineração', 'Bancos', 'Energia', 'Varejo', 'Saneamento', 'Seguros', 'Imobiliário']
+
+
+# Popula a base com dados sintéticos determinísticos e retorna os ids criados.
+def popular_base_sintetica(
+    usuarios: int,
+    ativos_por_usuario: int,
+    dividendos_por_ativo: int,
+    metas_por_usuario: int = 2,
+    seed: int = 42,
+    batch_size: int = 5000,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, List[int]]:
+    rnd = random.Random(seed)
+    log = log or (lambda msg: None)
+
+    prefixo = f'bench{seed}_'
+    User.objects.bulk_create(
+        [User(username=f'{prefixo}{i}', password='!') for i in range(usuarios)],
+        batch_size=batch_size,
+    )
+    usuarios_ids = list(
+        User.objects.filter(username__startswith=prefixo).order_by('id').values_list('id', flat=True)
+    )
+    log(f'{len(usuarios_ids)} usuários criados')
+
+    ativos = []
+    for usuario_id in usuarios_ids:
+        for j in range(ativos_por_usuario):
+            ativos.append(Ativo(
+                usuario_id=usuario_id,
+                ticker=f'TCK{j:04d}',
+                nome_empresa=f'Empresa Sintética {j}',
+                setor=rnd.choice(SETORES),
+            ))
+    Ativo.objects.bulk_create(ativos, batch_size=batch_size)
+    ativos_ids = list(
+        Ativo.objects.filter(usuario_id__in=usuarios_ids).order_by('id').values_list('id', flat=True)
+    )
+    log(f'{len(ativos_ids)} ativos criados')
+
+    # Dividendos mensais retroativos a partir de hoje, gerados em lotes para limitar memória
+    hoje = date.today()
+    lote = []
+    total = 0
+    for ativo_id in ativos_ids:
+        for k in range(dividendos_por_ativo):
+            lote.append(HistoricoDividendo(
+                ativo_id=ativo_id,
+                data_pagamento=hoje - timedelta(days=30 * k + rnd.randint(0, 5)),
+                valor_por_acao=Decimal(rnd.randint(1, 20000)) / Decimal('10000'),
+                fonte=rnd.choice(['api', 'manual']),
+            ))
+            if len(lote) >= batch_size:
+                HistoricoDividendo.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+    if lote:
+        HistoricoDividendo.objects.bulk_create(lote)
+        total += len(lote)
+    log(f'{total} dividendos criados')
+
+    metas = []
+    for usuario_id in usuarios_ids:
+        for m in range(metas_por_usuario):
+            metas.append(MetaRenda(
+                usuario_id=usuario_id,
+                nome=f'Meta {m}',
+                renda_mensal_desejada=Decimal(rnd.randint(1000, 20000)),
+                anos_para_atingir=rnd.randint(5, 30),
+                inflacao_media_anual=Decimal('4.50'),
+                percentual_reinvestimento=Decimal(rnd.randint(0, 100)),
+            ))
+    MetaRenda.objects.bulk_create(metas, batch_size=batch_size)
+    metas_ids = list(
+        MetaRenda.objects.filter(usuario_id__in=usuarios_ids).order_by('id').values_list('id', flat=True)
+    )
+    log(f'{len(metas_ids)} metas criadas')
+
+    return {'usuarios': usuarios_ids, 'ativos': ativos_ids, 'metas': metas_ids}
+
+
+# Handler HTTP que imita o endpoint /api/quote/<ticker> da Brapi.
+class _BrapiStubHandler(BaseHTTPRequestHandler):
+    latencia = 0.0
+    dividendos_por_ticker = 12
+
+    def do_GET(self):
+        if self.latencia:
+            time.sleep(self.latencia)
+
+        ticker = self.path.split('?')[0].rstrip('/').split('/')[-1].upper()
+        hoje = date.today()
+        dividendos = [
+            {'paymentDate': f'{hoje - timedelta(days=30 * k)}T00:00:00.000Z', 'rate': 0.25 + (k % 4) * 0.05}
+            for k in range(self.dividendos_por_ticker)
+        ]
+        corpo = json.dumps({'results': [{
+            'symbol': ticker,
+            'longName': f'Empresa {ticker}',
+            'sector': 'Sintético',
+            'regularMarketPrice': 25.0,
+            'dividendsData': {'cashDividends': dividendos, 'stockDividends': [], 'subscriptions': []},
+        }]}).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    # Silencia o log padrão de cada requisição.
+    def log_message(self, format, *args):
+        pass
+
+
+# Stub local da API Brapi executado em uma thread, com latência configurável em milissegundos.
+class BrapiStub:
+
+    def __init__(self, latencia_ms: float = 0.0, dividendos_por_ticker: int = 12):
+        handler = type('BrapiStubHandler', (_BrapiStubHandler,), {
+            'latencia': latencia_ms / 1000.0,
+            'dividendos_por_ticker': dividendos_por_ticker,
+        })
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, porta = self.servidor.server_address[:2]
+        return f'http://{host}:{porta}/api'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+# Retorna o percentil (interpolação linear) de uma lista de valores.
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    pos = (len(ordenados) - 1) * p / 100.0
+    baixo = int(pos)
+    alto = min(baixo + 1, len(ordenados) - 1)
+    return ordenados[baixo] + (ordenados[alto] - ordenados[baixo]) * (pos - baixo)
+
+
+# Executa um cenário várias vezes e retorna latência (ms), consultas por requisição e pico de memória.
+# preparar(i), se informado, roda antes de cada execução e não entra nas medições.
+def medir_cenario(executar: Callable[[int], object], iteracoes: int, aquecimento: int = 1,
+                  preparar: Optional[Callable[[int], None]] = None) -> Dict:
+    preparar = preparar or (lambda i: None)
+    for i in range(aquecimento):
+        preparar(i)
+        executar(i)
+
+    latencias = []
+    consultas = []
+    status_codes = {}
+    for i in range(iteracoes):
+        # Preparação (ex: estado do cache) fora da medição de latência e de consultas
+        preparar(i)
+        with CaptureQueriesContext(connection) as ctx:
+            inicio = time.perf_counter()
+            resposta = executar(i)
+            latencias.append((time.perf_counter() - inicio) * 1000.0)
+        consultas.append(len(ctx.captured_queries))
+        codigo = str(getattr(resposta, 'status_code', ''))
+        status_codes[codigo] = status_codes.get(codigo, 0) + 1
+
+    # Memória medida numa passada separada para não distorcer a latência
+    preparar(iteracoes)
+    tracemalloc.start()
+    try:
+        executar(iteracoes)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iteracoes': iteracoes,
+        'latencia_ms': {
+            'p50': round(percentil(latencias, 50), 3),
+            'p95': round(percentil(latencias, 95), 3),
+            'p99': round(percentil(latencias, 99), 3),
+            'media': round(sum(latencias) / len(latencias), 3) if latencias else 0.0,
+        },
+        'consultas_por_requisicao': {
+            'min': min(consultas) if consultas else 0,
+            'max': max(consultas) if consultas else 0,
+            'media': round(sum(consultas) / len(consultas), 2) if consultas else 0.0,
+        },
+        'pico_memoria_kb': round(pico / 1024.0, 1),
+        'status': status_codes,
+    }
+
+
+# Retorna o hash do commit atual, se disponível, para identificar o resultado.
+def commit_atual() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+# Compara dois resultados de benchmark e retorna a variação percentual de p50/p95/p99 e consultas.
+def comparar_resultados(anterior: Dict, atual: Dict) -> Dict[str, Dict[str, Optional[float]]]:
+    comparacao = {}
+    for nome, dados in atual.get('cenarios', {}).items():
+        base = anterior.get('cenarios', {}).get(nome)
+        if not base:
+            continue
+        variacoes = {}
+        for chave in ('p50', 'p95', 'p99'):
+            antes = base['latencia_ms'][chave]
+            depois = dados['latencia_ms'][chave]
+            variacoes[chave] = round((depois - antes) / antes * 100.0, 1) if antes else None
+        variacoes['consultas'] = dados['consultas_por_requisicao']['media'] - base['consultas_por_requisicao']['media']
+        comparacao[nome] = variacoes
+    return comparacao
@@ -4,15 +4,22 @@ Serviço para consumir a API Brapi (brapi.dev) e buscar dados de ações brasile
 
 import requests
 import os
+import threading
+from contextlib import contextmanager
 from typing import Dict, List, Optional
 from decimal import Decimal
 from datetime import datetime, timedelta
 
 
+# Respostas de get_quote já obtidas para o lote em execução na thread (planner.lote).
+_lote = threading.local()
+
+
 # Classe para interagir com a API Brapi. Alguns tickers são gratuitos (PETR4, MGLU3, VALE3, ITUB4), para outros é necessário token.
 class BrapiService:
     
-    BASE_URL = "https://brapi.dev/api"
+    # Pode ser sobrescrita (ex: stub local em benchmarks) via variável de ambiente
+    BASE_URL = os.environ.get('BRAPI_BASE_URL', "https://brapi.dev/api")
     
     # Tickers gratuitos que não precisam de token
     FREE_TICKERS = ["PETR4", "MGLU3", "VALE3", "ITUB4"]
@@ -26,9 +33,34 @@ class BrapiService:
         except:
             return False
     
-    # Busca informações de uma ação, incluindo preço e dividendos.
+    # Chave de uma chamada a get_quote (mesmos argumentos, mesma resposta).
+    @staticmethod
+    def chave_quote(ticker: str, range_days: str = "1y", dividends: bool = True,
+                    interval: Optional[str] = None) -> tuple:
+        return (ticker.upper().strip(), range_days, bool(dividends), interval)
+
+    # Durante o bloco, get_quote nesta thread responde com as respostas já obtidas ({chave_quote: resposta}),
+    # sem nova chamada à Brapi para essas chaves.
     @staticmethod
-    def get_quote(ticker: str, range_days: str = "1y", dividends: bool = True) -> Optional[Dict]:
+    @contextmanager
+    def respostas_em_lote(respostas: Dict[tuple, Optional[Dict]]):
+        anteriores = getattr(_lote, 'respostas', None)
+        _lote.respostas = respostas
+        try:
+            yield
+        finally:
+            _lote.respostas = anteriores
+
+    # Busca informações de uma ação, incluindo preço e dividendos. interval controla a granularidade
+    # do histórico de preços (ex: "1mo" para buscar range="max" sem trazer anos de cotações diárias).
+    @staticmethod
+    def get_quote(ticker: str, range_days: str = "1y", dividends: bool = True,
+                  interval: Optional[str] = None) -> Optional[Dict]:
+        respostas = getattr(_lote, 'respostas', None)
+        if respostas:
+            chave = BrapiService.chave_quote(ticker, range_days, dividends, interval)
+            if chave in respostas:
+                return respostas[chave]
         try:
             # Formatar ticker corretamente (remover espaços, garantir maiúsculas)
             ticker = ticker.upper().strip()
@@ -38,6 +70,8 @@ class BrapiService:
                 "range": range_days,
                 "dividends": "true" if dividends else "false"
             }
+            if interval:
+                params["interval"] = interval
             
             # Adicionar token se disponível (pode ser configurado via variável de ambiente)
             # Para obter um token gratuito: https://brapi.dev
@@ -117,10 +151,12 @@ class BrapiService:
             print(f"Erro inesperado ao buscar dados da Brapi: {e}")
             return None
     
-    # Extrai e formata os dividendos de uma ação.
+    # Extrai e formata os dividendos de uma ação. Aceita a resposta já obtida de get_quote
+    # (dados) para quem também precisa da cotação, evitando uma segunda chamada.
     @staticmethod
-    def get_dividends(ticker: str, range_days: str = "1y") -> List[Dict]:
-        dados = BrapiService.get_quote(ticker, range_days, dividends=True)
+    def get_dividends(ticker: str, range_days: str = "1y", dados: Optional[Dict] = None) -> List[Dict]:
+        if dados is None:
+            dados = BrapiService.get_quote(ticker, range_days, dividends=True)
         
         if not dados:
             return []
@@ -129,7 +165,8 @@ class BrapiService:
         
         # A API retorna dividendos no formato:
         # "dividendsData": {
-        #   "cashDividends": [{"paymentDate": "2024-01-15T00:00:00.000Z", "rate": 0.50}, ...],
+        #   "cashDividends": [{"paymentDate": "2024-01-15T00:00:00.000Z", "rate": 0.50,
+        #                      "lastDatePrior": "2023-12-28T00:00:00.000Z"}, ...],
         #   "stockDividends": [...],
         #   "subscriptions": [...]
         # }
@@ -166,10 +203,15 @@ class BrapiService:
                         else:
                             valor = Decimal(str(valor)) if valor else Decimal('0')
                         
+                        # Data com (último dia com direito): define a base de ações do valor
+                        data_com = div.get("lastDatePrior")
+                        data_com = str(data_com).split('T')[0] if data_com else None
+                        
                         if data_str and valor > 0:
                             dividendos.append({
                                 "data_pagamento": data_str,
                                 "valor_por_acao": valor,
+                                "data_com": data_com,
                                 "fonte": "api"
                             })
                     except Exception as e:
@@ -203,6 +245,59 @@ class BrapiService:
         
         return dividendos
     
+    # Extrai os eventos que alteram a quantidade de ações (dividendsData.stockDividends): desdobramentos,
+    # grupamentos e bonificações, com o fator em ações novas por ação antiga. O fator vem de completeFactor
+    # ("1 para 2" -> 2) quando presente; senão de factor: percentual na bonificação (10 -> 1.1), razão direta no
+    # desdobramento (2 -> 2) e no grupamento (10 -> 0.1, ou 0.1 se já vier como fração).
+    @staticmethod
+    def get_stock_events(ticker: str, dados: Optional[Dict] = None) -> List[Dict]:
+        if dados is None:
+            dados = BrapiService.get_quote(ticker, "max", dividends=True, interval="1mo")
+        
+        info_dividendos = (dados or {}).get("dividendsData")
+        if not isinstance(info_dividendos, dict):
+            return []
+        
+        tipos = {"DESDOBRAMENTO": "desdobramento", "GRUPAMENTO": "grupamento",
+                 "BONIFICACAO": "bonificacao", "BONIFICAÇÃO": "bonificacao"}
+        eventos = []
+        for evento in info_dividendos.get("stockDividends", []) or []:
+            try:
+                if not isinstance(evento, dict):
+                    continue
+                rotulo = str(evento.get("label", "")).upper().strip()
+                tipo = tipos.get(rotulo)
+                data = evento.get("lastDatePrior") or evento.get("approvedOn") or ""
+                if not tipo or not data:
+                    continue
+                
+                fator = None
+                completo = str(evento.get("completeFactor") or "").lower().replace(":", " para ")
+                partes = [p.strip() for p in completo.split("para")]
+                if len(partes) == 2 and all(partes):
+                    fator = Decimal(partes[1].replace(",", ".")) / Decimal(partes[0].replace(",", "."))
+                elif evento.get("factor"):
+                    bruto = Decimal(str(evento["factor"]))
+                    if tipo == "bonificacao":
+                        fator = Decimal("1") + bruto / Decimal("100")
+                    elif tipo == "grupamento":
+                        fator = bruto if bruto < 1 else Decimal("1") / bruto
+                    else:
+                        fator = bruto
+                
+                if fator and fator > 0 and fator != 1:
+                    eventos.append({
+                        "data": str(data).split("T")[0],
+                        "tipo": tipo,
+                        "fator": fator.quantize(Decimal("0.00000001")),
+                        "descricao": str(evento.get("completeFactor") or rotulo)[:100],
+                    })
+            except Exception as e:
+                print(f"Erro ao processar evento corporativo: {e}")
+                continue
+        
+        return eventos
+    
     # Busca o preço atual de uma ação.
     @staticmethod
     def get_current_price(ticker: str) -> Optional[Decimal]:
@@ -222,37 +317,63 @@ class BrapiService:
         
         return None
     
-    # Calcula o yield (dividend yield) de uma ação baseado nos dividendos do último ano.
+    # Calcula o yield (dividend yield) anualizado de uma ação para uma janela (3m, 1y, 5y, ytd, max...).
+    # Uma única chamada traz o histórico completo e o preço; a janela é fatiada localmente.
+    # Para consultas repetidas prefira planner.dividendos.yield_ticker, que usa o histórico já guardado.
     @staticmethod
     def calculate_yield(ticker: str, range_days: str = "1y") -> Optional[Decimal]:
-        dados = BrapiService.get_quote(ticker, range_days, dividends=True)
+        from .janelas import resumo_janela
+        
+        dados = BrapiService.get_quote(ticker, "max", dividends=True, interval="1mo")
         
         if not dados:
             return None
         
-        # Buscar preço atual
-        preco = BrapiService.get_current_price(ticker)
+        preco = dados.get("regularMarketPrice") or dados.get("price")
         if not preco or preco <= 0:
             return None
         
-        # Somar dividendos do período
-        dividendos = BrapiService.get_dividends(ticker, range_days)
-        total = sum(d["valor_por_acao"] for d in dividendos)
+        serie = sorted(
+            (datetime.strptime(d["data_pagamento"], "%Y-%m-%d").date(), d["valor_por_acao"])
+            for d in BrapiService.get_dividends(ticker, dados=dados)
+        )
+        resumo = resumo_janela(
+            [d for d, _ in serie], [v for _, v in serie], range_days,
+            datetime.now().date(), Decimal(str(preco))
+        )
         
-        if total <= 0:
+        if not resumo["yield_anualizado"]:
             return None
         
-        # Calcular yield: (dividendos anuais / preço) * 100
-        # Se range_days for 1y, já está anualizado
-        # Se for outro período, precisamos anualizar
-        if range_days == "1y":
-            yield_calc = (total / preco) * Decimal("100")
-        else:
-            # Aproximação: assumir que o período representa proporção do ano
-            # Para simplificar, vamos usar apenas 1y
-            yield_calc = (total / preco) * Decimal("100")
-        
-        return yield_calc.quantize(Decimal("0.01"))
+        return resumo["yield_anualizado"]
+    
+    # Lista uma página dos papéis negociados (endpoint /quote/list), retornando os itens e se há próxima página.
+    @staticmethod
+    def list_tickers(page: int = 1, limit: int = 100) -> Optional[Dict]:
+        params = {"page": page, "limit": limit, "sortBy": "name", "sortOrder": "asc"}
+        token = os.environ.get('BRAPI_TOKEN', '')
+        if token:
+            params['token'] = token
+
+        try:
+            response = requests.get(
+                f"{BrapiService.BASE_URL}/quote/list",
+                params=params,
+                headers={'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'},
+                timeout=30
+            )
+            if response.status_code != 200:
+                print(f"Erro HTTP {response.status_code} ao listar tickers da Brapi")
+                return None
+            dados = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Erro ao listar tickers da Brapi: {e}")
+            return None
+
+        return {
+            "stocks": dados.get("stocks", []),
+            "hasNextPage": bool(dados.get("hasNextPage")),
+        }
     
     # Busca informações da empresa.
     @staticmethod
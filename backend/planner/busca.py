@@ -0,0 +1,202 @@
+"""
+Busca textual indexada para Ativo e MetaRenda.
+
+O backend é escolhido pelo banco em uso:
+- SQLite: tabelas virtuais FTS5 (apenas índice, sem cópia do texto) mantidas por triggers, com índice de prefixo
+  para autocomplete de ticker e ranking por bm25;
+- PostgreSQL: índices GIN de trigramas (pg_trgm) sobre as colunas buscadas, com ranking por similaridade;
+- outros (ou SQLite sem FTS5): icontains, como antes.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+
+# Configuração de cada índice: tabela do modelo, colunas buscadas (com peso no ranking), coluna do dono
+# e, opcionalmente, a coluna de valor único (sem espaços) indexada com o dono como prefixo.
+INDICES = {
+    'ativo': {
+        'tabela': 'planner_ativo',
+        'colunas': [('ticker', 10.0), ('nome_empresa', 2.0), ('setor', 1.0)],
+        'dono': 'usuario_id',
+        # Indexada como "u<dono><valor>": o autocomplete por prefixo só percorre os tickers do próprio usuário
+        'prefixada': 'ticker',
+    },
+    'metarenda': {
+        'tabela': 'planner_metarenda',
+        'colunas': [('nome', 1.0)],
+        'dono': 'usuario_id',
+    },
+}
+
+_fts_disponivel = {}
+
+
+# similarity() do pg_trgm como expressão do ORM.
+class _Similaridade(Func):
+    function = 'similarity'
+    output_field = FloatField()
+
+
+def _tabela_fts(indice):
+    return f"{INDICES[indice]['tabela']}_fts"
+
+
+# Verifica (uma vez por alias de conexão) se as tabelas FTS5 existem.
+def _usa_fts(conn):
+    if conn.vendor != 'sqlite':
+        return False
+    if conn.alias not in _fts_disponivel:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN (%s, %s)",
+                [_tabela_fts('ativo'), _tabela_fts('metarenda')]
+            )
+            _fts_disponivel[conn.alias] = cursor.fetchone()[0] == 2
+    return _fts_disponivel[conn.alias]
+
+
+# Monta a consulta FTS5 de prefixos restrita ao dono: "ita uni" -> dono : "u5" AND ("ita"* AND "uni"*).
+# O dono é indexado como token ("u<ID>"), então o FTS cruza listas invertidas em vez de filtrar
+# os resultados de todos os usuários; um termo único também é buscado na coluna prefixada.
+def _consulta_fts(termo, config, usuario_id):
+    tokens = re.findall(r'\w+', termo.lower())
+    if not tokens:
+        return ''
+    dono = f'u{int(usuario_id)}'
+    prefixada = config.get('prefixada')
+    colunas = ' '.join(c for c, _ in config['colunas'] if c != prefixada)
+    consulta = f'(dono : "{dono}" AND {{{colunas}}} : (' + ' AND '.join(f'"{t}"*' for t in tokens) + '))'
+    if prefixada and len(tokens) == 1:
+        consulta = f'{prefixada} : "{dono}{tokens[0]}"* OR {consulta}'
+    return consulta
+
+
+# Filtra e ordena por relevância o queryset de um índice ('ativo' ou 'metarenda') pelo termo.
+# Retorna (queryset, ordenacao) para que a view mantenha seu critério de desempate.
+def buscar(queryset, indice, termo, usuario_id):
+    config = INDICES[indice]
+    colunas = [c for c, _ in config['colunas']]
+
+    if _usa_fts(connection):
+        consulta = _consulta_fts(termo, config, usuario_id)
+        if not consulta:
+            return queryset.none(), []
+        fts = _tabela_fts(indice)
+        pesos = ', '.join(str(p) for _, p in config['colunas'])
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', [consulta])
+        ).annotate(relevancia=RawSQL(
+            f'SELECT bm25({fts}, {pesos}, 0) FROM {fts} '
+            f'WHERE {fts} MATCH %s AND {fts}.rowid = {config["tabela"]}.id',
+            [consulta]
+        ))
+        # bm25: menor é mais relevante
+        return queryset, ['relevancia']
+
+    filtro = Q()
+    for coluna in colunas:
+        filtro |= Q(**{f'{coluna}__icontains': termo})
+    queryset = queryset.filter(filtro)
+
+    if connection.vendor == 'postgresql':
+        similaridades = [_Similaridade(F(c), Value(termo)) for c in colunas]
+        relevancia = Greatest(*similaridades) if len(similaridades) > 1 else similaridades[0]
+        return queryset.annotate(relevancia=relevancia), ['-relevancia']
+
+    return queryset, []
+
+
+# Cria (de forma idempotente) os índices de busca do banco em uso. Executado após cada migrate,
+# o que também recria os triggers do SQLite quando uma migração reconstrói a tabela.
+def instalar_indices_busca(sender=None, using='default', **kwargs):
+    from django.db import connections
+    conn = connections[using]
+
+    if conn.vendor == 'sqlite':
+        _instalar_fts(conn)
+    elif conn.vendor == 'postgresql':
+        _instalar_trigramas(conn)
+
+
+def _instalar_fts(conn):
+    with conn.cursor() as cursor:
+        for indice, config in INDICES.items():
+            tabela = config['tabela']
+            fts = _tabela_fts(indice)
+            colunas = [c for c, _ in config['colunas']]
+            lista = ', '.join(colunas)
+            prefixada = config.get('prefixada')
+
+            # Expressão SQL de cada coluna no índice (a prefixada recebe 'u' || dono na frente)
+            def valores(origem):
+                return ', '.join(
+                    f"'u' || {origem}{config['dono']} || {origem}{c}" if c == prefixada else f'{origem}{c}'
+                    for c in colunas
+                )
+            novos = valores('new.')
+            antigos = valores('old.')
+            dono_novo = f"'u' || new.{config['dono']}"
+            dono_antigo = f"'u' || old.{config['dono']}"
+
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='trigger' AND tbl_name=%s AND name LIKE %s",
+                           [tabela, f'{fts}_%'])
+            if cursor.fetchone()[0] == 3:
+                continue
+
+            try:
+                # Tabela sem conteúdo próprio (content=''): guarda só o índice invertido,
+                # com rowid = id do modelo; o texto continua apenas na tabela original
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{lista}, dono, content='', prefix='2 3 4', tokenize='unicode61 remove_diacritics 2')"
+                )
+            except Exception as e:
+                print(f"FTS5 indisponível no SQLite, busca usará icontains: {e}")
+                return
+
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_ai")
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_ad")
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_au")
+            cursor.execute(
+                f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+                f"INSERT INTO {fts}(rowid, {lista}, dono) VALUES (new.id, {novos}, {dono_novo}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {lista}, dono) VALUES ('delete', old.id, {antigos}, {dono_antigo}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {tabela} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {lista}, dono) VALUES ('delete', old.id, {antigos}, {dono_antigo}); "
+                f"INSERT INTO {fts}(rowid, {lista}, dono) VALUES (new.id, {novos}, {dono_novo}); END"
+            )
+
+            # Reindexa tudo: os triggers estavam ausentes, então o índice pode estar defasado
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('delete-all')")
+            cursor.execute(
+                f"INSERT INTO {fts}(rowid, {lista}, dono) "
+                f"SELECT id, {valores('')}, 'u' || {config['dono']} FROM {tabela}"
+            )
+
+    _fts_disponivel.pop(conn.alias, None)
+
+
+def _instalar_trigramas(conn):
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except Exception as e:
+            print(f"Não foi possível habilitar pg_trgm, busca sem índice: {e}")
+            return
+        for indice, config in INDICES.items():
+            for coluna, _ in config['colunas']:
+                # Mesma expressão gerada pelo icontains do Django: UPPER(coluna::text) LIKE UPPER(...)
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {config["tabela"]}_{coluna}_trgm '
+                    f'ON {config["tabela"]} USING gin (UPPER({coluna}::text) gin_trgm_ops)'
+                )
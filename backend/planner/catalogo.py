@@ -0,0 +1,160 @@
+"""
+Catálogo global de tickers: carga em massa (Brapi ou fixture) e índice em memória para autocomplete.
+
+O índice é um par de arrays ordenados (tickers e palavras dos nomes) consultados por busca
+binária de prefixo, então o autocomplete não faz consulta ao banco nem chamada à Brapi.
+Cada processo mantém sua cópia e a recarrega quando a versão do catálogo no banco muda
+(verificada no máximo a cada INTERVALO_VERIFICACAO segundos).
+"""
+
+import bisect
+import json
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from django.db.models import Count, Max
+
+from .brapi_service import BrapiService
+from .models import TickerCatalogo
+
+
+FIXTURE_PADRAO = Path(__file__).resolve().parent / 'dados' / 'tickers_b3.json'
+
+INTERVALO_VERIFICACAO = 60
+
+
+# Maiúsculas e sem acentos, para comparar prefixos ("itaú" -> "ITAU").
+def normalizar(texto: str) -> str:
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).upper().strip()
+
+
+# Grava (insere ou atualiza) os papéis no formato da Brapi em lotes. Retorna a quantidade gravada.
+def gravar_catalogo(itens: Iterable[Dict], tamanho_lote: int = 1000) -> int:
+    total = 0
+    lote = []
+    for item in itens:
+        ticker = (item.get('stock') or item.get('ticker') or '').upper().strip()
+        if not ticker:
+            continue
+        lote.append(TickerCatalogo(
+            ticker=ticker,
+            nome=(item.get('name') or item.get('nome') or ticker)[:200],
+            setor=(item.get('sector') or item.get('setor') or None),
+            tipo=item.get('type') or item.get('tipo') or None,
+        ))
+        if len(lote) >= tamanho_lote:
+            total += _upsert(lote)
+            lote = []
+    if lote:
+        total += _upsert(lote)
+    return total
+
+
+def _upsert(lote: List[TickerCatalogo]) -> int:
+    TickerCatalogo.objects.bulk_create(
+        lote,
+        update_conflicts=True,
+        unique_fields=['ticker'],
+        update_fields=['nome', 'setor', 'tipo', 'data_atualizacao'],
+    )
+    return len(lote)
+
+
+# Percorre todas as páginas do /quote/list da Brapi e grava o catálogo.
+def atualizar_catalogo_brapi(limite_pagina: int = 100, max_paginas: int = 1000) -> int:
+    total = 0
+    for pagina in range(1, max_paginas + 1):
+        dados = BrapiService.list_tickers(page=pagina, limit=limite_pagina)
+        if dados is None:
+            if pagina == 1:
+                raise ConnectionError('Não foi possível obter a lista de tickers da Brapi.')
+            break
+        total += gravar_catalogo(dados['stocks'])
+        if not dados['hasNextPage']:
+            break
+    return total
+
+
+# Carrega o catálogo a partir de um arquivo JSON no formato do /quote/list ({"stocks": [...]}).
+def carregar_fixture(caminho: Optional[Path] = None) -> int:
+    with open(caminho or FIXTURE_PADRAO, encoding='utf-8') as f:
+        dados = json.load(f)
+    return gravar_catalogo(dados['stocks'] if isinstance(dados, dict) else dados)
+
+
+# Índice em memória do catálogo, com busca por prefixo de ticker ou de palavra do nome.
+class IndiceTickers:
+
+    def __init__(self, registros: List[Dict]):
+        self.registros = registros
+        self.tickers = sorted((normalizar(r['ticker']), i) for i, r in enumerate(registros))
+        self.chaves_ticker = [t for t, _ in self.tickers]
+        palavras = set()
+        for i, r in enumerate(registros):
+            for palavra in normalizar(r['nome']).split():
+                palavras.add((palavra, i))
+        self.palavras = sorted(palavras)
+        self.chaves_palavra = [p for p, _ in self.palavras]
+
+    @staticmethod
+    def _prefixo(chaves, pares, prefixo, limite):
+        inicio = bisect.bisect_left(chaves, prefixo)
+        encontrados = []
+        for j in range(inicio, len(chaves)):
+            if not chaves[j].startswith(prefixo) or len(encontrados) >= limite:
+                break
+            encontrados.append(pares[j][1])
+        return encontrados
+
+    # Tickers que começam com o termo vêm primeiro; depois nomes com alguma palavra começando com ele.
+    def buscar(self, termo: str, limite: int = 10) -> List[Dict]:
+        prefixo = normalizar(termo)
+        if not prefixo:
+            return []
+        indices = self._prefixo(self.chaves_ticker, self.tickers, prefixo, limite)
+        if len(indices) < limite:
+            vistos = set(indices)
+            for i in self._prefixo(self.chaves_palavra, self.palavras, prefixo, limite * 4):
+                if i not in vistos:
+                    vistos.add(i)
+                    indices.append(i)
+                    if len(indices) >= limite:
+                        break
+        return [self.registros[i] for i in indices]
+
+
+_indice = None
+_versao = None
+_verificado_em = float('-inf')
+_trava = threading.Lock()
+
+
+# Retorna o índice do processo, reconstruindo-o se o catálogo no banco mudou.
+def obter_indice() -> IndiceTickers:
+    global _indice, _versao, _verificado_em
+
+    agora = time.monotonic()
+    if _indice is not None and agora - _verificado_em < INTERVALO_VERIFICACAO:
+        return _indice
+
+    with _trava:
+        if _indice is not None and agora - _verificado_em < INTERVALO_VERIFICACAO:
+            return _indice
+        agregado = TickerCatalogo.objects.aggregate(total=Count('id'), ultima=Max('data_atualizacao'))
+        versao = (agregado['total'], agregado['ultima'])
+        if _indice is None or versao != _versao:
+            registros = list(TickerCatalogo.objects.order_by('ticker').values('ticker', 'nome', 'setor', 'tipo'))
+            _indice = IndiceTickers(registros)
+            _versao = versao
+        _verificado_em = agora
+    return _indice
+
+
+# Força a reconstrução do índice na próxima consulta (ex: após recarregar o catálogo).
+def invalidar_indice() -> None:
+    global _verificado_em
+    _verificado_em = float('-inf')
@@ -0,0 +1,16 @@
+"""
+Ajustes aplicados às conexões de banco de dados.
+"""
+
+from django.conf import settings
+
+
+# Aplica os PRAGMAs de settings.SQLITE_PRAGMAS (WAL, synchronous, cache, mmap, busy_timeout) em cada conexão SQLite.
+def configurar_conexao_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {'journal_mode': 'WAL'})
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nome}={valor}')
@@ -0,0 +1,262 @@
+"""
+Armazenamento compartilhado de dividendos.
+
+Os pagamentos vindos da Brapi são gravados uma única vez por ticker em EventoDividendo, em vez de
+uma cópia por usuário em HistoricoDividendo. O histórico de cada usuário é a junção desses eventos
+com os seus ativos (pelo ticker), mais os lançamentos próprios em HistoricoDividendo (manuais ou
+importados de arquivo), que prevalecem sobre o evento do mesmo ativo na mesma data.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from django.db import transaction
+from django.db.models import (
+    BigIntegerField, BooleanField, CharField, DecimalField, Exists, F, OuterRef, Subquery, Sum, TextField, Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .brapi_service import BrapiService
+from .ajustes import gravar_eventos_corporativos
+from .models import Ativo, EventoDividendo, HistoricoDividendo, TickerCatalogo
+from . import series
+
+
+# Tempo durante o qual os eventos importados de um ticker são considerados atuais (sem nova chamada à Brapi).
+VALIDADE_IMPORTACAO = timedelta(hours=12)
+
+# Colunas das linhas consolidadas, na ordem do SELECT dos dois lados da união.
+COLUNAS = [
+    'r_id', 'r_ativo', 'r_ticker', 'r_nome', 'r_data', 'r_valor',
+    'r_fonte', 'r_observacoes', 'r_criacao', 'r_atualizacao', 'r_editavel', 'r_data_com',
+]
+
+
+def _importacao_valida(importado_em, agora) -> bool:
+    return bool(importado_em) and agora - importado_em < VALIDADE_IMPORTACAO
+
+
+# Se importar_eventos_ticker chamaria a Brapi para o ticker (nunca importado ou importação vencida).
+def importacao_pendente(ticker: str) -> bool:
+    importado_em = TickerCatalogo.objects.filter(ticker=ticker.upper().strip()) \
+        .values_list('dividendos_importados_em', flat=True).first()
+    return not _importacao_valida(importado_em, timezone.now())
+
+
+# Importa os eventos de dividendos de um ticker da Brapi para o armazenamento compartilhado.
+# Se o ticker foi importado há menos de VALIDADE_IMPORTACAO, não chama a Brapi.
+# Retorna o relatório da importação ou None se a Brapi não retornou dividendos.
+def importar_eventos_ticker(ticker: str, nome: str = '', setor: Optional[str] = None,
+                            range_days: str = 'max', forcar: bool = False) -> Optional[Dict]:
+    from .indicadores import invalidar as invalidar_indicadores
+    from .painel import marcar_painel
+
+    ticker = ticker.upper().strip()
+    catalogo = TickerCatalogo.objects.filter(ticker=ticker).first()
+    agora = timezone.now()
+
+    if not forcar and catalogo and _importacao_valida(catalogo.dividendos_importados_em, agora):
+        total = EventoDividendo.objects.filter(ticker=ticker).count()
+        return {'importados': 0, 'duplicados': total, 'total_encontrados': total, 'em_cache': True}
+
+    # Uma única chamada traz todo o histórico de dividendos e a cotação (guardada no catálogo);
+    # preços mensais bastam e mantêm a resposta pequena mesmo com range=max
+    dados = BrapiService.get_quote(ticker, range_days, dividends=True, interval='1mo')
+    dividendos = BrapiService.get_dividends(ticker, range_days=range_days, dados=dados) if dados else []
+    if not dividendos:
+        return None
+    preco = dados.get('regularMarketPrice') or dados.get('price')
+
+    eventos = {}
+    for div in dividendos:
+        valor = Decimal(div['valor_por_acao']).quantize(Decimal('0.0001'))
+        eventos[(div['data_pagamento'], valor)] = EventoDividendo(
+            ticker=ticker, data_pagamento=div['data_pagamento'], valor_por_acao=valor, data_com=div.get('data_com')
+        )
+
+    with transaction.atomic():
+        antes = EventoDividendo.objects.filter(ticker=ticker).count()
+        # Pagamentos já gravados só recebem a data com (importações anteriores não a guardavam)
+        EventoDividendo.objects.bulk_create(
+            eventos.values(), update_conflicts=True,
+            unique_fields=['ticker', 'data_pagamento', 'valor_por_acao'], update_fields=['data_com'],
+        )
+        importados = EventoDividendo.objects.filter(ticker=ticker).count() - antes
+        if catalogo is None:
+            TickerCatalogo.objects.bulk_create(
+                [TickerCatalogo(ticker=ticker, nome=(nome or ticker)[:200], setor=setor)],
+                ignore_conflicts=True
+            )
+        atualizacao = {'dividendos_importados_em': agora}
+        if preco:
+            atualizacao.update(ultimo_preco=Decimal(str(preco)).quantize(Decimal('0.0001')), preco_atualizado_em=agora)
+        TickerCatalogo.objects.filter(ticker=ticker).update(**atualizacao)
+        # Desdobramentos, grupamentos e bonificações da mesma resposta (fatores de ajuste das séries)
+        corporativos = gravar_eventos_corporativos(ticker, BrapiService.get_stock_events(ticker, dados=dados))
+        marcar_painel(Ativo.objects.filter(ticker=ticker).values('usuario_id'), carteira=True)
+
+    # Séries colunares do ticker (planner.series), regravadas a partir do banco depois do commit
+    series.gravar_apos_commit(series.gravar_dividendos, ticker)
+    series.gravar_apos_commit(series.gravar_precos, ticker, dados.get('historicalDataPrice'))
+    invalidar_indicadores([ticker])
+
+    return {
+        'importados': importados,
+        'duplicados': len(eventos) - importados,
+        'total_encontrados': len(dividendos),
+        'eventos_corporativos': corporativos,
+        'em_cache': False,
+    }
+
+
+# Eventos compartilhados dos tickers dos ativos informados, sem os que têm lançamento próprio no mesmo ativo e data.
+def _eventos_visiveis(ativos, usuario_id):
+    sobrescritos = HistoricoDividendo.objects.filter(
+        ativo__usuario_id=usuario_id,
+        ativo__ticker=OuterRef('ticker'),
+        data_pagamento=OuterRef('data_pagamento'),
+    )
+    return EventoDividendo.objects.filter(ticker__in=ativos.values('ticker')).exclude(Exists(sobrescritos))
+
+
+# Histórico consolidado do usuário (lançamentos próprios + eventos compartilhados) como um único
+# queryset de dicionários (UNION ALL), já ordenado e paginável. As chaves estão em COLUNAS.
+def dividendos_usuario(usuario_id: int, ativo_id=None, data_inicio=None, data_fim=None, ativos_ids=None):
+    ativos = Ativo.objects.filter(usuario_id=usuario_id)
+    proprios = HistoricoDividendo.objects.filter(ativo__usuario_id=usuario_id)
+    if ativo_id:
+        ativos = ativos.filter(id=ativo_id)
+        proprios = proprios.filter(ativo_id=ativo_id)
+    if ativos_ids is not None:
+        ativos = ativos.filter(id__in=ativos_ids)
+        proprios = proprios.filter(ativo_id__in=ativos_ids)
+
+    eventos = _eventos_visiveis(ativos, usuario_id)
+    if data_inicio:
+        proprios = proprios.filter(data_pagamento__gte=data_inicio)
+        eventos = eventos.filter(data_pagamento__gte=data_inicio)
+    if data_fim:
+        proprios = proprios.filter(data_pagamento__lte=data_fim)
+        eventos = eventos.filter(data_pagamento__lte=data_fim)
+
+    # Todas as colunas são anotações, na mesma ordem, para que os dois SELECTs da união se alinhem
+    proprios = proprios.annotate(
+        r_id=F('id'),
+        r_ativo=F('ativo_id'),
+        r_ticker=F('ativo__ticker'),
+        r_nome=F('ativo__nome_empresa'),
+        r_data=F('data_pagamento'),
+        r_valor=F('valor_por_acao'),
+        r_fonte=F('fonte'),
+        r_observacoes=F('observacoes'),
+        r_criacao=F('data_criacao'),
+        r_atualizacao=F('data_atualizacao'),
+        r_editavel=Value(True, output_field=BooleanField()),
+        r_data_com=F('data_pagamento'),
+    ).values(*COLUNAS).order_by()
+
+    ativo_do_evento = ativos.filter(ticker=OuterRef('ticker'))
+    eventos = eventos.annotate(
+        r_id=Value(None, output_field=BigIntegerField()),
+        r_ativo=Subquery(ativo_do_evento.values('id')[:1]),
+        r_ticker=F('ticker'),
+        r_nome=Subquery(ativo_do_evento.values('nome_empresa')[:1]),
+        r_data=F('data_pagamento'),
+        r_valor=F('valor_por_acao'),
+        r_fonte=Value('api', output_field=CharField()),
+        r_observacoes=Value(None, output_field=TextField()),
+        r_criacao=F('data_criacao'),
+        r_atualizacao=F('data_criacao'),
+        r_editavel=Value(False, output_field=BooleanField()),
+        r_data_com=Coalesce('data_com', 'data_pagamento'),
+    ).values(*COLUNAS).order_by()
+
+    return proprios.union(eventos, all=True).order_by('-r_data', '-r_criacao')
+
+
+# Pagamentos consolidados dos ativos informados como arrays paralelos (id do ativo, dias desde 1970-01-01,
+# valor por ação), para os cálculos vetorizados (indicadores, backtest). Com ajustado=True os valores
+# são levados para a base de ações atual pelos eventos corporativos de cada ticker, pela data com
+# (lançamentos próprios, que não a têm, pela data de pagamento).
+def arrays_consolidados(usuario_id: int, ativos_ids, data_inicio=None, data_fim=None,
+                        ajustado: bool = False) -> Tuple[np.ndarray, ...]:
+    linhas, tickers = [], {}
+    for l in dividendos_usuario(usuario_id, data_inicio=data_inicio, data_fim=data_fim, ativos_ids=ativos_ids).iterator():
+        linhas.append((l['r_ativo'], series.para_dia(l['r_data']), float(l['r_valor']), series.para_dia(l['r_data_com'])))
+        tickers[l['r_ativo']] = l['r_ticker']
+    colunas = np.array(linhas, dtype=np.float64).reshape(-1, 4)
+    ativos, dias, valores = colunas[:, 0].astype(np.int64), colunas[:, 1].astype(np.int32), colunas[:, 2]
+    if ajustado:
+        dias_com = colunas[:, 3].astype(np.int32)
+        for ativo_id, ticker in tickers.items():
+            linhas_ativo = ativos == ativo_id
+            valores[linhas_ativo] = series.ajustar(ticker, dias_com[linhas_ativo], valores[linhas_ativo])
+    return ativos, dias, valores
+
+
+# Soma dos valores por ação pagos a partir de uma data para um ativo (lançamentos próprios + eventos).
+def total_dividendos_desde(ativo: Ativo, desde) -> Decimal:
+    proprios = HistoricoDividendo.objects.filter(
+        ativo=ativo, data_pagamento__gte=desde
+    ).aggregate(total=Sum('valor_por_acao'))['total']
+    eventos = _eventos_visiveis(
+        Ativo.objects.filter(id=ativo.id), ativo.usuario_id
+    ).filter(data_pagamento__gte=desde).aggregate(total=Sum('valor_por_acao'))['total']
+    return (proprios or Decimal('0')) + (eventos or Decimal('0'))
+
+
+# Início da janela de total_dividendos_ano (últimos 365 dias).
+def inicio_ano_dividendos():
+    return timezone.localdate() - timedelta(days=365)
+
+
+# Anota em cada ativo do queryset total_dividendos (mesma soma de total_dividendos_desde) com subconsultas
+# correlacionadas: a página inteira sai na mesma consulta dos ativos, sem duas consultas por ativo.
+def anotar_total_dividendos(ativos, desde):
+    proprios = HistoricoDividendo.objects.filter(ativo_id=OuterRef('id'), data_pagamento__gte=desde) \
+        .order_by().values('ativo_id').annotate(total=Sum('valor_por_acao')).values('total')
+    sobrescritos = HistoricoDividendo.objects.filter(
+        ativo_id=OuterRef(OuterRef('id')), data_pagamento=OuterRef('data_pagamento')
+    )
+    eventos = EventoDividendo.objects.filter(ticker=OuterRef('ticker'), data_pagamento__gte=desde) \
+        .exclude(Exists(sobrescritos)).order_by().values('ticker').annotate(total=Sum('valor_por_acao')).values('total')
+    zero = Value(Decimal('0'), output_field=DecimalField())
+    return ativos.annotate(total_dividendos=(
+        Coalesce(Subquery(proprios, output_field=DecimalField()), zero)
+        + Coalesce(Subquery(eventos, output_field=DecimalField()), zero)
+    ))
+
+
+# Série mapeada de dividendos do ticker; se ainda não foi gravada (ex: eventos anteriores às séries), grava do banco.
+# Com ajustado=True, valores em R$ na base de ações atual (desdobramentos, grupamentos e bonificações).
+# Se o diretório das séries não puder ser lido ou gravado, calcula do banco sem guardar em cache.
+def serie_dividendos(ticker: str, ajustado: bool = False) -> series.Serie:
+    try:
+        if series.dividendos(ticker) is None:
+            series.gravar_dividendos(ticker)
+        serie = series.dividendos_ajustados(ticker) if ajustado else series.dividendos(ticker)
+    except OSError as e:
+        print(f"Erro ao ler séries de {ticker}: {e}")
+        serie = None
+    return serie if serie is not None else series.dividendos_banco(ticker, ajustado)
+
+
+# Resumo de várias janelas (total, anualizado, yield) de um ticker a partir do histórico local.
+# O histórico completo é importado da Brapi só se ausente ou mais antigo que VALIDADE_IMPORTACAO.
+def resumo_janelas_ticker(ticker: str, janelas: List[str], nome: str = '', setor: Optional[str] = None,
+                          hoje=None) -> List[Dict]:
+    ticker = ticker.upper().strip()
+    importar_eventos_ticker(ticker, nome=nome, setor=setor)
+    serie = serie_dividendos(ticker, ajustado=True)
+    preco = TickerCatalogo.objects.filter(ticker=ticker).values_list('ultimo_preco', flat=True).first()
+    hoje = hoje or timezone.localdate()
+    return [series.resumo_janela(serie, janela, hoje, preco) for janela in janelas]
+
+
+# Yield anualizado de um ticker em uma janela, calculado sobre o histórico local.
+def yield_ticker(ticker: str, janela: str = '1y') -> Optional[Decimal]:
+    return resumo_janelas_ticker(ticker, [janela])[0]['yield_anualizado']
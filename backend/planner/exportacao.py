@@ -0,0 +1,39 @@
+"""
+Geradores para exportação em streaming (CSV e NDJSON) sem materializar instâncias de modelo.
+"""
+
+import csv
+import json
+from datetime import date, datetime
+
+from django.utils import timezone
+
+
+# Buffer mínimo exigido pelo csv.writer: devolve a linha escrita em vez de armazená-la.
+class _Eco:
+    def write(self, valor):
+        return valor
+
+
+# Normaliza datas para ISO 8601; instantes (gravados em UTC) saem no fuso local (settings.TIME_ZONE),
+# com o deslocamento. Demais valores seguem inalterados.
+def _valor(valor):
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.localtime(valor).isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+
+# Gera o CSV linha a linha a partir de dicionários (ex: queryset.values().iterator()).
+def gerar_csv(linhas, campos):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(campos)
+    for linha in linhas:
+        yield writer.writerow([_valor(linha[campo]) for campo in campos])
+
+
+# Gera NDJSON (um objeto JSON por linha); Decimal e datas viram string para preservar a precisão.
+def gerar_ndjson(linhas, campos):
+    for linha in linhas:
+        yield json.dumps({campo: _valor(linha[campo]) for campo in campos}, default=str, ensure_ascii=False) + '\n'
@@ -0,0 +1,207 @@
+"""
+Importação em massa de dividendos a partir de arquivos CSV (extratos de corretora, planilhas).
+
+O arquivo é lido linha a linha (sem carregar tudo em memória) e processado em lotes:
+cada lote é validado, tem os duplicados descartados com uma única consulta e é gravado
+com bulk_create.
+"""
+
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+from .models import Ativo, HistoricoDividendo
+from .painel import marcar_painel
+
+
+# Nomes de coluna aceitos para cada campo (cabeçalhos comuns em extratos de corretoras).
+COLUNAS = {
+    'ticker': ['ticker', 'ativo', 'codigo', 'código', 'papel', 'produto'],
+    'data_pagamento': ['data_pagamento', 'data', 'pagamento', 'data de pagamento'],
+    'valor_por_acao': ['valor_por_acao', 'valor', 'valor por ação', 'valor por acao', 'preço unitário', 'preco unitario'],
+    'observacoes': ['observacoes', 'observações', 'descricao', 'descrição', 'evento'],
+}
+
+FORMATOS_DATA = ['%d/%m/%Y', '%d-%m-%Y']
+
+MAX_ERROS_RELATORIO = 1000
+
+
+# Erro de formato do arquivo como um todo (ex: cabeçalho sem as colunas obrigatórias).
+class ArquivoInvalidoError(ValueError):
+    pass
+
+
+# Mapeia o cabeçalho do arquivo para os campos internos, retornando {campo: nome_da_coluna}.
+def _mapear_colunas(cabecalho: List[str]) -> Dict[str, str]:
+    normalizado = {(c or '').strip().lower(): c for c in cabecalho}
+    mapa = {}
+    for campo, aliases in COLUNAS.items():
+        for alias in aliases:
+            if alias in normalizado:
+                mapa[campo] = normalizado[alias]
+                break
+    faltando = [c for c in ('ticker', 'data_pagamento', 'valor_por_acao') if c not in mapa]
+    if faltando:
+        raise ArquivoInvalidoError(f'Colunas obrigatórias ausentes: {", ".join(faltando)}')
+    return mapa
+
+
+def _parse_data(valor: str):
+    # Caminho rápido para ISO 8601 (bem mais barato que strptime)
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        pass
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Data inválida: {valor!r}')
+
+
+# Converte valores como "1,2345", "R$ 0,50" ou "1.234,56" para Decimal com 4 casas.
+def _parse_valor(valor: str) -> Decimal:
+    texto = valor.replace('R$', '').strip()
+    if ',' in texto and '.' in texto:
+        # O último separador é o decimal: "1.234,56" (BR) ou "1,234.56" (US)
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif ',' in texto:
+        texto = texto.replace(',', '.')
+    try:
+        decimal = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError(f'Valor inválido: {valor!r}')
+    # "NaN", "Infinity" e afins são aceitos por Decimal(), mas não são valores
+    if not decimal.is_finite():
+        raise ValueError(f'Valor inválido: {valor!r}')
+    if decimal < 0:
+        raise ValueError('O valor por ação não pode ser negativo')
+    try:
+        decimal = decimal.quantize(Decimal('0.0001'))
+    except InvalidOperation:
+        # Expoentes enormes (ex: "1e100") não cabem na precisão do contexto
+        raise ValueError(f'Valor fora do limite permitido: {valor!r}')
+    if decimal >= Decimal('1000000'):
+        raise ValueError(f'Valor fora do limite permitido: {valor!r}')
+    return decimal
+
+
+# Abre o upload como texto em streaming e detecta o delimitador (',' ou ';') pelo cabeçalho.
+def abrir_csv(arquivo, delimitador: Optional[str] = None) -> csv.DictReader:
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', errors='replace', newline='')
+    if delimitador is None:
+        primeira_linha = texto.readline()
+        delimitador = ';' if primeira_linha.count(';') > primeira_linha.count(',') else ','
+        linhas = _reencadear(primeira_linha, texto)
+    else:
+        linhas = texto
+    return csv.DictReader(linhas, delimiter=delimitador)
+
+
+def _reencadear(primeira: str, resto: Iterable[str]):
+    yield primeira
+    yield from resto
+
+
+# Importa os dividendos de um CSV para os ativos do usuário e retorna o relatório por linha.
+def importar_dividendos_csv(arquivo, usuario_id: int, tamanho_lote: int = 1000,
+                            delimitador: Optional[str] = None, observacao: str = '') -> Dict:
+    leitor = abrir_csv(arquivo, delimitador)
+    try:
+        cabecalho = leitor.fieldnames or []
+    except csv.Error as e:
+        raise ArquivoInvalidoError(f'Cabeçalho ilegível: {e}')
+    mapa = _mapear_colunas(cabecalho)
+
+    # Um único dicionário ticker -> id resolve todas as linhas do arquivo
+    ativos = dict(Ativo.objects.filter(usuario_id=usuario_id).values_list('ticker', 'id'))
+
+    relatorio = {'total_linhas': 0, 'importados': 0, 'duplicados': 0, 'erros': [], 'total_erros': 0}
+    lote = []
+
+    def registrar_erro(linha, mensagem):
+        relatorio['total_erros'] += 1
+        if len(relatorio['erros']) < MAX_ERROS_RELATORIO:
+            relatorio['erros'].append({'linha': linha, 'erro': mensagem})
+
+    # Linha 1 é o cabeçalho. Linhas que o módulo csv não consegue ler (ex: campo acima do limite)
+    # entram no relatório e a leitura segue na próxima
+    numero = 1
+    while True:
+        numero += 1
+        try:
+            registro = next(leitor)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            relatorio['total_linhas'] += 1
+            registrar_erro(numero, f'Linha ilegível: {e}')
+            continue
+
+        relatorio['total_linhas'] += 1
+        try:
+            if any('\x00' in (v or '') for v in registro.values() if isinstance(v, str)):
+                raise ValueError('A linha contém caracteres nulos')
+            ticker = (registro.get(mapa['ticker']) or '').upper().strip()
+            # Extratos costumam trazer "ITUB4 - ITAU UNIBANCO": usa só o código
+            ticker = ticker.split(' ')[0] if ticker else ticker
+            if ticker not in ativos:
+                raise ValueError(f'Ticker {ticker!r} não cadastrado nos seus ativos')
+            data = _parse_data((registro.get(mapa['data_pagamento']) or '').strip())
+            valor = _parse_valor(registro.get(mapa['valor_por_acao']) or '')
+            obs = (registro.get(mapa['observacoes']) or '').strip() if 'observacoes' in mapa else ''
+        except ValueError as e:
+            registrar_erro(numero, str(e))
+            continue
+
+        lote.append(HistoricoDividendo(
+            ativo_id=ativos[ticker],
+            data_pagamento=data,
+            valor_por_acao=valor,
+            fonte='manual',
+            observacoes=obs or observacao or None,
+        ))
+        if len(lote) >= tamanho_lote:
+            _gravar_lote(lote, relatorio)
+            lote = []
+
+    if lote:
+        _gravar_lote(lote, relatorio)
+
+    if relatorio['importados']:
+        marcar_painel([usuario_id], carteira=True)
+
+    return relatorio
+
+
+# Descarta duplicados (no lote e já gravados) com uma consulta e insere o restante com bulk_create.
+def _gravar_lote(lote: List[HistoricoDividendo], relatorio: Dict) -> None:
+    existentes = set(
+        HistoricoDividendo.objects.filter(
+            ativo_id__in={d.ativo_id for d in lote},
+            data_pagamento__in={d.data_pagamento for d in lote},
+        ).values_list('ativo_id', 'data_pagamento', 'valor_por_acao')
+    )
+
+    novos = []
+    for dividendo in lote:
+        chave = (dividendo.ativo_id, dividendo.data_pagamento, dividendo.valor_por_acao)
+        if chave in existentes:
+            relatorio['duplicados'] += 1
+            continue
+        existentes.add(chave)
+        novos.append(dividendo)
+
+    # ignore_conflicts protege contra importações concorrentes do mesmo arquivo
+    with transaction.atomic():
+        HistoricoDividendo.objects.bulk_create(novos, batch_size=500, ignore_conflicts=True)
+    relatorio['importados'] += len(novos)
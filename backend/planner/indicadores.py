@@ -0,0 +1,174 @@
+"""
+Indicadores de crescimento e consistência dos dividendos (GET /api/ativos/analytics/).
+
+Calculados sobre os totais anuais dos anos completos (o ano corrente fica de fora):
+- cagr_5a: crescimento anual composto entre o total de 5 anos atrás e o do último ano completo (%);
+- regularidade_5a: fração dos últimos 5 anos com pelo menos um pagamento;
+- pagamentos_por_ano: média de pagamentos por ano nos últimos 5 anos;
+- anos_consecutivos_pagando / anos_consecutivos_crescendo: sequências que terminam no último ano completo;
+- volatilidade_5a: coeficiente de variação (desvio padrão / média) dos totais anuais dos últimos 5 anos.
+
+Todos os tickers são calculados de uma vez: os pagamentos viram uma matriz grupo x ano (np.add.at)
+e cada indicador é uma operação sobre as linhas dessa matriz. O resultado sobre os eventos
+compartilhados fica em IndicadorTicker até chegarem novos eventos do ticker ou virar o ano. Ativos
+com lançamentos próprios do usuário usam o histórico consolidado dele e não entram no cache.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.utils import timezone
+
+from . import series
+from .dividendos import arrays_consolidados, serie_dividendos
+from .models import Ativo, HistoricoDividendo, IndicadorTicker, TickerCatalogo
+
+
+# Anos completos considerados (limite das sequências).
+ANOS_HISTORICO = 20
+
+# Anos completos das métricas de janela (CAGR, regularidade, volatilidade).
+ANOS_JANELA = 5
+
+CAMPOS_ORDENACAO = [
+    'ticker', 'cagr_5a', 'regularidade_5a', 'pagamentos_por_ano', 'anos_consecutivos_pagando',
+    'anos_consecutivos_crescendo', 'volatilidade_5a', 'total_ultimo_ano', 'yield_ultimo_ano',
+]
+
+
+def _arredondar(valor, casas: int) -> Optional[float]:
+    return None if np.isnan(valor) else round(float(valor), casas)
+
+
+# Calcula os indicadores de G grupos a partir de arrays paralelos de pagamentos:
+# grupos (0..G-1), dias (int, desde 1970-01-01) e valores por ação (float). Retorna uma lista com G dicionários.
+def calcular(grupos: np.ndarray, dias: np.ndarray, valores: np.ndarray, quantidade: int,
+             ano_referencia: int) -> List[Dict]:
+    primeiro_ano = ano_referencia - ANOS_HISTORICO
+    anos = np.asarray(dias).astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64) + 1970
+    dentro = (anos >= primeiro_ano) & (anos < ano_referencia)
+    linhas, colunas = np.asarray(grupos)[dentro], anos[dentro] - primeiro_ano
+
+    totais = np.zeros((quantidade, ANOS_HISTORICO))
+    np.add.at(totais, (linhas, colunas), np.asarray(valores, dtype=np.float64)[dentro])
+    contagens = np.zeros((quantidade, ANOS_HISTORICO), dtype=np.int64)
+    np.add.at(contagens, (linhas, colunas), 1)
+
+    pagou = totais > 0
+    cresceu = np.zeros_like(pagou)
+    cresceu[:, 1:] = pagou[:, 1:] & pagou[:, :-1] & (totais[:, 1:] > totais[:, :-1])
+    # Sequências terminando no último ano: produto acumulado da direita para a esquerda
+    pagando = np.cumprod(pagou[:, ::-1], axis=1).sum(axis=1)
+    crescendo = np.cumprod(cresceu[:, ::-1], axis=1).sum(axis=1)
+
+    janela = totais[:, -ANOS_JANELA:]
+    inicio, fim = janela[:, 0], janela[:, -1]
+    media = janela.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where((inicio > 0) & (fim > 0), ((fim / inicio) ** (1 / (ANOS_JANELA - 1)) - 1) * 100, np.nan)
+        volatilidade = np.where(media > 0, janela.std(axis=1) / media, np.nan)
+    regularidade = pagou[:, -ANOS_JANELA:].mean(axis=1)
+    pagamentos_por_ano = contagens[:, -ANOS_JANELA:].mean(axis=1)
+
+    return [{
+        'ano_referencia': ano_referencia,
+        'anos_com_pagamento': int(pagou[g].sum()),
+        'total_ultimo_ano': round(float(fim[g]), 4),
+        'cagr_5a': _arredondar(cagr[g], 2),
+        'regularidade_5a': round(float(regularidade[g]), 2),
+        'pagamentos_por_ano': round(float(pagamentos_por_ano[g]), 2),
+        'anos_consecutivos_pagando': int(pagando[g]),
+        'anos_consecutivos_crescendo': int(crescendo[g]),
+        'volatilidade_5a': _arredondar(volatilidade[g], 4),
+    } for g in range(quantidade)]
+
+
+# Indicadores dos tickers sobre os eventos compartilhados, lidos de IndicadorTicker ou calculados
+# (todos os ausentes de uma vez, a partir das séries colunares) e gravados no cache.
+def indicadores_tickers(tickers: Iterable[str], ano_referencia: int) -> Dict[str, Dict]:
+    tickers = sorted({t.upper() for t in tickers})
+    resultado = dict(
+        IndicadorTicker.objects.filter(ticker__in=tickers, ano_referencia=ano_referencia).values_list('ticker', 'dados')
+    )
+    faltantes = [t for t in tickers if t not in resultado]
+    if not faltantes:
+        return resultado
+
+    # Valores ajustados por desdobramentos, grupamentos e bonificações (planner.ajustes)
+    lidas = [serie_dividendos(t, ajustado=True) for t in faltantes]
+    grupos = np.repeat(np.arange(len(faltantes)), [len(s.datas) for s in lidas])
+    dias = np.concatenate([s.datas for s in lidas])
+    valores = np.concatenate([s.valores for s in lidas])
+    calculados = calcular(grupos, dias, valores, len(faltantes), ano_referencia)
+
+    IndicadorTicker.objects.bulk_create(
+        [IndicadorTicker(ticker=t, dados=d, ano_referencia=ano_referencia) for t, d in zip(faltantes, calculados)],
+        update_conflicts=True, unique_fields=['ticker'], update_fields=['dados', 'ano_referencia', 'data_calculo'],
+    )
+    resultado.update(zip(faltantes, calculados))
+    return resultado
+
+
+# Indicadores de cada ativo do usuário, com o yield do último ano completo pelo último preço conhecido.
+def indicadores_usuario(usuario_id: int, hoje: Optional[date] = None) -> List[Dict]:
+    ano = (hoje or timezone.localdate()).year
+    ativos = list(Ativo.objects.filter(usuario_id=usuario_id).values('id', 'ticker', 'nome_empresa', 'setor'))
+    com_proprios = set(
+        HistoricoDividendo.objects.filter(ativo__usuario_id=usuario_id).values_list('ativo_id', flat=True).distinct()
+    )
+
+    compartilhados = indicadores_tickers([a['ticker'] for a in ativos if a['id'] not in com_proprios], ano)
+
+    # Ativos com lançamentos próprios: histórico consolidado do usuário, também em uma única passada
+    proprios = {}
+    ids = sorted(a['id'] for a in ativos if a['id'] in com_proprios)
+    if ids:
+        ativos_pagamentos, dias, valores = arrays_consolidados(
+            usuario_id, ids, data_inicio=date(ano - ANOS_HISTORICO, 1, 1), data_fim=date(ano - 1, 12, 31), ajustado=True
+        )
+        grupos = np.searchsorted(np.array(ids), ativos_pagamentos)
+        proprios = dict(zip(ids, calcular(grupos, dias, valores, len(ids), ano)))
+
+    precos = dict(
+        TickerCatalogo.objects.filter(ticker__in={a['ticker'] for a in ativos}, ultimo_preco__isnull=False)
+        .values_list('ticker', 'ultimo_preco')
+    )
+
+    itens = []
+    for ativo in ativos:
+        dados = proprios[ativo['id']] if ativo['id'] in proprios else compartilhados[ativo['ticker'].upper()]
+        preco = precos.get(ativo['ticker'])
+        itens.append({
+            'ativo': ativo['id'],
+            'ticker': ativo['ticker'],
+            'nome_empresa': ativo['nome_empresa'],
+            'setor': ativo['setor'],
+            **dados,
+            'yield_ultimo_ano': round(dados['total_ultimo_ano'] / float(preco) * 100, 2) if preco else None,
+            'historico_proprio': ativo['id'] in proprios,
+        })
+    return itens
+
+
+# Ordena os itens por um campo de CAMPOS_ORDENACAO ('-campo' para decrescente); valores nulos ficam no fim.
+def ordenar(itens: List[Dict], campo: str) -> List[Dict]:
+    decrescente = campo.startswith('-')
+    campo = campo.lstrip('-')
+    if campo not in CAMPOS_ORDENACAO:
+        raise ValueError(f'Campo de ordenação inválido: {campo}. Use: {", ".join(CAMPOS_ORDENACAO)}')
+    com_valor = [i for i in itens if i[campo] is not None]
+    sem_valor = [i for i in itens if i[campo] is None]
+    return sorted(com_valor, key=lambda i: i[campo], reverse=decrescente) + sem_valor
+
+
+# Descarta os indicadores em cache dos tickers (novos eventos importados ou editados).
+def invalidar(tickers: Iterable[str]) -> int:
+    return IndicadorTicker.objects.filter(ticker__in=[t.upper() for t in tickers]).delete()[0]
+
+
+# Receptor de post_save/post_delete de EventoDividendo (conectado em apps.ready): edições feitas fora da
+# importação (ex: admin) também atualizam a série colunar e descartam os indicadores do ticker.
+def ao_alterar_evento(sender, instance, **kwargs):
+    series.gravar_apos_commit(series.gravar_dividendos, instance.ticker)
+    invalidar([instance.ticker])
@@ -0,0 +1,77 @@
+"""
+Janelas de tempo (3m, 1y, 5y, YTD, max...) sobre séries locais de dividendos.
+
+O histórico completo de um ticker é buscado uma única vez na Brapi e guardado localmente;
+qualquer janela é respondida fatiando a série ordenada por data (busca binária), com
+anualização proporcional ao tamanho da janela. Novas janelas não geram chamadas à Brapi.
+"""
+
+import bisect
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional, Sequence, Tuple
+
+
+# Tamanho em dias das janelas fixas; 'ytd' (desde 1º de janeiro) e 'max' (toda a série) são calculadas.
+JANELAS = {
+    '1m': 30,
+    '3m': 91,
+    '6m': 182,
+    '1y': 365,
+    '2y': 730,
+    '5y': 1826,
+    '10y': 3652,
+}
+
+JANELAS_VALIDAS = list(JANELAS) + ['ytd', 'max']
+
+DIAS_ANO = Decimal('365')
+
+
+# Data inicial (inclusiva) da janela terminando em hoje. Para 'max', a primeira data da série.
+def inicio_janela(janela: str, hoje: date, primeira_data: Optional[date] = None) -> date:
+    if janela == 'ytd':
+        return date(hoje.year, 1, 1)
+    if janela == 'max':
+        return primeira_data or hoje
+    if janela not in JANELAS:
+        raise ValueError(f'Janela inválida: {janela}. Use uma de: {", ".join(JANELAS_VALIDAS)}')
+    return hoje - timedelta(days=JANELAS[janela]) + timedelta(days=1)
+
+
+# Soma os valores com data em [inicio, fim] de uma série ordenada por data. Retorna (total, quantidade).
+def somar_janela(datas: Sequence[date], valores: Sequence[Decimal], inicio: date, fim: date) -> Tuple[Decimal, int]:
+    i = bisect.bisect_left(datas, inicio)
+    j = bisect.bisect_right(datas, fim)
+    return sum(valores[i:j], Decimal('0')), j - i
+
+
+# Converte o total pago em uma janela para o equivalente anual (total * 365 / dias da janela).
+def anualizar(total: Decimal, inicio: date, fim: date) -> Decimal:
+    dias = (fim - inicio).days + 1
+    if dias <= 0:
+        return Decimal('0')
+    return total * DIAS_ANO / Decimal(dias)
+
+
+# Resumo de uma janela sobre a série: total, quantidade de pagamentos, total anualizado e yield (se houver preço).
+def resumo_janela(datas: Sequence[date], valores: Sequence[Decimal], janela: str, hoje: date,
+                  preco: Optional[Decimal] = None) -> dict:
+    inicio = inicio_janela(janela, hoje, datas[0] if datas else None)
+    total, quantidade = somar_janela(datas, valores, inicio, hoje)
+    return montar_resumo(janela, inicio, hoje, total, quantidade, preco)
+
+
+# Monta o dicionário de resumo a partir do total já somado (compartilhado com o leitor de planner.series).
+def montar_resumo(janela: str, inicio: date, fim: date, total: Decimal, quantidade: int,
+                  preco: Optional[Decimal] = None) -> dict:
+    anual = anualizar(total, inicio, fim)
+    return {
+        'janela': janela,
+        'inicio': inicio,
+        'fim': fim,
+        'pagamentos': quantidade,
+        'total_por_acao': total.quantize(Decimal('0.0001')),
+        'anualizado_por_acao': anual.quantize(Decimal('0.0001')),
+        'yield_anualizado': (anual / preco * Decimal('100')).quantize(Decimal('0.01')) if preco else None,
+    }
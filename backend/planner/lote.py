@@ -0,0 +1,228 @@
+"""
+Requisições compostas (POST /api/batch/): várias chamadas à API em uma única requisição HTTP.
+
+Cada sub-requisição é resolvida pelas mesmas rotas de planner/urls.py e executada no próprio processo,
+chamando a view diretamente (sem o custo dos middlewares e da viagem de ida e volta do navegador),
+com o usuário já autenticado na requisição do lote e em uma única transação do banco.
+
+As chamadas à Brapi que as sub-requisições farão (previstas por PRE_CARREGAMENTO a partir da rota) são
+feitas antes, em paralelo e fora da transação; durante a execução, BrapiService.get_quote responde com
+essas respostas (BrapiService.respostas_em_lote). Assim N buscas de ticker custam a latência de uma.
+
+Com atomico=True (padrão) a primeira sub-requisição com erro (status >= 400) desfaz todas as gravações
+do lote e as seguintes não são executadas; com atomico=False cada uma é desfeita isoladamente.
+"""
+
+import asyncio
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from urllib.parse import parse_qs, urlencode
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+from .brapi_service import BrapiService
+from .dividendos import importacao_pendente
+from .models import Ativo
+
+
+# Quantidade máxima de sub-requisições por lote.
+LIMITE_SUBREQUISICOES = 50
+
+# Chamadas simultâneas à Brapi no pré-carregamento.
+MAX_CHAMADAS_PARALELAS = 8
+
+METODOS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Prefixo das rotas de planner/urls.py (dividendos_planner/urls.py); só elas podem ser usadas em um lote.
+PREFIXO_API = '/api/'
+
+# Cabeçalhos da requisição do lote que não se aplicam às sub-requisições.
+_CABECALHOS_IGNORADOS = ('HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_PREFER')
+
+
+# Erro no formato do lote (mensagem exibida ao usuário).
+class LoteErro(ValueError):
+    pass
+
+
+# Valida o corpo do lote: lista de {"id", "metodo", "caminho", "parametros", "corpo"}.
+def validar_lote(itens) -> List[Dict]:
+    if not isinstance(itens, list) or not itens:
+        raise LoteErro('Envie uma lista não vazia de sub-requisições.')
+    if len(itens) > LIMITE_SUBREQUISICOES:
+        raise LoteErro(f'No máximo {LIMITE_SUBREQUISICOES} sub-requisições por lote.')
+
+    validados = []
+    for indice, item in enumerate(itens):
+        if not isinstance(item, dict):
+            raise LoteErro(f'Sub-requisição {indice}: esperado um objeto.')
+        metodo = str(item.get('metodo', 'GET')).upper()
+        if metodo not in METODOS:
+            raise LoteErro(f'Sub-requisição {indice}: método inválido ({metodo}).')
+        caminho = str(item.get('caminho') or '')
+        if not caminho:
+            raise LoteErro(f'Sub-requisição {indice}: caminho é obrigatório.')
+        caminho, _, consulta = caminho.partition('?')
+        if not caminho.startswith('/'):
+            caminho = PREFIXO_API + caminho
+        if not caminho.startswith(PREFIXO_API):
+            raise LoteErro(f'Sub-requisição {indice}: só rotas da API ({PREFIXO_API}...) podem ser usadas em um lote.')
+        parametros = item.get('parametros') or {}
+        if not isinstance(parametros, dict):
+            raise LoteErro(f'Sub-requisição {indice}: parametros deve ser um objeto.')
+        validados.append({
+            'id': item.get('id', indice),
+            'metodo': metodo,
+            'caminho': caminho,
+            'consulta': '&'.join(p for p in (consulta, urlencode(parametros, doseq=True)) if p),
+            'corpo': item.get('corpo'),
+        })
+    return validados
+
+
+def _ticker_do_ativo(match, usuario_id):
+    return Ativo.objects.filter(id=match.kwargs.get('pk'), usuario_id=usuario_id) \
+        .values_list('ticker', flat=True).first()
+
+
+def _assincrono(item) -> bool:
+    return parse_qs(item['consulta']).get('assincrono', [''])[-1] in ('1', 'true')
+
+
+def _buscar_dados(item, match, usuario_id):
+    ticker = (item['corpo'] or {}).get('ticker') if isinstance(item['corpo'], dict) else None
+    return [BrapiService.chave_quote(ticker, '1y', True)] if ticker else []
+
+
+def _importar(item, match, usuario_id):
+    # Mesma chamada de importar_eventos_ticker, só quando a importação de fato aconteceria
+    # (a importação assíncrona só enfileira uma tarefa)
+    if match.url_name == 'ativo-importar-dividendos-brapi' and _assincrono(item):
+        return []
+    ticker = _ticker_do_ativo(match, usuario_id)
+    if not ticker or not importacao_pendente(ticker):
+        return []
+    return [BrapiService.chave_quote(ticker, 'max', True, '1mo')]
+
+
+# Rotas que chamam a Brapi: nome da rota -> função (item, match, usuario_id) com as chaves de get_quote.
+PRE_CARREGAMENTO: Dict[str, Callable] = {
+    'ativo-buscar-dados-brapi': _buscar_dados,
+    'ativo-importar-dividendos-brapi': _importar,
+    'ativo-janelas': _importar,
+}
+
+
+# Resolve o caminho apenas nas rotas de planner/urls.py (nunca admin ou outras views do site).
+def _resolver(caminho):
+    if not caminho.startswith(PREFIXO_API):
+        return None
+    try:
+        return resolve(caminho[len(PREFIXO_API) - 1:], urlconf='planner.urls')
+    except Resolver404:
+        return None
+
+
+# Faz em paralelo as chamadas à Brapi previstas para o lote. Retorna {chave_quote: resposta}.
+def pre_carregar(itens: List[Dict], usuario_id: int) -> Dict[tuple, Dict]:
+    chaves = set()
+    for item in itens:
+        match = _resolver(item['caminho'])
+        if match is not None and match.url_name in PRE_CARREGAMENTO:
+            chaves.update(PRE_CARREGAMENTO[match.url_name](item, match, usuario_id))
+    if not chaves:
+        return {}
+
+    chaves = sorted(chaves, key=repr)
+    with ThreadPoolExecutor(max_workers=min(MAX_CHAMADAS_PARALELAS, len(chaves))) as executor:
+        respostas = list(executor.map(lambda chave: BrapiService.get_quote(*chave), chaves))
+    return dict(zip(chaves, respostas))
+
+
+# Monta a requisição Django de uma sub-requisição a partir da requisição do lote (mesmos cookies e cabeçalhos).
+def _subrequisicao(request, item, match) -> WSGIRequest:
+    corpo = b'' if item['corpo'] is None else json.dumps(item['corpo']).encode('utf-8')
+    meta = {
+        chave: valor for chave, valor in request.META.items()
+        if isinstance(chave, str) and chave.isupper() and chave not in _CABECALHOS_IGNORADOS
+    }
+    meta.update({
+        'REQUEST_METHOD': item['metodo'],
+        'PATH_INFO': item['caminho'],
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': item['consulta'],
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(corpo)),
+        'wsgi.input': io.BytesIO(corpo),
+    })
+    meta.setdefault('SERVER_NAME', 'localhost')
+    meta.setdefault('SERVER_PORT', '80')
+    meta.setdefault('wsgi.url_scheme', request.scheme)
+    sub = WSGIRequest(meta)
+    # Como no handler do Django (usado por ex. na raiz da API e nos links da API navegável)
+    sub.resolver_match = match
+    # Autenticação e CSRF já verificados na requisição do lote
+    sub.user = request.user
+    sub._force_auth_user = request.user
+    sub._dont_enforce_csrf_checks = True
+    if hasattr(request, 'session'):
+        sub.session = request.session
+    return sub
+
+
+# Executa uma sub-requisição em um savepoint próprio (desfeito se ela falhar). Retorna {id, status, corpo}.
+def _executar(request, item) -> Dict:
+    match = _resolver(item['caminho'])
+    if match is None:
+        return {'id': item['id'], 'status': 404, 'corpo': {'erro': f'Rota não encontrada: {item["caminho"]}'}}
+    if (match.url_name or '').startswith('batch-') or asyncio.iscoroutinefunction(match.func):
+        return {'id': item['id'], 'status': 400, 'corpo': {'erro': 'Esta rota não pode ser usada em um lote.'}}
+
+    with transaction.atomic():
+        try:
+            response = match.func(_subrequisicao(request, item, match), *match.args, **match.kwargs)
+            # TemplateResponse e afins só têm conteúdo depois de renderizados (de Response do DRF basta .data)
+            if (not hasattr(response, 'data') and callable(getattr(response, 'render', None))
+                    and not getattr(response, 'is_rendered', True)):
+                response.render()
+        except Exception as e:
+            transaction.set_rollback(True)
+            return {'id': item['id'], 'status': 500, 'corpo': {'erro': f'Erro ao executar a sub-requisição: {e}'}}
+        if response.status_code >= 400:
+            transaction.set_rollback(True)
+
+    if response.streaming:
+        return {'id': item['id'], 'status': 400, 'corpo': {'erro': 'Respostas em streaming não são suportadas em um lote.'}}
+    if hasattr(response, 'data'):
+        corpo = response.data
+    else:
+        conteudo = response.content.decode(response.charset or 'utf-8')
+        try:
+            corpo = json.loads(conteudo) if conteudo else None
+        except ValueError:
+            corpo = conteudo
+    return {'id': item['id'], 'status': response.status_code, 'corpo': corpo}
+
+
+# Executa o lote e retorna (respostas na ordem recebida, se as gravações foram desfeitas).
+def executar_lote(request, itens: List[Dict], usuario_id: int, atomico: bool = True):
+    respostas, interrompido = [], False
+    with BrapiService.respostas_em_lote(pre_carregar(itens, usuario_id)):
+        with transaction.atomic():
+            for item in itens:
+                if interrompido:
+                    respostas.append({
+                        'id': item['id'], 'status': 424,
+                        'corpo': {'erro': 'Não executada: uma sub-requisição anterior falhou e o lote foi desfeito.'},
+                    })
+                    continue
+                resposta = _executar(request, item)
+                respostas.append(resposta)
+                interrompido = atomico and resposta['status'] >= 400
+            if interrompido:
+                transaction.set_rollback(True)
+    return respostas, interrompido
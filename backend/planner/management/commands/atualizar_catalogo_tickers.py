@@ -0,0 +1,33 @@
+"""
+Atualiza o catálogo global de tickers a partir da Brapi (/quote/list) ou de um arquivo local.
+
+Pensado para execução periódica (ex: cron diário):
+    python manage.py atualizar_catalogo_tickers
+    python manage.py atualizar_catalogo_tickers --offline            # fixture incluída no projeto
+    python manage.py atualizar_catalogo_tickers --arquivo lista.json  # mesmo formato do /quote/list
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner.catalogo import atualizar_catalogo_brapi, carregar_fixture, invalidar_indice
+
+
+class Command(BaseCommand):
+    help = 'Atualiza o catálogo de tickers (Brapi ou arquivo local).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--offline', action='store_true', help='Usa a fixture incluída no projeto')
+        parser.add_argument('--arquivo', default=None, help='Arquivo JSON no formato do /quote/list')
+        parser.add_argument('--limite-pagina', type=int, default=100)
+
+    def handle(self, *args, **options):
+        try:
+            if options['arquivo'] or options['offline']:
+                total = carregar_fixture(options['arquivo'])
+            else:
+                total = atualizar_catalogo_brapi(limite_pagina=options['limite_pagina'])
+        except (OSError, ValueError, KeyError, ConnectionError) as e:
+            raise CommandError(f'Falha ao atualizar o catálogo: {e}')
+
+        invalidar_indice()
+        self.stdout.write(self.style.SUCCESS(f'{total} tickers gravados no catálogo.'))
@@ -0,0 +1,209 @@
+"""
+Comando de benchmark reprodutível para os endpoints críticos da API.
+
+Uso:
+    python manage.py benchmark_api --usuarios 1000 --ativos-por-usuario 10 \
+        --dividendos-por-ativo 100 --latencia-brapi 50 --saida resultado.json
+    python manage.py benchmark_api --comparar resultado_anterior.json
+
+O benchmark roda em um banco de teste separado (nunca no banco configurado) e grava as séries
+colunares em um diretório temporário, com a API Brapi substituída por um stub local.
+"""
+
+import json
+import random
+import tempfile
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from planner.benchmark import (
+    BrapiStub, comparar_resultados, commit_atual, medir_cenario, popular_base_sintetica
+)
+from planner.brapi_service import BrapiService
+from planner.dividendos import importacao_pendente, importar_eventos_ticker
+from planner.models import Ativo, MetaRenda, TickerCatalogo
+
+
+CENARIOS = [
+    'listar_ativos', 'filtrar_ativos', 'listar_dividendos', 'filtrar_dividendos',
+    'importar_dividendos', 'importar_dividendos_cache', 'simular',
+]
+
+
+class Command(BaseCommand):
+    help = 'Executa o benchmark dos endpoints de listagem, filtro, importação e simulação.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=1000)
+        parser.add_argument('--ativos-por-usuario', type=int, default=10)
+        parser.add_argument('--dividendos-por-ativo', type=int, default=100)
+        parser.add_argument('--iteracoes', type=int, default=50, help='Requisições medidas por cenário')
+        parser.add_argument('--latencia-brapi', type=float, default=0.0, help='Latência do stub Brapi em ms')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=CENARIOS)
+        parser.add_argument('--saida', default='benchmark.json', help='Arquivo JSON de resultado')
+        parser.add_argument('--comparar', default=None, help='Resultado anterior (JSON) para comparação')
+        parser.add_argument('--keepdb', action='store_true', help='Mantém o banco de teste entre execuções')
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as f:
+                    anterior = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Não foi possível ler {options["comparar"]}: {e}')
+
+        setup_test_environment()
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        # As importações gravam séries colunares (planner.series): num diretório temporário, nunca no configurado
+        with tempfile.TemporaryDirectory(prefix='benchmark_series_') as diretorio_series, \
+                override_settings(PLANNER_SERIES={'DIRETORIO': diretorio_series}):
+            try:
+                resultado = self._executar(options)
+            finally:
+                connection.creation.destroy_test_db(nome_original, verbosity=0, keepdb=options['keepdb'])
+                teardown_test_environment()
+
+        with open(options['saida'], 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {options["saida"]}'))
+
+        for nome, dados in resultado['cenarios'].items():
+            lat = dados['latencia_ms']
+            self.stdout.write(
+                f'{nome:26} p50={lat["p50"]:9.2f}ms p95={lat["p95"]:9.2f}ms p99={lat["p99"]:9.2f}ms '
+                f'consultas={dados["consultas_por_requisicao"]["media"]:7.1f} '
+                f'memoria={dados["pico_memoria_kb"]:.0f}KB'
+            )
+
+        if anterior:
+            self.stdout.write('\nVariação em relação ao resultado anterior (%):')
+            for nome, variacoes in comparar_resultados(anterior, resultado).items():
+                self.stdout.write(f'{nome:26} {variacoes}')
+
+    # Popula a base de teste, sobe o stub da Brapi e mede cada cenário.
+    def _executar(self, options):
+        ids = popular_base_sintetica(
+            usuarios=options['usuarios'],
+            ativos_por_usuario=options['ativos_por_usuario'],
+            dividendos_por_ativo=options['dividendos_por_ativo'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        if not ids['usuarios']:
+            raise CommandError('É necessário pelo menos um usuário sintético.')
+
+        rnd = random.Random(options['seed'])
+        amostra = rnd.sample(ids['usuarios'], min(len(ids['usuarios']), 50))
+        ativos_por_usuario = defaultdict(list)
+        for ativo_id, usuario_id in Ativo.objects.filter(usuario_id__in=amostra).values_list('id', 'usuario_id'):
+            ativos_por_usuario[usuario_id].append(ativo_id)
+        metas_por_usuario = defaultdict(list)
+        for meta_id, usuario_id in MetaRenda.objects.filter(usuario_id__in=amostra).values_list('id', 'usuario_id'):
+            metas_por_usuario[usuario_id].append(meta_id)
+
+        usuarios = {u.id: u for u in User.objects.filter(id__in=amostra)}
+        cliente = APIClient()
+        um_ano_atras = (date.today() - timedelta(days=365)).isoformat()
+
+        # Autentica um usuário aleatório da amostra e retorna seu id
+        def autenticar():
+            usuario_id = rnd.choice(amostra)
+            cliente.force_authenticate(user=usuarios[usuario_id])
+            return usuario_id
+
+        def listar_ativos(i):
+            autenticar()
+            return cliente.get('/api/ativos/')
+
+        def filtrar_ativos(i):
+            autenticar()
+            return cliente.get('/api/ativos/', {'search': 'Banc'})
+
+        def listar_dividendos(i):
+            autenticar()
+            return cliente.get('/api/historico-dividendos/')
+
+        def filtrar_dividendos(i):
+            usuario_id = autenticar()
+            return cliente.get('/api/historico-dividendos/', {
+                'ativo': rnd.choice(ativos_por_usuario[usuario_id] or [0]),
+                'data_inicio': um_ano_atras,
+            })
+
+        # Importação: o ativo é escolhido em preparar_importacao (fora da medição), que também define
+        # se o ticker está com a importação em dia (em_cache, sem chamada à Brapi) ou vencida.
+        escolhido = {}
+
+        def preparar_importacao(em_cache):
+            def preparar(i):
+                usuario_id = autenticar()
+                ativo = Ativo.objects.filter(id=rnd.choice(ativos_por_usuario[usuario_id] or [0])).first()
+                escolhido['ativo_id'] = ativo.id if ativo else 0
+                if ativo is None:
+                    return
+                if not em_cache:
+                    TickerCatalogo.objects.filter(ticker=ativo.ticker).update(dividendos_importados_em=None)
+                elif importacao_pendente(ativo.ticker):
+                    importar_eventos_ticker(ativo.ticker)
+            return preparar
+
+        def importar_dividendos(i):
+            return cliente.post(f'/api/ativos/{escolhido["ativo_id"]}/importar_dividendos_brapi/')
+
+        def simular(i):
+            usuario_id = autenticar()
+            meta_id = rnd.choice(metas_por_usuario[usuario_id] or [0])
+            return cliente.post(f'/api/metas-renda/{meta_id}/simular/', {}, format='json')
+
+        funcoes = {
+            'listar_ativos': listar_ativos,
+            'filtrar_ativos': filtrar_ativos,
+            'listar_dividendos': listar_dividendos,
+            'filtrar_dividendos': filtrar_dividendos,
+            'importar_dividendos': importar_dividendos,
+            'importar_dividendos_cache': importar_dividendos,
+            'simular': simular,
+        }
+
+        # importar_dividendos sempre chama a Brapi (importação vencida); importar_dividendos_cache mede a resposta
+        # para um ticker importado há menos de VALIDADE_IMPORTACAO
+        preparacoes = {
+            'importar_dividendos': preparar_importacao(em_cache=False),
+            'importar_dividendos_cache': preparar_importacao(em_cache=True),
+        }
+
+        cenarios = {}
+        base_url_original = BrapiService.BASE_URL
+        with BrapiStub(latencia_ms=options['latencia_brapi']) as stub:
+            BrapiService.BASE_URL = stub.base_url
+            try:
+                for nome in options['cenarios']:
+                    self.stdout.write(f'Medindo {nome}...')
+                    cenarios[nome] = medir_cenario(funcoes[nome], options['iteracoes'], preparar=preparacoes.get(nome))
+            finally:
+                BrapiService.BASE_URL = base_url_original
+
+        return {
+            'commit': commit_atual(),
+            'data_execucao': timezone.now().isoformat(),
+            'banco': connection.vendor,
+            'parametros': {
+                'usuarios': options['usuarios'],
+                'ativos_por_usuario': options['ativos_por_usuario'],
+                'dividendos_por_ativo': options['dividendos_por_ativo'],
+                'iteracoes': options['iteracoes'],
+                'latencia_brapi_ms': options['latencia_brapi'],
+                'seed': options['seed'],
+            },
+            'cenarios': cenarios,
+        }
@@ -0,0 +1,135 @@
+"""
+Benchmark de serialização JSON e compressão das respostas da API.
+
+Gera linhas sintéticas no formato de /api/historico-dividendos/ (DividendoConsolidadoSerializer),
+mede a vazão do JSONRenderer padrão do DRF e do JSONRapidoRenderer (planner.renderers) e os bytes
+transferidos sem compressão e com cada codificação de CompressaoMiddleware. Não usa banco de dados.
+
+Uso:
+    python manage.py benchmark_json --linhas 10000 --iteracoes 20
+    python manage.py benchmark_json --saida json.json
+"""
+
+import gzip
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from planner.benchmark import commit_atual, percentil
+from planner.middleware import brotli
+from planner.renderers import JSONRapidoRenderer, orjson
+from planner.serializers import DividendoConsolidadoSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão dos renderizadores JSON e os bytes transferidos com e sem compressão.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10000)
+        parser.add_argument('--iteracoes', type=int, default=20, help='Renderizações medidas por renderizador')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--saida', default=None, help='Arquivo JSON de resultado (opcional)')
+
+    def handle(self, *args, **options):
+        linhas, iteracoes = options['linhas'], options['iteracoes']
+        dados = self._dados(linhas, options['seed'])
+
+        renderizadores = {'drf': JSONRenderer(), 'rapido': JSONRapidoRenderer()}
+        saidas, resultado_renderizadores = {}, {}
+        for nome, renderizador in renderizadores.items():
+            renderizador.render(dados)
+            tempos = []
+            for _ in range(iteracoes):
+                inicio = time.perf_counter()
+                saidas[nome] = renderizador.render(dados)
+                tempos.append(time.perf_counter() - inicio)
+            mediana = percentil(tempos, 50)
+            resultado_renderizadores[nome] = {
+                'mediana_ms': round(mediana * 1000, 3),
+                'linhas_por_segundo': round(linhas / mediana),
+                'mb_por_segundo': round(len(saidas[nome]) / mediana / 1e6, 1),
+                'bytes': len(saidas[nome]),
+            }
+        identica = json.loads(saidas['drf']) == json.loads(saidas['rapido'])
+
+        corpo = saidas['rapido']
+        compressores = {'identity': lambda c: c}
+        for nivel in (1, 6, 9):
+            compressores[f'gzip-{nivel}'] = lambda c, n=nivel: gzip.compress(c, compresslevel=n, mtime=0)
+        if brotli is not None:
+            for nivel in (4, 11):
+                compressores[f'br-{nivel}'] = lambda c, n=nivel: brotli.compress(c, quality=n)
+
+        resultado_compressao = {}
+        for nome, comprimir in compressores.items():
+            tempos = []
+            for _ in range(max(1, iteracoes // 4)):
+                inicio = time.perf_counter()
+                comprimido = comprimir(corpo)
+                tempos.append(time.perf_counter() - inicio)
+            resultado_compressao[nome] = {
+                'bytes': len(comprimido),
+                'razao': round(len(corpo) / len(comprimido), 2),
+                'mediana_ms': round(percentil(tempos, 50) * 1000, 3),
+            }
+
+        resultado = {
+            'commit': commit_atual(),
+            'data_execucao': timezone.now().isoformat(),
+            'parametros': {'linhas': linhas, 'iteracoes': iteracoes, 'seed': options['seed']},
+            'orjson': orjson is not None,
+            'brotli': brotli is not None,
+            'saida_identica': identica,
+            'renderizadores': resultado_renderizadores,
+            'compressao': resultado_compressao,
+        }
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {options["saida"]}'))
+
+        self.stdout.write(f'{linhas} linhas; orjson={"sim" if orjson else "não"}; saída idêntica={"sim" if identica else "NÃO"}')
+        for nome, r in resultado_renderizadores.items():
+            self.stdout.write(
+                f'{nome:10} {r["mediana_ms"]:9.2f}ms {r["linhas_por_segundo"]:>10} linhas/s '
+                f'{r["mb_por_segundo"]:7.1f}MB/s {r["bytes"]:>10} bytes'
+            )
+        base = resultado_renderizadores['drf']['mediana_ms']
+        if resultado_renderizadores['rapido']['mediana_ms']:
+            self.stdout.write(f'aceleração: {base / resultado_renderizadores["rapido"]["mediana_ms"]:.1f}x')
+        for nome, r in resultado_compressao.items():
+            self.stdout.write(f'{nome:10} {r["bytes"]:>10} bytes  razão {r["razao"]:5.2f}  {r["mediana_ms"]:8.2f}ms')
+
+    # Página da listagem consolidada já serializada (o que o renderizador recebe da view).
+    def _dados(self, linhas, seed):
+        rnd = random.Random(seed)
+        tickers = [(f'{letras}{n}', f'Empresa {letras}') for letras in ('ITUB', 'PETR', 'VALE', 'BBAS', 'TAEE', 'EGIE')
+                   for n in (3, 4)]
+        agora = timezone.now()
+        registros = []
+        for i in range(linhas):
+            ticker, nome = rnd.choice(tickers)
+            proprio = rnd.random() < 0.3
+            registros.append({
+                'r_id': i + 1 if proprio else None,
+                'r_ativo': tickers.index((ticker, nome)) + 1,
+                'r_ticker': ticker,
+                'r_nome': nome,
+                'r_data': date(2005, 1, 1) + timedelta(days=rnd.randrange(7300)),
+                'r_valor': Decimal(rnd.randrange(1, 30000)) / 10000,
+                'r_fonte': 'manual' if proprio else 'brapi',
+                'r_observacoes': 'Lançamento manual' if proprio else None,
+                'r_criacao': agora - timedelta(seconds=rnd.randrange(10 ** 7)),
+                'r_atualizacao': agora,
+                'r_editavel': proprio,
+            })
+        return {
+            'count': linhas, 'next': None, 'previous': None,
+            'results': DividendoConsolidadoSerializer(registros, many=True).data,
+        }
@@ -0,0 +1,188 @@
+"""
+Benchmark de concorrência do modo SQLite embarcado.
+
+Mede a vazão de leitura de /api/historico-dividendos/ com várias threads leitoras,
+primeiro sem carga de escrita e depois enquanto uma importação em massa grava
+HistoricoDividendo. Permite comparar journal WAL com o journal padrão (delete).
+
+Uso:
+    python manage.py benchmark_sqlite --leitores 4 --duracao 10
+    python manage.py benchmark_sqlite --journal delete --saida sqlite_delete.json
+"""
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from planner.benchmark import commit_atual, percentil, popular_base_sintetica
+from planner.models import Ativo, HistoricoDividendo
+
+
+class Command(BaseCommand):
+    help = 'Mede a vazão de leitura do SQLite com e sem uma importação concorrente.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--leitores', type=int, default=4, help='Threads leitoras')
+        parser.add_argument('--duracao', type=float, default=10.0, help='Duração de cada fase em segundos')
+        parser.add_argument('--journal', choices=['wal', 'delete'], default='wal')
+        parser.add_argument('--usuarios', type=int, default=20)
+        parser.add_argument('--ativos-por-usuario', type=int, default=10)
+        parser.add_argument('--dividendos-por-ativo', type=int, default=50)
+        parser.add_argument('--lote-importacao', type=int, default=1000, help='Linhas por transação de escrita')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--saida', default='benchmark_sqlite.json')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Este benchmark só se aplica ao banco SQLite (DB_ENGINE=sqlite).')
+
+        # WAL exige um arquivo em disco: o banco de teste padrão do SQLite fica em memória
+        pasta = tempfile.mkdtemp(prefix='bench_sqlite_')
+        connection.settings_dict['TEST']['NAME'] = os.path.join(pasta, 'bench.sqlite3')
+        pragmas_originais = getattr(settings, 'SQLITE_PRAGMAS', {})
+        settings.SQLITE_PRAGMAS = {**pragmas_originais, 'journal_mode': options['journal'].upper()}
+
+        setup_test_environment()
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            resultado = self._executar(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+            settings.SQLITE_PRAGMAS = pragmas_originais
+            shutil.rmtree(pasta, ignore_errors=True)
+
+        with open(options['saida'], 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+        for fase, dados in resultado['fases'].items():
+            self.stdout.write(
+                f'{fase:16} {dados["leituras_por_segundo"]:8.1f} leituras/s '
+                f'p95={dados["latencia_ms"]["p95"]:8.2f}ms erros={dados["erros_leitura"]} '
+                f'escritas={dados["linhas_importadas"]}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Resultado salvo em {options["saida"]}'))
+
+    def _executar(self, options):
+        ids = popular_base_sintetica(
+            usuarios=options['usuarios'],
+            ativos_por_usuario=options['ativos_por_usuario'],
+            dividendos_por_ativo=options['dividendos_por_ativo'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal = cursor.fetchone()[0]
+        # Libera a conexão principal para que as threads usem as suas
+        connection.close()
+
+        return {
+            'commit': commit_atual(),
+            'data_execucao': timezone.now().isoformat(),
+            'journal_mode': journal,
+            'parametros': {k: options[k] for k in (
+                'leitores', 'duracao', 'usuarios', 'ativos_por_usuario',
+                'dividendos_por_ativo', 'lote_importacao', 'seed',
+            )},
+            'fases': {
+                'somente_leitura': self._fase(ids, options, com_escrita=False),
+                'com_importacao': self._fase(ids, options, com_escrita=True),
+            },
+        }
+
+    # Executa leitores (e opcionalmente um escritor) durante a duração configurada.
+    def _fase(self, ids, options, com_escrita):
+        parar = threading.Event()
+        latencias = []
+        erros = [0]
+        importadas = [0]
+        trava = threading.Lock()
+
+        def leitor(seed):
+            rnd = random.Random(seed)
+            cliente = APIClient()
+            usuarios = list(User.objects.filter(id__in=ids['usuarios']))
+            locais = []
+            try:
+                while not parar.is_set():
+                    cliente.force_authenticate(user=rnd.choice(usuarios))
+                    inicio = time.perf_counter()
+                    try:
+                        resposta = cliente.get('/api/historico-dividendos/')
+                        ok = resposta.status_code == 200
+                    except OperationalError:
+                        ok = False
+                    if ok:
+                        locais.append((time.perf_counter() - inicio) * 1000.0)
+                    else:
+                        with trava:
+                            erros[0] += 1
+            finally:
+                connection.close()
+                with trava:
+                    latencias.extend(locais)
+
+        def escritor():
+            rnd = random.Random(options['seed'])
+            ativos = list(Ativo.objects.filter(id__in=ids['ativos']).values_list('id', flat=True))
+            dia = date.today() - timedelta(days=365 * 50)
+            try:
+                while not parar.is_set():
+                    lote = []
+                    for _ in range(options['lote_importacao']):
+                        dia += timedelta(days=1)
+                        lote.append(HistoricoDividendo(
+                            ativo_id=rnd.choice(ativos),
+                            data_pagamento=dia,
+                            valor_por_acao=Decimal(rnd.randint(1, 20000)) / Decimal('10000'),
+                            fonte='api',
+                        ))
+                    try:
+                        with transaction.atomic():
+                            HistoricoDividendo.objects.bulk_create(lote)
+                        importadas[0] += len(lote)
+                    except OperationalError:
+                        pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=leitor, args=(options['seed'] + i,)) for i in range(options['leitores'])]
+        if com_escrita:
+            threads.append(threading.Thread(target=escritor))
+
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(options['duracao'])
+        parar.set()
+        for t in threads:
+            t.join()
+        decorrido = time.perf_counter() - inicio
+
+        return {
+            'leituras': len(latencias),
+            'leituras_por_segundo': round(len(latencias) / decorrido, 2),
+            'latencia_ms': {
+                'p50': round(percentil(latencias, 50), 3),
+                'p95': round(percentil(latencias, 95), 3),
+                'p99': round(percentil(latencias, 99), 3),
+            },
+            'erros_leitura': erros[0],
+            'linhas_importadas': importadas[0],
+        }
@@ -0,0 +1,68 @@
+"""
+Worker da fila de tarefas assíncronas (planner.tarefas).
+
+Inicia um ou mais processos que reservam e executam tarefas pendentes. Para escalar, rode o
+comando em quantas máquinas quiser apontando para o mesmo banco; a reserva é atômica.
+SIGTERM/SIGINT encerram após a tarefa em andamento.
+
+Uso:
+    python manage.py processar_tarefas                  # um processo, até ser interrompido
+    python manage.py processar_tarefas --processos 4
+    python manage.py processar_tarefas --ate-esvaziar   # executa as pendentes e sai (ex: cron)
+"""
+
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from planner.tarefas import processar
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas assíncronas enfileiradas no banco.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=1, help='Processos worker nesta máquina')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='Espera (s) quando a fila está vazia')
+        parser.add_argument('--ate-esvaziar', action='store_true', help='Encerra quando não houver tarefas pendentes')
+
+    def handle(self, *args, **options):
+        if options['processos'] <= 1:
+            executadas = self._worker(options)
+            self.stdout.write(self.style.SUCCESS(f'{executadas} tarefas executadas.'))
+            return
+
+        # Conexões abertas no processo pai não podem ser compartilhadas com os filhos
+        connections.close_all()
+        processos = [
+            multiprocessing.Process(target=self._worker, args=(options,), daemon=False)
+            for _ in range(options['processos'])
+        ]
+        for processo in processos:
+            processo.start()
+        # Os filhos recebem o mesmo sinal do grupo de processos; o pai apenas aguarda
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, lambda *_: [p.terminate() for p in processos])
+        for processo in processos:
+            processo.join()
+        self.stdout.write(self.style.SUCCESS(f'{len(processos)} workers encerrados.'))
+
+    def _worker(self, options):
+        parar = [False]
+
+        def interromper(*_):
+            parar[0] = True
+
+        signal.signal(signal.SIGINT, interromper)
+        signal.signal(signal.SIGTERM, interromper)
+        try:
+            return processar(
+                lambda: parar[0],
+                intervalo=options['intervalo'],
+                ate_esvaziar=options['ate_esvaziar'],
+                log=self.stdout.write,
+            )
+        finally:
+            connections.close_all()
@@ -0,0 +1,39 @@
+"""
+Regrava as séries colunares de dividendos e de eventos corporativos (planner.series) a partir do banco.
+
+Útil após restaurar o banco, mudar PLANNER_SERIES['DIRETORIO'] ou na primeira implantação:
+    python manage.py reconstruir_series
+    python manage.py reconstruir_series ITUB4 PETR4
+
+As séries de preços vêm apenas da Brapi e são regravadas na próxima importação de cada ticker.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner import series
+from planner.models import EventoCorporativo, EventoDividendo
+
+
+class Command(BaseCommand):
+    help = 'Regrava as séries colunares de dividendos e eventos corporativos a partir do banco.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help='Tickers (padrão: todos com eventos)')
+
+    def handle(self, *args, **options):
+        tickers = [t.upper() for t in options['tickers']] or sorted(
+            set(EventoDividendo.objects.order_by().values_list('ticker', flat=True).distinct())
+            | set(EventoCorporativo.objects.order_by().values_list('ticker', flat=True).distinct())
+        )
+
+        pagamentos = 0
+        try:
+            for ticker in tickers:
+                pagamentos += series.gravar_dividendos(ticker)
+                series.gravar_eventos(ticker)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Falha ao gravar séries: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(tickers)} séries gravadas ({pagamentos} pagamentos) em {series.diretorio()}.'
+        ))
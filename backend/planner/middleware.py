@@ -0,0 +1,200 @@
+"""
+Middlewares do app planner.
+"""
+
+import cProfile
+import gzip
+import io
+import marshal
+import pstats
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependência opcional
+    brotli = None
+
+
+# Tipos de conteúdo que valem a pena comprimir (JSON da API, CSV/NDJSON de exportação, texto).
+TIPOS_COMPRIMIVEIS = ('application/json', 'application/x-ndjson', 'application/javascript', 'text/')
+
+
+# Profiling opcional de requisições: staff pode solicitar via header X-Profile ou ?_perfil=1, e uma fração
+# das requisições (TAXA_AMOSTRAGEM) é perfilada com cProfile e salva quando ultrapassa o limiar de latência.
+# As demais só têm a duração e as consultas SQL medidas (sem cProfile): toda requisição acima do limiar é
+# salva, com motivo 'lento', mesmo que não tenha sido amostrada.
+# Quando desabilitado em settings.PLANNER_PROFILER, o middleware nem é carregado (custo zero).
+class ProfilerMiddleware:
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'PLANNER_PROFILER', {})
+        if not config.get('HABILITADO', False):
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.limiar_ms = float(config.get('LIMIAR_MS', 500))
+        self.taxa_amostragem = float(config.get('TAXA_AMOSTRAGEM', 0.0))
+        self.max_registros = int(config.get('MAX_REGISTROS', 200))
+
+    def __call__(self, request):
+        solicitado = self._solicitado(request)
+        amostrado = solicitado or (self.taxa_amostragem > 0 and random.random() < self.taxa_amostragem)
+        profiler = cProfile.Profile() if amostrado else None
+
+        consultas = []
+        with connection.execute_wrapper(_RegistroConsultas(consultas)):
+            inicio = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+            duracao_ms = (time.perf_counter() - inicio) * 1000.0
+
+        if solicitado or duracao_ms >= self.limiar_ms:
+            motivo = 'solicitado' if solicitado else 'amostragem' if amostrado else 'lento'
+            try:
+                self._salvar(request, response, profiler, consultas, duracao_ms, motivo)
+            except Exception as e:
+                print(f"Erro ao salvar perfil da requisição {request.path}: {e}")
+
+        return response
+
+    # Verifica se um usuário staff pediu explicitamente o profiling desta requisição.
+    def _solicitado(self, request):
+        if request.headers.get('X-Profile') != '1' and request.GET.get('_perfil') != '1':
+            return False
+        usuario = getattr(request, 'user', None)
+        return bool(usuario and usuario.is_authenticated and usuario.is_staff)
+
+    # Persiste o perfil e remove os registros mais antigos além do limite configurado.
+    def _salvar(self, request, response, profiler, consultas, duracao_ms, motivo):
+        from .models import PerfilRequisicao
+
+        resumo = io.StringIO()
+        dump = b''
+        if profiler is not None:
+            stats = pstats.Stats(profiler, stream=resumo)
+            stats.sort_stats('cumulative').print_stats(40)
+            # Mesmo formato de arquivo gerado por Stats.dump_stats (.prof)
+            dump = marshal.dumps(stats.stats)
+        else:
+            resumo.write(f'Requisição acima do limiar de {self.limiar_ms:.0f}ms, sem cProfile (não amostrada).\n')
+
+        usuario = getattr(request, 'user', None)
+        PerfilRequisicao.objects.create(
+            metodo=request.method,
+            caminho=request.get_full_path()[:500],
+            status_code=response.status_code,
+            duracao_ms=round(duracao_ms, 3),
+            usuario=usuario if usuario and usuario.is_authenticated else None,
+            motivo=motivo,
+            estatisticas=dump,
+            resumo=resumo.getvalue(),
+            consultas_sql=consultas,
+        )
+
+        ids_antigos = PerfilRequisicao.objects.values_list('id', flat=True)[self.max_registros:]
+        PerfilRequisicao.objects.filter(id__in=list(ids_antigos)).delete()
+
+        if motivo == 'solicitado':
+            response['X-Profile-Duration-Ms'] = f'{duracao_ms:.1f}'
+
+
+# execute_wrapper que registra o SQL e a duração de cada consulta (sem exigir DEBUG nem o cursor de depuração).
+class _RegistroConsultas:
+
+    def __init__(self, consultas):
+        self.consultas = consultas
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracao = time.perf_counter() - inicio
+            # Mesmo texto de connection.queries (parâmetros já interpolados)
+            if not many:
+                sql = context['connection'].ops.last_executed_query(context['cursor'], sql, params)
+            self.consultas.append({'sql': sql, 'tempo': f'{duracao:.3f}'})
+
+# Compressão das respostas com negociação por Accept-Encoding (br quando o pacote brotli está instalado,
+# senão gzip). Só comprime respostas comprimíveis acima de LIMIAR_BYTES: abaixo disso o ganho em bytes não
+# paga a CPU. Respostas em streaming (SSE de /api/eventos/, exportações) passam intactas, sem buffer.
+class CompressaoMiddleware:
+
+    def __init__(self, get_response):
+        config = getattr(settings, 'PLANNER_COMPRESSAO', {})
+        if not config.get('HABILITADO', True):
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.limiar_bytes = int(config.get('LIMIAR_BYTES', 1024))
+        self.nivel_gzip = int(config.get('NIVEL_GZIP', 5))
+        self.nivel_brotli = int(config.get('NIVEL_BROTLI', 4))
+        # Ordem de preferência do servidor, usada para desempatar qualidades iguais
+        self.codificacoes = (['br'] if brotli is not None else []) + ['gzip']
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.streaming or response.has_header('Content-Encoding')
+                or len(response.content) < self.limiar_bytes
+                or not response.get('Content-Type', '').startswith(TIPOS_COMPRIMIVEIS)):
+            return response
+
+        # A partir daqui a representação depende do Accept-Encoding, mesmo que este cliente receba sem compressão
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = self.negociar(request.headers.get('Accept-Encoding', ''))
+        if codificacao is None:
+            return response
+
+        comprimido = self.comprimir(response.content, codificacao)
+        if len(comprimido) >= len(response.content):
+            return response
+
+        response.content = comprimido
+        response['Content-Length'] = str(len(comprimido))
+        response['Content-Encoding'] = codificacao
+        # O corpo mudou de bytes: um ETag forte deixaria de ser válido (como no GZipMiddleware do Django)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    # Escolhe a codificação pela maior qualidade (q) aceita pelo cliente; None = sem compressão.
+    def negociar(self, accept_encoding):
+        qualidades = {}
+        for item in accept_encoding.split(','):
+            nome, _, parametros = item.strip().partition(';')
+            nome = nome.strip().lower()
+            if not nome:
+                continue
+            q = 1.0
+            parametro, _, valor = parametros.strip().partition('=')
+            if parametro.strip().lower() == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+            qualidades[nome] = q
+
+        melhor, melhor_q = None, 0.0
+        for codificacao in self.codificacoes:
+            q = qualidades.get(codificacao, qualidades.get('*', 0.0))
+            if q > melhor_q:
+                melhor, melhor_q = codificacao, q
+        return melhor
+
+    def comprimir(self, conteudo, codificacao):
+        if codificacao == 'br':
+            return brotli.compress(conteudo, quality=self.nivel_brotli)
+        # mtime=0: a mesma resposta gera sempre os mesmos bytes
+        return gzip.compress(conteudo, compresslevel=self.nivel_gzip, mtime=0)
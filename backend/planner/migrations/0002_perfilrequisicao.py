@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('planner', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilRequisicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metodo', models.CharField(max_length=10, verbose_name='Método HTTP')),
+                ('caminho', models.CharField(max_length=500, verbose_name='Caminho')),
+                ('status_code', models.PositiveIntegerField(verbose_name='Status HTTP')),
+                ('duracao_ms', models.FloatField(verbose_name='Duração (ms)')),
+                ('motivo', models.CharField(choices=[('solicitado', 'Solicitado'), ('amostragem', 'Amostragem')], max_length=20, verbose_name='Motivo')),
+                ('estatisticas', models.BinaryField(help_text='Dump do pstats (formato .prof)', verbose_name='Estatísticas cProfile')),
+                ('resumo', models.TextField(help_text='Funções mais custosas ordenadas por tempo acumulado', verbose_name='Resumo')),
+                ('consultas_sql', models.JSONField(default=list, verbose_name='Consultas SQL')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='perfis_requisicao', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Requisição',
+                'verbose_name_plural': 'Perfis de Requisições',
+                'ordering': ['-data_criacao'],
+            },
+        ),
+    ]
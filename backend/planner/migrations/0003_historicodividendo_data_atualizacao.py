@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0002_perfilrequisicao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicodividendo',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Data de Atualização'),
+            preserve_default=False,
+        ),
+    ]
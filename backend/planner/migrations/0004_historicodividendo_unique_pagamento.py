@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:30
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+# Remove pagamentos repetidos (mesmo ativo, data e valor) antes de criar a restrição, mantendo o mais antigo.
+def remover_duplicados(apps, schema_editor):
+    HistoricoDividendo = apps.get_model('planner', 'HistoricoDividendo')
+    grupos = (
+        HistoricoDividendo.objects
+        .values('ativo_id', 'data_pagamento', 'valor_por_acao')
+        .annotate(total=Count('id'), primeiro=Min('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in grupos.iterator():
+        HistoricoDividendo.objects.filter(
+            ativo_id=grupo['ativo_id'],
+            data_pagamento=grupo['data_pagamento'],
+            valor_por_acao=grupo['valor_por_acao'],
+        ).exclude(id=grupo['primeiro']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0003_historicodividendo_data_atualizacao'),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='historicodividendo',
+            constraint=models.UniqueConstraint(fields=('ativo', 'data_pagamento', 'valor_por_acao'), name='unique_dividendo_ativo_data_valor'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0004_historicodividendo_unique_pagamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TickerCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, unique=True, verbose_name='Ticker')),
+                ('nome', models.CharField(max_length=200, verbose_name='Nome')),
+                ('setor', models.CharField(blank=True, max_length=100, null=True, verbose_name='Setor')),
+                ('tipo', models.CharField(blank=True, help_text='Tipo do papel na Brapi (ex: stock, fund, bdr)', max_length=20, null=True, verbose_name='Tipo')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+            ],
+            options={
+                'verbose_name': 'Ticker do Catálogo',
+                'verbose_name_plural': 'Catálogo de Tickers',
+                'ordering': ['ticker'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0005_tickercatalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoDividendo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, verbose_name='Ticker')),
+                ('data_pagamento', models.DateField(verbose_name='Data de Pagamento')),
+                ('valor_por_acao', models.DecimalField(decimal_places=4, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Valor por Ação (R$)')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+            ],
+            options={
+                'verbose_name': 'Evento de Dividendo',
+                'verbose_name_plural': 'Eventos de Dividendos',
+                'ordering': ['ticker', '-data_pagamento'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tickercatalogo',
+            name='dividendos_importados_em',
+            field=models.DateTimeField(blank=True, help_text='Última importação dos eventos de dividendos deste ticker na Brapi', null=True, verbose_name='Dividendos Importados em'),
+        ),
+        migrations.AddConstraint(
+            model_name='eventodividendo',
+            constraint=models.UniqueConstraint(fields=('ticker', 'data_pagamento', 'valor_por_acao'), name='unique_evento_ticker_data_valor'),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:20
+
+from django.db import migrations
+from django.db.models import Q
+
+
+TAMANHO_LOTE = 2000
+
+
+# Move os dividendos importados da Brapi (fonte='api'), hoje copiados por usuário, para EventoDividendo
+# (uma linha por ticker/data/valor) e remove as cópias. Lançamentos manuais permanecem em HistoricoDividendo,
+# assim como as cópias em que o usuário escreveu observações (continuam como lançamento próprio, que
+# prevalece sobre o evento do mesmo ativo e data, e a anotação não se perde).
+def migrar_para_eventos(apps, schema_editor):
+    HistoricoDividendo = apps.get_model('planner', 'HistoricoDividendo')
+    EventoDividendo = apps.get_model('planner', 'EventoDividendo')
+
+    importados = HistoricoDividendo.objects.filter(fonte='api')
+    linhas = (
+        importados.values_list('ativo__ticker', 'data_pagamento', 'valor_por_acao')
+        .distinct()
+        .order_by()
+        .iterator(chunk_size=TAMANHO_LOTE)
+    )
+    lote = []
+    for ticker, data_pagamento, valor in linhas:
+        lote.append(EventoDividendo(ticker=ticker.upper(), data_pagamento=data_pagamento, valor_por_acao=valor))
+        if len(lote) >= TAMANHO_LOTE:
+            EventoDividendo.objects.bulk_create(lote, ignore_conflicts=True)
+            lote = []
+    if lote:
+        EventoDividendo.objects.bulk_create(lote, ignore_conflicts=True)
+
+    copias = importados.filter(Q(observacoes__isnull=True) | Q(observacoes__regex=r'^\s*$'))
+    copias.delete()
+
+
+# Reverso: recria uma cópia por usuário de cada evento para os ativos com o mesmo ticker.
+def restaurar_copias(apps, schema_editor):
+    Ativo = apps.get_model('planner', 'Ativo')
+    HistoricoDividendo = apps.get_model('planner', 'HistoricoDividendo')
+    EventoDividendo = apps.get_model('planner', 'EventoDividendo')
+
+    ativos_por_ticker = {}
+    for ativo_id, ticker in Ativo.objects.values_list('id', 'ticker').iterator():
+        ativos_por_ticker.setdefault(ticker.upper(), []).append(ativo_id)
+
+    lote = []
+    for evento in EventoDividendo.objects.iterator(chunk_size=TAMANHO_LOTE):
+        for ativo_id in ativos_por_ticker.get(evento.ticker, []):
+            lote.append(HistoricoDividendo(
+                ativo_id=ativo_id,
+                data_pagamento=evento.data_pagamento,
+                valor_por_acao=evento.valor_por_acao,
+                fonte='api',
+            ))
+        if len(lote) >= TAMANHO_LOTE:
+            HistoricoDividendo.objects.bulk_create(lote, ignore_conflicts=True)
+            lote = []
+    if lote:
+        HistoricoDividendo.objects.bulk_create(lote, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0006_eventodividendo'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrar_para_eventos, restaurar_copias),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:31
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('planner', '0007_migrar_dividendos_api'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarefa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(help_text='Nome do handler registrado em planner.tarefas', max_length=50, verbose_name='Tipo')),
+                ('parametros', models.JSONField(default=dict, verbose_name='Parâmetros')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=20, verbose_name='Status')),
+                ('progresso', models.PositiveSmallIntegerField(default=0, validators=[django.core.validators.MaxValueValidator(100)], verbose_name='Progresso (%)')),
+                ('mensagem', models.CharField(blank=True, default='', max_length=200, verbose_name='Mensagem')),
+                ('resultado', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('erro', models.TextField(blank=True, null=True, verbose_name='Erro')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('worker', models.CharField(blank=True, default='', help_text='Identificação (host:pid) do processo que executa a tarefa', max_length=100, verbose_name='Worker')),
+                ('expira_em', models.DateTimeField(blank=True, help_text='Se o worker parar de renovar a reserva até esta data, a tarefa volta para a fila', null=True, verbose_name='Reserva Expira em')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Data de Início')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Data de Conclusão')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tarefas', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['-data_criacao'],
+                'indexes': [models.Index(fields=['status', 'data_criacao'], name='tarefa_status_criacao_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('planner', '0008_tarefa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickercatalogo',
+            name='preco_atualizado_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Preço Atualizado em'),
+        ),
+        migrations.AddField(
+            model_name='tickercatalogo',
+            name='ultimo_preco',
+            field=models.DecimalField(blank=True, decimal_places=4, help_text='Cotação obtida na última importação de dividendos (usada no yield do painel)', max_digits=12, null=True, verbose_name='Último Preço (R$)'),
+        ),
+        migrations.CreateModel(
+            name='PainelUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dados', models.JSONField(default=dict, help_text='Seções calculadas do painel (carteira e metas)', verbose_name='Dados')),
+                ('carteira_pendente', models.BooleanField(default=True, help_text='Ativos, dividendos ou preços mudaram desde o último cálculo', verbose_name='Carteira Pendente')),
+                ('metas_pendente', models.BooleanField(default=True, help_text='Metas ou simulações mudaram desde o último cálculo', verbose_name='Metas Pendente')),
+                ('versao', models.PositiveIntegerField(default=0, help_text='Incrementada a cada marcação; evita perder uma alteração feita durante o recálculo', verbose_name='Versão')),
+                ('data_referencia', models.DateField(blank=True, help_text='Dia usado nas janelas de 12 meses e nos próximos pagamentos', null=True, verbose_name='Data de Referência')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Data de Atualização')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='painel', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Painel do Usuário',
+                'verbose_name_plural': 'Painéis dos Usuários',
+            },
+        ),
+    ]
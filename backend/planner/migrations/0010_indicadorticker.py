@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0009_painelusuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicadorTicker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, unique=True, verbose_name='Ticker')),
+                ('dados', models.JSONField(default=dict, help_text='Indicadores calculados (planner.indicadores)', verbose_name='Dados')),
+                ('ano_referencia', models.PositiveIntegerField(help_text='Ano corrente no cálculo; os indicadores usam os anos completos anteriores a ele', verbose_name='Ano de Referência')),
+                ('data_calculo', models.DateTimeField(auto_now=True, verbose_name='Data do Cálculo')),
+            ],
+            options={
+                'verbose_name': 'Indicador do Ticker',
+                'verbose_name_plural': 'Indicadores dos Tickers',
+                'ordering': ['ticker'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 04:55
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0010_indicadorticker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoCorporativo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, verbose_name='Ticker')),
+                ('data', models.DateField(help_text='Último dia com direito (lastDatePrior); valores até esta data estão na base antiga', verbose_name='Data Com')),
+                ('tipo', models.CharField(choices=[('desdobramento', 'Desdobramento'), ('grupamento', 'Grupamento'), ('bonificacao', 'Bonificação')], max_length=20, verbose_name='Tipo')),
+                ('fator', models.DecimalField(decimal_places=8, help_text='Ações após o evento para cada ação anterior (ex: 2 no desdobramento 1:2, 1.1 na bonificação de 10%)', max_digits=18, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Fator')),
+                ('fator_acumulado', models.DecimalField(decimal_places=12, default=1, help_text='Produto dos fatores deste evento e dos posteriores do ticker', max_digits=24, verbose_name='Fator Acumulado')),
+                ('descricao', models.CharField(blank=True, default='', max_length=100, verbose_name='Descrição')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+            ],
+            options={
+                'verbose_name': 'Evento Corporativo',
+                'verbose_name_plural': 'Eventos Corporativos',
+                'ordering': ['ticker', 'data'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='eventocorporativo',
+            constraint=models.UniqueConstraint(fields=('ticker', 'data', 'tipo'), name='unique_evento_corporativo'),
+        ),
+    ]
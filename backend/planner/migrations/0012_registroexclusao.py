@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0011_eventocorporativo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroExclusao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(help_text='Nome do modelo removido (ex: ativo, historicodividendo)', max_length=30, verbose_name='Modelo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='ID do Objeto')),
+                ('usuario_id', models.BigIntegerField(blank=True, help_text='Dono do objeto, quando o modelo tem um', null=True, verbose_name='Usuário')),
+                ('grupo', models.CharField(blank=True, default='', help_text='Registro pai afetado pela exclusão (ativo do dividendo, meta da simulação, ticker do evento)', max_length=20, verbose_name='Grupo')),
+                ('data_exclusao', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data da Exclusão')),
+            ],
+            options={
+                'verbose_name': 'Registro de Exclusão',
+                'verbose_name_plural': 'Registros de Exclusão',
+                'ordering': ['-data_exclusao'],
+                'indexes': [models.Index(fields=['modelo', 'data_exclusao'], name='exclusao_modelo_data_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:05
+
+from django.db import migrations
+
+
+# Normaliza os tickers já gravados (maiúsculas, sem espaços), como Ativo.save passa a fazer: a junção com
+# EventoDividendo é pelo ticker exato. Ativos cujo ticker normalizado já existe para o mesmo usuário são
+# mantidos como estão (unique_together usuario/ticker) e precisam ser unificados manualmente.
+def normalizar_tickers(apps, schema_editor):
+    Ativo = apps.get_model('planner', 'Ativo')
+
+    existentes = set(Ativo.objects.values_list('usuario_id', 'ticker'))
+    for ativo in Ativo.objects.only('id', 'usuario_id', 'ticker').iterator():
+        ticker = ativo.ticker.upper().strip()
+        if ticker == ativo.ticker or (ativo.usuario_id, ticker) in existentes:
+            continue
+        Ativo.objects.filter(id=ativo.id).update(ticker=ticker)
+        existentes.add((ativo.usuario_id, ticker))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0012_registroexclusao'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_tickers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0013_normalizar_tickers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='perfilrequisicao',
+            name='estatisticas',
+            field=models.BinaryField(blank=True, default=b'', help_text='Dump do pstats (formato .prof); vazio nas requisições lentas não amostradas', verbose_name='Estatísticas cProfile'),
+        ),
+        migrations.AlterField(
+            model_name='perfilrequisicao',
+            name='motivo',
+            field=models.CharField(choices=[('solicitado', 'Solicitado'), ('amostragem', 'Amostragem'), ('lento', 'Lento (sem cProfile)')], max_length=20, verbose_name='Motivo'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0014_perfilrequisicao_lento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventodividendo',
+            name='data_com',
+            field=models.DateField(blank=True, help_text='Último dia com direito (lastDatePrior), quando informado; define a base de ações do valor', null=True, verbose_name='Data Com'),
+        ),
+    ]
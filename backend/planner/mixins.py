@@ -0,0 +1,161 @@
+"""
+Mixins reutilizáveis pelos ViewSets da API.
+"""
+
+import hashlib
+
+from django.db import transaction
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .sincronizacao import CursorErro, gerar_cursor, instante_leitura, ler_cursor
+
+
+# Retorna (quantidade, maior timestamp) de um queryset em uma única consulta agregada.
+def versao_queryset(queryset, campo_data):
+    agregado = queryset.order_by().aggregate(total=Count('pk'), ultima=Max(campo_data))
+    return agregado['total'], agregado['ultima']
+
+
+# Cache HTTP condicional para listagens: gera ETag/Last-Modified a partir da versão da coleção
+# do usuário (quantidade + maior data de atualização) e responde 304 sem serializar nada
+# quando o cliente já possui a versão atual. Os ViewSets implementam versoes_colecao().
+# A data do dia entra no ETag porque campos como total_dividendos_ano dependem dela.
+class CacheCondicionalMixin:
+
+    # Lista de tuplas (quantidade, maior timestamp) das coleções que compõem a listagem.
+    def versoes_colecao(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        versoes = self.versoes_colecao()
+        datas = [ultima for _, ultima in versoes if ultima is not None]
+        ultima_modificacao = max(datas) if datas else None
+
+        chave = '|'.join(
+            f'{total}:{ultima.isoformat() if ultima else ""}' for total, ultima in versoes
+        ) + f'|{request.user.pk}|{request.get_full_path()}|{timezone.localdate()}'
+        etag = 'W/' + quote_etag(hashlib.md5(chave.encode('utf-8')).hexdigest())
+
+        if self._nao_modificado(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        if ultima_modificacao is not None:
+            response['Last-Modified'] = http_date(ultima_modificacao.timestamp())
+        # Dados por usuário: o navegador pode guardar, mas deve revalidar a cada uso
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    # Apenas If-None-Match decide o 304: exclusões não avançam a maior data de atualização,
+    # então If-Modified-Since sozinho poderia esconder uma remoção (o ETag inclui a quantidade).
+    def _nao_modificado(self, request, etag):
+        if_none_match = request.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        recebidas = [e.strip() for e in if_none_match.split(',')]
+        return etag in recebidas or etag[2:] in recebidas or '*' in recebidas
+
+
+# Sincronização incremental das listagens (planner.sincronizacao): com ?since=<cursor> a listagem responde
+# {"cursor", "alterados", "removidos"} só com o que mudou depois do cursor, sem paginação; since=0 traz a
+# coleção inteira e o cursor inicial. Os ViewSets implementam alteracoes_desde().
+class SincronizacaoMixin:
+
+    # Dicionário com "alterados" (queryset ou lista serializável) e "removidos" (ids), mais chaves extras
+    # da coleção. desde=None: coleção inteira.
+    def alteracoes_desde(self, desde):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get('since')
+        if since is None:
+            return super().list(request, *args, **kwargs)
+
+        try:
+            desde = ler_cursor(since)
+        except CursorErro as e:
+            return Response({'erro': str(e)}, status=status.HTTP_410_GONE if since.isdigit() else status.HTTP_400_BAD_REQUEST)
+
+        # O cursor devolvido é o instante (do banco) anterior às consultas: o que for gravado durante elas vem na próxima
+        cursor = gerar_cursor(instante_leitura())
+        alteracoes = self.alteracoes_desde(desde)
+        alteracoes['alterados'] = self.get_serializer(alteracoes['alterados'], many=True).data
+        return Response({'cursor': cursor, 'completo': desde is None, **alteracoes})
+
+
+# Endpoint de operações em lote (/bulk/) para um ViewSet: POST cria, PUT/PATCH atualiza (itens com "id")
+# e DELETE remove ({"ids": [...]}), sempre com uma única escrita em massa dentro de uma transação.
+# Com ?atomico=0 os itens válidos são gravados e os inválidos retornados em "erros";
+# por padrão qualquer erro cancela a operação inteira (tudo ou nada).
+class BulkMixin:
+    bulk_serializer_class = None
+
+    # Contexto extra exigido pelos serializers de lote (ex: usuario_id).
+    def get_bulk_context(self):
+        return {}
+
+    # Valores fixos aplicados a todos os itens gravados (ex: usuario_id nos criados).
+    def get_bulk_save_kwargs(self):
+        return {}
+
+    # Chamado após uma gravação em lote bem-sucedida (as escritas em massa não disparam sinais de modelo).
+    def apos_bulk(self):
+        pass
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'])
+    def bulk(self, request):
+        atomico = request.query_params.get('atomico', '1') not in ('0', 'false')
+        contexto = {**self.get_serializer_context(), **self.get_bulk_context(), 'atomico': atomico}
+
+        if request.method == 'DELETE':
+            return self._bulk_delete(request, atomico)
+
+        instancias = None
+        if request.method in ('PUT', 'PATCH'):
+            ids = [item.get('id') for item in request.data if isinstance(item, dict)] if isinstance(request.data, list) else []
+            instancias = list(self.get_queryset().filter(id__in=[i for i in ids if isinstance(i, int)]))
+
+        serializer = self.bulk_serializer_class(
+            instance=instancias, data=request.data, many=True,
+            partial=request.method == 'PATCH', context=contexto
+        )
+        if not serializer.is_valid():
+            return Response({'erros': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            objetos = serializer.save(**(self.get_bulk_save_kwargs() if request.method == 'POST' else {}))
+            self.apos_bulk()
+
+        chave = 'criados' if request.method == 'POST' else 'atualizados'
+        return Response({
+            chave: len(objetos),
+            'itens': self.bulk_serializer_class(objetos, many=True, context=contexto).data,
+            'erros': serializer.erros_itens,
+        }, status=status.HTTP_201_CREATED if request.method == 'POST' and objetos else status.HTTP_200_OK)
+
+    def _bulk_delete(self, request, atomico):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return Response({'erro': 'Envie {"ids": [...]} com ids inteiros.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(id__in=ids)
+            encontrados = set(queryset.values_list('id', flat=True))
+            nao_encontrados = [i for i in ids if i not in encontrados]
+            if nao_encontrados and atomico:
+                return Response(
+                    {'erro': 'Alguns ids não foram encontrados.', 'nao_encontrados': nao_encontrados},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            self.get_queryset().model.objects.filter(id__in=encontrados).delete()
+            self.apos_bulk()
+
+        return Response({'removidos': len(encontrados), 'nao_encontrados': nao_encontrados}, status=status.HTTP_200_OK)
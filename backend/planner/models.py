@@ -6,6 +6,9 @@ Relacionamentos:
 - Ativo -> HistoricoDividendo (um-para-muitos)
 - Usuario -> MetaRenda (um-para-muitos)
 - MetaRenda -> Simulacao (um-para-muitos)
+- EventoDividendo (por ticker, compartilhado entre usuários) <- Ativo.ticker
+- Usuario -> Tarefa (um-para-muitos)
+- Usuario -> PainelUsuario (um-para-um)
 """
 
 from django.db import models
@@ -67,6 +70,12 @@ class Ativo(models.Model):
     def __str__(self):
         return f"{self.ticker} - {self.nome_empresa}"
 
+    # Normaliza o ticker (maiúsculas, sem espaços) antes de gravar: é a chave de junção com EventoDividendo.
+    def save(self, *args, **kwargs):
+        if self.ticker:
+            self.ticker = self.ticker.upper().strip()
+        super().save(*args, **kwargs)
+
 
 # Representa um registro histórico de pagamento de dividendos, com relacionamento muitos-para-um com Ativo.
 class HistoricoDividendo(models.Model):
@@ -107,11 +116,22 @@ class HistoricoDividendo(models.Model):
         auto_now_add=True,
         verbose_name='Data de Criação'
     )
+    data_atualizacao = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Data de Atualização'
+    )
 
     class Meta:
         verbose_name = 'Histórico de Dividendo'
         verbose_name_plural = 'Históricos de Dividendos'
         ordering = ['-data_pagamento', '-data_criacao']
+        # O mesmo pagamento não pode ser registrado duas vezes (permite reimportar arquivos com segurança)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ativo', 'data_pagamento', 'valor_por_acao'],
+                name='unique_dividendo_ativo_data_valor'
+            ),
+        ]
 
     # Retorna representação string do histórico de dividendo.
     def __str__(self):
@@ -225,3 +245,449 @@ class Simulacao(models.Model):
     def __str__(self):
         return f"Simulação {self.meta_renda.nome} - {self.data_execucao.strftime('%d/%m/%Y %H:%M')}"
 
+
+
+# Armazena o perfil (cProfile + consultas SQL) de uma requisição lenta ou marcada para profiling.
+class PerfilRequisicao(models.Model):
+    metodo = models.CharField(
+        max_length=10,
+        verbose_name='Método HTTP'
+    )
+    caminho = models.CharField(
+        max_length=500,
+        verbose_name='Caminho'
+    )
+    status_code = models.PositiveIntegerField(
+        verbose_name='Status HTTP'
+    )
+    duracao_ms = models.FloatField(
+        verbose_name='Duração (ms)'
+    )
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='perfis_requisicao',
+        verbose_name='Usuário'
+    )
+    motivo = models.CharField(
+        max_length=20,
+        choices=[('solicitado', 'Solicitado'), ('amostragem', 'Amostragem'), ('lento', 'Lento (sem cProfile)')],
+        verbose_name='Motivo'
+    )
+    estatisticas = models.BinaryField(
+        blank=True,
+        default=b'',
+        verbose_name='Estatísticas cProfile',
+        help_text='Dump do pstats (formato .prof); vazio nas requisições lentas não amostradas'
+    )
+    resumo = models.TextField(
+        verbose_name='Resumo',
+        help_text='Funções mais custosas ordenadas por tempo acumulado'
+    )
+    consultas_sql = models.JSONField(
+        default=list,
+        verbose_name='Consultas SQL'
+    )
+    data_criacao = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Criação'
+    )
+
+    class Meta:
+        verbose_name = 'Perfil de Requisição'
+        verbose_name_plural = 'Perfis de Requisições'
+        ordering = ['-data_criacao']
+
+    # Retorna representação string do perfil.
+    def __str__(self):
+        return f"{self.metodo} {self.caminho} - {self.duracao_ms:.0f}ms"
+
+
+# Catálogo global de tickers da B3 (compartilhado entre usuários), usado no autocomplete.
+class TickerCatalogo(models.Model):
+    ticker = models.CharField(
+        max_length=20,
+        unique=True,
+        verbose_name='Ticker'
+    )
+    nome = models.CharField(
+        max_length=200,
+        verbose_name='Nome'
+    )
+    setor = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        verbose_name='Setor'
+    )
+    tipo = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        verbose_name='Tipo',
+        help_text='Tipo do papel na Brapi (ex: stock, fund, bdr)'
+    )
+    dividendos_importados_em = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Dividendos Importados em',
+        help_text='Última importação dos eventos de dividendos deste ticker na Brapi'
+    )
+    ultimo_preco = models.DecimalField(
+        max_digits=12,
+        decimal_places=4,
+        blank=True,
+        null=True,
+        verbose_name='Último Preço (R$)',
+        help_text='Cotação obtida na última importação de dividendos (usada no yield do painel)'
+    )
+    preco_atualizado_em = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Preço Atualizado em'
+    )
+    data_atualizacao = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Data de Atualização'
+    )
+
+    class Meta:
+        verbose_name = 'Ticker do Catálogo'
+        verbose_name_plural = 'Catálogo de Tickers'
+        ordering = ['ticker']
+
+    # Retorna representação string do ticker.
+    def __str__(self):
+        return f"{self.ticker} - {self.nome}"
+
+
+# Pagamento de dividendo canônico de um ticker, armazenado uma única vez e compartilhado por todos os
+# usuários que possuem o ativo. Registros manuais em HistoricoDividendo na mesma data prevalecem sobre ele.
+class EventoDividendo(models.Model):
+    ticker = models.CharField(
+        max_length=20,
+        verbose_name='Ticker'
+    )
+    data_pagamento = models.DateField(
+        verbose_name='Data de Pagamento'
+    )
+    valor_por_acao = models.DecimalField(
+        max_digits=10,
+        decimal_places=4,
+        validators=[MinValueValidator(0)],
+        verbose_name='Valor por Ação (R$)'
+    )
+    data_com = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Data Com',
+        help_text='Último dia com direito (lastDatePrior), quando informado; define a base de ações do valor'
+    )
+    data_criacao = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Criação'
+    )
+
+    class Meta:
+        verbose_name = 'Evento de Dividendo'
+        verbose_name_plural = 'Eventos de Dividendos'
+        ordering = ['ticker', '-data_pagamento']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ticker', 'data_pagamento', 'valor_por_acao'],
+                name='unique_evento_ticker_data_valor'
+            ),
+        ]
+
+    # Retorna representação string do evento.
+    def __str__(self):
+        return f"{self.ticker} - {self.data_pagamento} - R$ {self.valor_por_acao}"
+
+
+# Tarefa assíncrona na fila do banco (importações, simulações), executada pelo comando processar_tarefas.
+class Tarefa(models.Model):
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+
+    tipo = models.CharField(
+        max_length=50,
+        verbose_name='Tipo',
+        help_text='Nome do handler registrado em planner.tarefas'
+    )
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='tarefas',
+        verbose_name='Usuário'
+    )
+    parametros = models.JSONField(
+        default=dict,
+        verbose_name='Parâmetros'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pendente',
+        verbose_name='Status'
+    )
+    progresso = models.PositiveSmallIntegerField(
+        default=0,
+        validators=[MaxValueValidator(100)],
+        verbose_name='Progresso (%)'
+    )
+    mensagem = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        verbose_name='Mensagem'
+    )
+    resultado = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name='Resultado'
+    )
+    erro = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name='Erro'
+    )
+    tentativas = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Tentativas'
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name='Worker',
+        help_text='Identificação (host:pid) do processo que executa a tarefa'
+    )
+    expira_em = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Reserva Expira em',
+        help_text='Se o worker parar de renovar a reserva até esta data, a tarefa volta para a fila'
+    )
+    data_criacao = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Criação'
+    )
+    data_inicio = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Data de Início'
+    )
+    data_conclusao = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Data de Conclusão'
+    )
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-data_criacao']
+        indexes = [
+            models.Index(fields=['status', 'data_criacao'], name='tarefa_status_criacao_idx'),
+        ]
+
+    # Retorna representação string da tarefa.
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} - {self.get_status_display()}"
+
+
+# Painel pré-calculado do usuário (GET /api/dashboard/), gravado como uma única linha. As seções são
+# marcadas como pendentes quando os dados de origem mudam e recalculadas na próxima leitura.
+class PainelUsuario(models.Model):
+    usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='painel',
+        verbose_name='Usuário'
+    )
+    dados = models.JSONField(
+        default=dict,
+        verbose_name='Dados',
+        help_text='Seções calculadas do painel (carteira e metas)'
+    )
+    carteira_pendente = models.BooleanField(
+        default=True,
+        verbose_name='Carteira Pendente',
+        help_text='Ativos, dividendos ou preços mudaram desde o último cálculo'
+    )
+    metas_pendente = models.BooleanField(
+        default=True,
+        verbose_name='Metas Pendente',
+        help_text='Metas ou simulações mudaram desde o último cálculo'
+    )
+    versao = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Versão',
+        help_text='Incrementada a cada marcação; evita perder uma alteração feita durante o recálculo'
+    )
+    data_referencia = models.DateField(
+        blank=True,
+        null=True,
+        verbose_name='Data de Referência',
+        help_text='Dia usado nas janelas de 12 meses e nos próximos pagamentos'
+    )
+    data_atualizacao = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Data de Atualização'
+    )
+
+    class Meta:
+        verbose_name = 'Painel do Usuário'
+        verbose_name_plural = 'Painéis dos Usuários'
+
+    # Retorna representação string do painel.
+    def __str__(self):
+        return f"Painel de {self.usuario.username}"
+
+
+# Indicadores de crescimento e consistência dos dividendos de um ticker (CAGR, regularidade, sequências,
+# volatilidade), calculados sobre os eventos compartilhados. A linha é apagada quando chegam novos eventos.
+class IndicadorTicker(models.Model):
+    ticker = models.CharField(
+        max_length=20,
+        unique=True,
+        verbose_name='Ticker'
+    )
+    dados = models.JSONField(
+        default=dict,
+        verbose_name='Dados',
+        help_text='Indicadores calculados (planner.indicadores)'
+    )
+    ano_referencia = models.PositiveIntegerField(
+        verbose_name='Ano de Referência',
+        help_text='Ano corrente no cálculo; os indicadores usam os anos completos anteriores a ele'
+    )
+    data_calculo = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Data do Cálculo'
+    )
+
+    class Meta:
+        verbose_name = 'Indicador do Ticker'
+        verbose_name_plural = 'Indicadores dos Tickers'
+        ordering = ['ticker']
+
+    # Retorna representação string do indicador.
+    def __str__(self):
+        return f"Indicadores de {self.ticker} ({self.ano_referencia})"
+
+
+# Evento corporativo de um ticker que altera a quantidade de ações (desdobramento, grupamento, bonificação).
+# fator_acumulado é o produto dos fatores deste evento e dos posteriores: valores por ação anteriores
+# ao evento são divididos por ele para ficarem na base de ações atual.
+class EventoCorporativo(models.Model):
+    TIPO_CHOICES = [
+        ('desdobramento', 'Desdobramento'),
+        ('grupamento', 'Grupamento'),
+        ('bonificacao', 'Bonificação'),
+    ]
+
+    ticker = models.CharField(
+        max_length=20,
+        verbose_name='Ticker'
+    )
+    data = models.DateField(
+        verbose_name='Data Com',
+        help_text='Último dia com direito (lastDatePrior); valores até esta data estão na base antiga'
+    )
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES,
+        verbose_name='Tipo'
+    )
+    fator = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        validators=[MinValueValidator(0)],
+        verbose_name='Fator',
+        help_text='Ações após o evento para cada ação anterior (ex: 2 no desdobramento 1:2, 1.1 na bonificação de 10%)'
+    )
+    fator_acumulado = models.DecimalField(
+        max_digits=24,
+        decimal_places=12,
+        default=1,
+        verbose_name='Fator Acumulado',
+        help_text='Produto dos fatores deste evento e dos posteriores do ticker'
+    )
+    descricao = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        verbose_name='Descrição'
+    )
+    data_criacao = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Data de Criação'
+    )
+
+    class Meta:
+        verbose_name = 'Evento Corporativo'
+        verbose_name_plural = 'Eventos Corporativos'
+        ordering = ['ticker', 'data']
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'data', 'tipo'], name='unique_evento_corporativo'),
+        ]
+
+    # Retorna representação string do evento.
+    def __str__(self):
+        return f"{self.ticker} - {self.get_tipo_display()} em {self.data} (x{self.fator})"
+
+
+# Registro de exclusões para a sincronização incremental (?since= nas listagens, planner.sincronizacao).
+# Cada linha removida de uma coleção vira um registro com o momento da exclusão; as listagens devolvem
+# os registros posteriores ao cursor do cliente como "removidos". Registros mais antigos que
+# PLANNER_SINCRONIZACAO['RETENCAO_DIAS'] são descartados (cursores dessa idade exigem sincronização completa).
+class RegistroExclusao(models.Model):
+    modelo = models.CharField(
+        max_length=30,
+        verbose_name='Modelo',
+        help_text='Nome do modelo removido (ex: ativo, historicodividendo)'
+    )
+    objeto_id = models.BigIntegerField(
+        verbose_name='ID do Objeto'
+    )
+    # Sem chave estrangeira: a exclusão de um usuário remove seus ativos em cascata, e os registros
+    # dessas exclusões não podem apontar para um usuário que está sendo removido na mesma transação
+    usuario_id = models.BigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Usuário',
+        help_text='Dono do objeto, quando o modelo tem um'
+    )
+    grupo = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        verbose_name='Grupo',
+        help_text='Registro pai afetado pela exclusão (ativo do dividendo, meta da simulação, ticker do evento)'
+    )
+    data_exclusao = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Data da Exclusão'
+    )
+
+    class Meta:
+        verbose_name = 'Registro de Exclusão'
+        verbose_name_plural = 'Registros de Exclusão'
+        ordering = ['-data_exclusao']
+        indexes = [
+            models.Index(fields=['modelo', 'data_exclusao'], name='exclusao_modelo_data_idx'),
+        ]
+
+    # Retorna representação string do registro.
+    def __str__(self):
+        return f"{self.modelo} #{self.objeto_id} removido em {self.data_exclusao}"
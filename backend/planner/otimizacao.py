@@ -0,0 +1,224 @@
+"""
+Otimização da alocação entre ativos para atingir uma meta com o menor aporte mensal.
+
+Na simulação (calcular_simulacao_dividendos) o aporte necessário cai à medida que o yield da carteira
+sobe, então minimizar o aporte equivale a maximizar o yield ponderado Σ w·y, sujeito a:
+- Σ w = 1 e 0 <= w <= limite por ativo;
+- Σ w dos ativos de cada setor (Ativo.setor) <= limite do setor (ativos sem setor só têm o limite individual).
+
+Com aversão ao risco λ > 0 o objetivo vira Σ w·y − λ Σ (w·s)², onde s = y · volatilidade_5a é o desvio
+anual estimado do yield de cada ativo (planner.indicadores). Os limites formam uma família aninhada
+(ativo ⊂ setor ⊂ carteira), o que permite resolver sem biblioteca de otimização:
+- λ = 0 (programa linear): guloso por yield decrescente, ótimo para limites aninhados;
+- λ > 0 (programa quadrático separável): condições de KKT, w = clip((y − μ − ν_setor) / (2λs²), 0, limite),
+  com bisseção vetorizada nos multiplicadores ν de todos os setores dentro da bisseção em μ.
+"""
+
+import math
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .indicadores import indicadores_usuario
+from .models import Simulacao
+from .services import calcular_simulacao_dividendos
+
+
+# Iterações de cada bisseção (precisão bem abaixo de 0,01% nos pesos).
+ITERACOES_BISSECAO = 50
+
+# Variância mínima do yield, para que ativos sem oscilação histórica não tenham peso ilimitado.
+VARIANCIA_MINIMA = 1e-4
+
+
+# Erro de parâmetros ou de restrições impossíveis (mensagem exibida ao usuário).
+class OtimizacaoErro(ValueError):
+    pass
+
+
+# Resolve os pesos. grupos: índice do setor de cada ativo; limites_grupo: limite de cada setor (np.inf = sem limite).
+def otimizar_pesos(yields: np.ndarray, desvios: np.ndarray, limites_ativo: np.ndarray,
+                   grupos: np.ndarray, limites_grupo: np.ndarray, aversao: float = 0.0) -> np.ndarray:
+    capacidade = np.minimum(limites_grupo, np.bincount(grupos, weights=limites_ativo, minlength=len(limites_grupo)))
+    if capacidade.sum() < 1 - 1e-9:
+        raise OtimizacaoErro(
+            'Os limites por ativo e por setor não permitem alocar 100% da carteira; aumente os limites ou inclua mais ativos.'
+        )
+
+    if aversao <= 0:
+        pesos = np.zeros(len(yields))
+        restante_grupo = limites_grupo.astype(float).copy()
+        restante = 1.0
+        for i in np.argsort(-yields, kind='stable'):
+            peso = min(limites_ativo[i], restante_grupo[grupos[i]], restante)
+            if peso > 0:
+                pesos[i] = peso
+                restante_grupo[grupos[i]] -= peso
+                restante -= peso
+            if restante <= 1e-12:
+                break
+        return pesos
+
+    curvatura = 2 * aversao * np.maximum(desvios ** 2, VARIANCIA_MINIMA)
+
+    def pesos_para(mu: float) -> np.ndarray:
+        # Para um μ fixo, ν de cada setor por bisseção simultânea (ν = 0 se o setor já cabe no limite)
+        livres = np.clip((yields - mu) / curvatura, 0, limites_ativo)
+        excedidos = np.bincount(grupos, weights=livres, minlength=len(limites_grupo)) > limites_grupo
+        baixo = np.zeros(len(limites_grupo))
+        alto = np.where(excedidos, yields.max() - mu + 1, 0.0)
+        for _ in range(ITERACOES_BISSECAO):
+            nu = (baixo + alto) / 2
+            soma = np.bincount(
+                grupos, weights=np.clip((yields - mu - nu[grupos]) / curvatura, 0, limites_ativo),
+                minlength=len(limites_grupo)
+            )
+            acima = soma > limites_grupo
+            baixo = np.where(acima, nu, baixo)
+            alto = np.where(acima, alto, nu)
+        return np.clip((yields - mu - alto[grupos]) / curvatura, 0, limites_ativo)
+
+    # Σ w(μ) é decrescente em μ: bisseção para Σ w = 1
+    baixo = float((yields - curvatura * limites_ativo).min()) - 1
+    alto = float(yields.max())
+    for _ in range(ITERACOES_BISSECAO):
+        mu = (baixo + alto) / 2
+        if pesos_para(mu).sum() > 1:
+            baixo = mu
+        else:
+            alto = mu
+    pesos = pesos_para(baixo)
+    return pesos / pesos.sum()
+
+
+# Número finito a partir do corpo da requisição (int, float ou texto numérico; booleanos não).
+def _numero(nome: str, valor) -> float:
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise OtimizacaoErro(f'{nome} deve ser um número.')
+    try:
+        numero = float(valor)
+    except ValueError:
+        raise OtimizacaoErro(f'{nome} deve ser um número.')
+    if not math.isfinite(numero):
+        raise OtimizacaoErro(f'{nome} deve ser um número.')
+    return numero
+
+
+# Lista de ids de ativos (inteiros ou textos numéricos), ou None para todos os ativos.
+def _ids(valor) -> Optional[List[int]]:
+    if valor is None or valor == []:
+        return None
+    if not isinstance(valor, list) or not all(
+        (isinstance(i, int) and not isinstance(i, bool)) or (isinstance(i, str) and i.strip().isdigit()) for i in valor
+    ):
+        raise OtimizacaoErro('ativos_ids inválido.')
+    return [int(i) for i in valor]
+
+
+# Otimiza a carteira da meta entre os ativos candidatos do usuário e simula o resultado (salvo como
+# Simulacao se salvar=True). Limites em % (0-100); limites_setor sobrescreve limite_setor por setor.
+# Os parâmetros podem vir crus do corpo da requisição: valores inválidos levantam OtimizacaoErro.
+def otimizar_meta(meta, usuario_id: int, ativos_ids: Optional[List[int]] = None, limite_ativo: float = 100.0,
+                  limite_setor: float = 100.0, limites_setor: Optional[Dict[str, float]] = None,
+                  aversao_risco: float = 0.0, salvar: bool = False, observacoes: str = '') -> Dict:
+    ativos_ids = _ids(ativos_ids)
+    if limites_setor is not None and not isinstance(limites_setor, dict):
+        raise OtimizacaoErro('limites_setor deve ser um objeto {setor: limite}.')
+    limite_ativo = _numero('limite_ativo', limite_ativo)
+    limite_setor = _numero('limite_setor', limite_setor)
+    limites_setor = {str(s): _numero(f'limites_setor[{s}]', v) for s, v in (limites_setor or {}).items()}
+    aversao_risco = _numero('aversao_risco', aversao_risco)
+
+    for nome, valor in (('limite_ativo', limite_ativo), ('limite_setor', limite_setor),
+                        *((f'limites_setor[{s}]', v) for s, v in limites_setor.items())):
+        if not 0 < valor <= 100:
+            raise OtimizacaoErro(f'{nome} deve estar entre 0 e 100.')
+    if aversao_risco < 0:
+        raise OtimizacaoErro('aversao_risco não pode ser negativa.')
+
+    # Yield e volatilidade de cada ativo vêm do histórico guardado (mesmos números de /api/ativos/analytics/)
+    indicadores = indicadores_usuario(usuario_id)
+    if ativos_ids:
+        selecionados = set(ativos_ids)
+        indicadores = [i for i in indicadores if i['ativo'] in selecionados]
+
+    candidatos = [i for i in indicadores if i['yield_ultimo_ano']]
+    ignorados = [
+        {'ativo': i['ativo'], 'ticker': i['ticker'], 'motivo': 'Sem yield no último ano completo (dividendos ou preço ausentes).'}
+        for i in indicadores if not i['yield_ultimo_ano']
+    ]
+    if not candidatos:
+        raise OtimizacaoErro('Nenhum ativo com yield calculável; importe os dividendos dos ativos.')
+
+    yields = np.array([c['yield_ultimo_ano'] for c in candidatos], dtype=float)
+    volatilidades = np.array([c['volatilidade_5a'] if c['volatilidade_5a'] is not None else np.nan for c in candidatos])
+    # Sem histórico suficiente: assume a maior volatilidade observada entre os candidatos
+    conhecidas = volatilidades[~np.isnan(volatilidades)]
+    volatilidades = np.where(np.isnan(volatilidades), conhecidas.max() if len(conhecidas) else 1.0, volatilidades)
+
+    # Ativos sem setor formam grupos individuais, sem limite de setor
+    setores, grupos, limites_grupo = {}, [], []
+    limites_setor = {s.lower(): v for s, v in limites_setor.items()}
+    for c in candidatos:
+        chave = c['setor'] or f"#{c['ativo']}"
+        if chave not in setores:
+            setores[chave] = len(setores)
+            limites_grupo.append(
+                limites_setor.get(c['setor'].lower(), limite_setor) / 100 if c['setor'] else np.inf
+            )
+        grupos.append(setores[chave])
+    grupos = np.array(grupos)
+    limites_grupo = np.array(limites_grupo, dtype=float)
+
+    pesos = otimizar_pesos(
+        yields, yields * volatilidades, np.full(len(candidatos), limite_ativo / 100),
+        grupos, limites_grupo, aversao_risco
+    )
+
+    def simular(yield_carteira: float) -> Dict:
+        return calcular_simulacao_dividendos(
+            renda_mensal_desejada=meta.renda_mensal_desejada,
+            anos_para_atingir=meta.anos_para_atingir,
+            inflacao_media_anual=meta.inflacao_media_anual,
+            percentual_reinvestimento=meta.percentual_reinvestimento,
+            yield_medio=Decimal(str(round(yield_carteira, 2))),
+        )
+
+    yield_carteira = float(pesos @ yields)
+    resultado = simular(yield_carteira)
+    iguais = simular(float(yields.mean()))
+
+    if salvar:
+        alocacao = ', '.join(f"{c['ticker']} {pesos[i] * 100:.1f}%" for i, c in enumerate(candidatos) if pesos[i] >= 0.0005)
+        Simulacao.objects.create(
+            meta_renda=meta,
+            patrimonio_alvo=resultado['patrimonio_alvo'],
+            aporte_mensal=resultado['aporte_mensal'],
+            yield_medio_usado=resultado['yield_medio_usado'],
+            observacoes=observacoes or f'Carteira otimizada: {alocacao}'
+        )
+
+    itens = sorted(({
+        'ativo': c['ativo'],
+        'ticker': c['ticker'],
+        'setor': c['setor'],
+        'peso': round(float(pesos[i]), 4),
+        'yield': c['yield_ultimo_ano'],
+        'volatilidade': round(float(volatilidades[i]), 4),
+    } for i, c in enumerate(candidatos)), key=lambda item: (-item['peso'], item['ticker']))
+
+    return {
+        'meta': meta.id,
+        'yield_carteira': round(yield_carteira, 2),
+        'volatilidade_carteira': round(float(np.sqrt(((pesos * yields * volatilidades) ** 2).sum())), 4),
+        **resultado,
+        'pesos_iguais': {'yield_medio_usado': round(float(yields.mean()), 2), 'aporte_mensal': iguais['aporte_mensal']},
+        'pesos': itens,
+        'setores': [{
+            'setor': chave if not chave.startswith('#') else None,
+            'peso': round(float(pesos[grupos == g].sum()), 4),
+            'limite': None if np.isinf(limites_grupo[g]) else round(float(limites_grupo[g]), 4),
+        } for chave, g in setores.items() if not chave.startswith('#')],
+        'ignorados': ignorados,
+    }
@@ -0,0 +1,198 @@
+"""
+Painel pré-calculado por usuário (GET /api/dashboard/).
+
+O painel fica em uma única linha (PainelUsuario) com duas seções:
+- carteira: quantidade de ativos, dividendos dos últimos 12 meses, yield e próximos pagamentos;
+- metas: última simulação de cada meta.
+
+Alterações nos dados de origem apenas marcam a seção afetada como pendente (um UPDATE);
+a leitura recalcula somente as seções pendentes, de modo que sem alterações o painel
+é servido com uma leitura por chave.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .dividendos import dividendos_usuario
+from .models import Ativo, MetaRenda, PainelUsuario, Simulacao, TickerCatalogo
+
+
+# Quantidade de próximos pagamentos listados no painel.
+MAX_PROXIMOS_PAGAMENTOS = 10
+
+# Janela (dias) dos próximos pagamentos, confirmados ou estimados.
+JANELA_PROXIMOS_DIAS = 120
+
+
+# Marca seções do painel como pendentes para os usuários informados (ids ou queryset de ids).
+def marcar_painel(usuarios: Iterable, carteira: bool = False, metas: bool = False) -> int:
+    campos = {}
+    if carteira:
+        campos['carteira_pendente'] = True
+    if metas:
+        campos['metas_pendente'] = True
+    if not campos:
+        return 0
+    return PainelUsuario.objects.filter(usuario_id__in=usuarios).update(versao=F('versao') + 1, **campos)
+
+
+# Retorna os dados do painel do usuário, recalculando apenas as seções pendentes.
+def obter_painel(usuario_id: int) -> Dict:
+    painel, _ = PainelUsuario.objects.get_or_create(usuario_id=usuario_id)
+    hoje = timezone.localdate()
+
+    recalcular_carteira = painel.carteira_pendente or painel.data_referencia != hoje
+    if not (recalcular_carteira or painel.metas_pendente):
+        return {**painel.dados, 'data_atualizacao': painel.data_atualizacao}
+
+    dados = dict(painel.dados)
+    if recalcular_carteira:
+        dados['carteira'] = calcular_carteira(usuario_id, hoje)
+    if painel.metas_pendente:
+        dados['metas'] = calcular_metas(usuario_id)
+
+    agora = timezone.now()
+    # Só limpa as marcações se nada mudou durante o recálculo (mesma versão);
+    # caso contrário grava os dados e deixa a seção pendente para a próxima leitura
+    limpou = PainelUsuario.objects.filter(id=painel.id, versao=painel.versao).update(
+        dados=dados, carteira_pendente=False, metas_pendente=False,
+        data_referencia=hoje, data_atualizacao=agora
+    )
+    if not limpou:
+        PainelUsuario.objects.filter(id=painel.id).update(dados=dados, data_atualizacao=agora)
+    return {**dados, 'data_atualizacao': agora}
+
+
+# Seção carteira: ativos, dividendos por ação nos últimos 12 meses, yield pelo último preço conhecido
+# e próximos pagamentos (confirmados ou estimados a partir do mesmo mês do ano anterior).
+def calcular_carteira(usuario_id: int, hoje: Optional[date] = None) -> Dict:
+    hoje = hoje or timezone.localdate()
+    inicio = hoje - timedelta(days=365)
+    limite = hoje + timedelta(days=JANELA_PROXIMOS_DIAS)
+
+    ativos = list(Ativo.objects.filter(usuario_id=usuario_id).values('id', 'ticker', 'nome_empresa'))
+    precos = dict(
+        TickerCatalogo.objects.filter(ticker__in={a['ticker'] for a in ativos}, ultimo_preco__isnull=False)
+        .values_list('ticker', 'ultimo_preco')
+    )
+
+    soma_12m = defaultdict(Decimal)
+    passados = defaultdict(list)
+    confirmados = []
+    for linha in dividendos_usuario(usuario_id, data_inicio=inicio).iterator():
+        if linha['r_data'] > hoje:
+            if linha['r_data'] <= limite:
+                confirmados.append(linha)
+        else:
+            soma_12m[linha['r_ativo']] += Decimal(str(linha['r_valor']))
+            passados[linha['r_ativo']].append(linha)
+
+    por_ativo = []
+    yields = []
+    for ativo in ativos:
+        total = soma_12m.get(ativo['id'], Decimal('0'))
+        preco = precos.get(ativo['ticker'])
+        yield_12m = (total / preco * Decimal('100')).quantize(Decimal('0.01')) if preco else None
+        if yield_12m is not None:
+            yields.append(yield_12m)
+        por_ativo.append({
+            'ativo': ativo['id'],
+            'ticker': ativo['ticker'],
+            'nome_empresa': ativo['nome_empresa'],
+            'dividendos_12m': float(total),
+            'ultimo_preco': float(preco) if preco else None,
+            'yield_12m': float(yield_12m) if yield_12m is not None else None,
+        })
+
+    proximos = [{
+        'ativo': linha['r_ativo'],
+        'ticker': linha['r_ticker'],
+        'data_pagamento': linha['r_data'].isoformat(),
+        'valor_por_acao': float(linha['r_valor']),
+        'confirmado': True,
+    } for linha in confirmados]
+
+    # Estimativa: pagamentos de um ano atrás que caem na janela, se o ativo não tem um confirmado no mesmo mês
+    meses_confirmados = {(p['ativo'], p['data_pagamento'][:7]) for p in proximos}
+    for ativo_id, linhas in passados.items():
+        for linha in linhas:
+            try:
+                estimada = linha['r_data'].replace(year=linha['r_data'].year + 1)
+            except ValueError:
+                # 29/02 sem correspondente no ano seguinte
+                estimada = linha['r_data'] + timedelta(days=365)
+            chave = (ativo_id, estimada.isoformat()[:7])
+            if hoje < estimada <= limite and chave not in meses_confirmados:
+                meses_confirmados.add(chave)
+                proximos.append({
+                    'ativo': ativo_id,
+                    'ticker': linha['r_ticker'],
+                    'data_pagamento': estimada.isoformat(),
+                    'valor_por_acao': float(linha['r_valor']),
+                    'confirmado': False,
+                })
+    proximos.sort(key=lambda p: (p['data_pagamento'], p['ticker']))
+
+    return {
+        'total_ativos': len(ativos),
+        'dividendos_12m_por_acao': float(sum(soma_12m.values(), Decimal('0'))),
+        'yield_medio_12m': float(sum(yields) / len(yields)) if yields else None,
+        'por_ativo': por_ativo,
+        'proximos_pagamentos': proximos[:MAX_PROXIMOS_PAGAMENTOS],
+    }
+
+
+# Seção metas: cada meta do usuário com sua simulação mais recente.
+def calcular_metas(usuario_id: int) -> Dict:
+    ultima = Simulacao.objects.filter(meta_renda=OuterRef('pk')).order_by('-data_execucao', '-id')
+    metas = list(
+        MetaRenda.objects.filter(usuario_id=usuario_id)
+        .annotate(ultima_simulacao_id=Subquery(ultima.values('id')[:1]))
+        .values('id', 'nome', 'renda_mensal_desejada', 'anos_para_atingir', 'ultima_simulacao_id')
+        .order_by('-data_criacao')
+    )
+    simulacoes = {
+        s['id']: s for s in Simulacao.objects.filter(
+            id__in=[m['ultima_simulacao_id'] for m in metas if m['ultima_simulacao_id']]
+        ).values('id', 'patrimonio_alvo', 'aporte_mensal', 'yield_medio_usado', 'data_execucao')
+    }
+
+    itens = []
+    for meta in metas:
+        simulacao = simulacoes.get(meta['ultima_simulacao_id'])
+        itens.append({
+            'id': meta['id'],
+            'nome': meta['nome'],
+            'renda_mensal_desejada': float(meta['renda_mensal_desejada']),
+            'anos_para_atingir': meta['anos_para_atingir'],
+            'ultima_simulacao': {
+                'id': simulacao['id'],
+                'patrimonio_alvo': float(simulacao['patrimonio_alvo']),
+                'aporte_mensal': float(simulacao['aporte_mensal']),
+                'yield_medio_usado': float(simulacao['yield_medio_usado']) if simulacao['yield_medio_usado'] is not None else None,
+                'data_execucao': simulacao['data_execucao'].isoformat(),
+            } if simulacao else None,
+        })
+    return {'total_metas': len(metas), 'metas': itens}
+
+
+# Receptores de post_save/post_delete (conectados em apps.ready): marcam a seção afetada do painel.
+def ao_alterar_ativo(sender, instance, **kwargs):
+    marcar_painel([instance.usuario_id], carteira=True)
+
+
+def ao_alterar_dividendo(sender, instance, **kwargs):
+    marcar_painel(Ativo.objects.filter(id=instance.ativo_id).values('usuario_id'), carteira=True)
+
+
+def ao_alterar_meta(sender, instance, **kwargs):
+    marcar_painel([instance.usuario_id], metas=True)
+
+
+def ao_alterar_simulacao(sender, instance, **kwargs):
+    marcar_painel(MetaRenda.objects.filter(id=instance.meta_renda_id).values('usuario_id'), metas=True)
@@ -0,0 +1,44 @@
+"""
+Renderizador JSON da API.
+
+Usa orjson quando instalado: serializa dict/list/str/int/float, UUIDs e arrays NumPy em código nativo,
+direto para bytes, várias vezes mais rápido que o módulo json da biblioteca padrão. Os demais tipos
+(Decimal, datas, QuerySet, textos traduzíveis...) passam pelo mesmo encoder do DRF, então a saída tem o
+mesmo formato do JSONRenderer padrão (ex: datetime com milissegundos e 'Z'). Sem orjson, o renderizador
+é o próprio JSONRenderer do DRF.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+
+_encoder = JSONEncoder()
+
+
+# Tipos que o orjson não conhece: mesma conversão do encoder do DRF (Decimal vira número, datas ISO...).
+def _padrao(obj):
+    return _encoder.default(obj)
+
+
+# JSONRenderer com orjson (mesma saída do padrão; indentação só quando o cliente pede via Accept).
+class JSONRapidoRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            opcoes |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, default=_padrao, option=opcoes)
+        except orjson.JSONEncodeError:
+            # Casos que o orjson recusa (ex: inteiros acima de 64 bits): caminho padrão do DRF
+            return super().render(data, accepted_media_type, renderer_context)
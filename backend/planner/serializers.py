@@ -3,8 +3,10 @@ Serializers do Django REST Framework para expor os modelos via API.
 """
 
 from rest_framework import serializers
+from django.utils import timezone
+from rest_framework.validators import UniqueTogetherValidator
 from django.contrib.auth.models import User
-from .models import Ativo, HistoricoDividendo, MetaRenda, Simulacao
+from .models import Ativo, HistoricoDividendo, MetaRenda, Simulacao, PerfilRequisicao, TickerCatalogo, Tarefa
 
 
 # Serializer para User (apenas leitura, para referências).
@@ -24,9 +26,33 @@ class HistoricoDividendoSerializer(serializers.ModelSerializer):
         model = HistoricoDividendo
         fields = [
             'id', 'ativo', 'ativo_ticker', 'ativo_nome',
-            'data_pagamento', 'valor_por_acao', 'fonte', 'observacoes', 'data_criacao'
+            'data_pagamento', 'valor_por_acao', 'fonte', 'observacoes', 'data_criacao',
+            'data_atualizacao'
         ]
-        read_only_fields = ['id', 'data_criacao']
+        read_only_fields = ['id', 'data_criacao', 'data_atualizacao']
+        validators = [
+            UniqueTogetherValidator(
+                queryset=HistoricoDividendo.objects.all(),
+                fields=['ativo', 'data_pagamento', 'valor_por_acao'],
+                message='Este pagamento já está registrado para o ativo.'
+            )
+        ]
+
+
+# Serializer (somente leitura) das linhas do histórico consolidado (planner.dividendos.dividendos_usuario).
+# Eventos compartilhados vêm com id nulo e editavel=False.
+class DividendoConsolidadoSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='r_id', allow_null=True)
+    ativo = serializers.IntegerField(source='r_ativo')
+    ativo_ticker = serializers.CharField(source='r_ticker')
+    ativo_nome = serializers.CharField(source='r_nome')
+    data_pagamento = serializers.DateField(source='r_data')
+    valor_por_acao = serializers.DecimalField(source='r_valor', max_digits=10, decimal_places=4)
+    fonte = serializers.CharField(source='r_fonte')
+    observacoes = serializers.CharField(source='r_observacoes', allow_null=True)
+    data_criacao = serializers.DateTimeField(source='r_criacao')
+    data_atualizacao = serializers.DateTimeField(source='r_atualizacao')
+    editavel = serializers.BooleanField(source='r_editavel')
 
 
 # Serializer para Ativo.
@@ -44,19 +70,26 @@ class AtivoSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'data_criacao', 'data_atualizacao']
 
-    # Calcula o total de dividendos do último ano para este ativo.
+    # Normaliza o ticker (maiúsculas, sem espaços), como no formulário e no lote: é a chave de junção com os eventos.
+    def validate_ticker(self, value):
+        return value.upper().strip()
+
+    # Calcula o total de dividendos do último ano para este ativo (lançamentos próprios + eventos compartilhados).
+    # Na listagem o total já vem anotado pelo ViewSet (anotar_total_dividendos); nos demais casos é calculado aqui.
     def get_total_dividendos_ano(self, obj):
-        from datetime import datetime, timedelta
-        from django.db.models import Sum
-        
-        um_ano_atras = datetime.now().date() - timedelta(days=365)
-        total = obj.historico_dividendos.filter(
-            data_pagamento__gte=um_ano_atras
-        ).aggregate(Sum('valor_por_acao'))['valor_por_acao__sum']
+        from .dividendos import inicio_ano_dividendos, total_dividendos_desde
+
+        total = getattr(obj, 'total_dividendos', None)
+        if total is None:
+            total = total_dividendos_desde(obj, inicio_ano_dividendos())
         
         return float(total) if total else 0.0
 
 
+# Quantidade de simulações recentes aninhadas em cada meta.
+SIMULACOES_POR_META = 5
+
+
 # Serializer para MetaRenda.
 class MetaRendaSerializer(serializers.ModelSerializer):
     usuario_username = serializers.CharField(source='usuario.username', read_only=True)
@@ -71,9 +104,12 @@ class MetaRendaSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'data_criacao', 'data_atualizacao']
 
-    # Retorna as últimas 5 simulações desta meta.
+    # Retorna as últimas 5 simulações desta meta. Na listagem elas já vêm pré-carregadas pelo ViewSet
+    # (simulacoes_recentes); nos demais casos (ex: após criar) são buscadas aqui.
     def get_simulacoes(self, obj):
-        simulacoes = obj.simulacoes.all()[:5]
+        simulacoes = getattr(obj, 'simulacoes_recentes', None)
+        if simulacoes is None:
+            simulacoes = obj.simulacoes.select_related('meta_renda')[:SIMULACOES_POR_META]
         return SimulacaoSerializer(simulacoes, many=True).data
 
 
@@ -89,3 +125,194 @@ class SimulacaoSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'data_execucao']
 
+
+
+# Serializer para PerfilRequisicao (sem o dump binário, disponível no download).
+class PerfilRequisicaoSerializer(serializers.ModelSerializer):
+    usuario_username = serializers.CharField(source='usuario.username', read_only=True, default=None)
+
+    class Meta:
+        model = PerfilRequisicao
+        fields = [
+            'id', 'metodo', 'caminho', 'status_code', 'duracao_ms', 'usuario',
+            'usuario_username', 'motivo', 'resumo', 'consultas_sql', 'data_criacao'
+        ]
+        read_only_fields = fields
+
+
+# Serializer para TickerCatalogo (catálogo global, somente leitura).
+class TickerCatalogoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TickerCatalogo
+        fields = ['ticker', 'nome', 'setor', 'tipo', 'data_atualizacao']
+
+
+# Serializer para Tarefa (somente leitura: status, progresso e resultado de uma tarefa assíncrona).
+class TarefaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Tarefa
+        fields = [
+            'id', 'tipo', 'status', 'progresso', 'mensagem', 'resultado', 'erro',
+            'tentativas', 'data_criacao', 'data_inicio', 'data_conclusao'
+        ]
+        read_only_fields = fields
+
+
+# ListSerializer para operações em lote: valida todos os itens, faz as checagens que dependem do banco
+# com uma consulta para o lote inteiro (validar_lote) e grava com um único bulk_create/bulk_update.
+# Com context['atomico'] falso, itens inválidos são ignorados e reportados em erros_itens.
+class BulkListSerializer(serializers.ListSerializer):
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Envie uma lista de objetos.']})
+
+        validos, erros = [], []
+        for item in data:
+            try:
+                validos.append(self.child.run_validation(item))
+                erros.append({})
+            except serializers.ValidationError as exc:
+                validos.append(None)
+                erros.append(exc.detail)
+
+        self.child.validar_lote(validos, erros, self.instance)
+        self.erros_itens = [{'indice': i, 'erros': e} for i, e in enumerate(erros) if e]
+
+        if self.erros_itens and self.context.get('atomico', True):
+            raise serializers.ValidationError(erros)
+        return [v for v, e in zip(validos, erros) if not e]
+
+    def create(self, validated_data):
+        modelo = self.child.Meta.model
+        objetos = []
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            attrs.pop('id', None)
+            objetos.append(modelo(**attrs))
+        return modelo.objects.bulk_create(objetos, batch_size=500)
+
+    def update(self, instance, validated_data):
+        instancias = {obj.id: obj for obj in instance}
+        campos = set()
+        agora = timezone.now()
+        atualizados = []
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            obj = instancias[attrs.pop('id')]
+            for campo, valor in attrs.items():
+                setattr(obj, campo, valor)
+                campos.add(obj._meta.get_field(campo).name)
+            # bulk_update não aplica auto_now
+            obj.data_atualizacao = agora
+            atualizados.append(obj)
+        if atualizados:
+            campos.add('data_atualizacao')
+            self.child.Meta.model.objects.bulk_update(atualizados, sorted(campos), batch_size=500)
+        return atualizados
+
+
+# Base dos serializers de lote: "id" é obrigatório apenas em atualizações.
+class BulkItemSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    # Checagens em lote; registra erros por índice em "erros" (itens inválidos chegam como None).
+    def validar_lote(self, itens, erros, instancias):
+        if instancias is None:
+            return
+        ids_validos = {obj.id for obj in instancias}
+        for i, attrs in enumerate(itens):
+            if attrs is None:
+                continue
+            if attrs.get('id') not in ids_validos:
+                erros[i] = {'id': ['Informe o id de um registro existente.']}
+                itens[i] = None
+
+
+# Serializer de lote para Ativo (sem campos aninhados, para não gerar consultas por item).
+class AtivoBulkSerializer(BulkItemSerializer):
+
+    class Meta:
+        model = Ativo
+        fields = ['id', 'ticker', 'nome_empresa', 'setor', 'pais', 'observacoes', 'data_atualizacao']
+        read_only_fields = ['data_atualizacao']
+        list_serializer_class = BulkListSerializer
+
+    def validate_ticker(self, value):
+        return value.upper().strip()
+
+    # Verifica tickers repetidos no lote e já cadastrados para o usuário com uma única consulta.
+    def validar_lote(self, itens, erros, instancias):
+        super().validar_lote(itens, erros, instancias)
+        ids_lote = {attrs.get('id') for attrs in itens if attrs}
+        existentes = dict(
+            Ativo.objects.filter(
+                usuario_id=self.context['usuario_id'],
+                ticker__in={attrs['ticker'] for attrs in itens if attrs and 'ticker' in attrs}
+            ).exclude(id__in=ids_lote).values_list('ticker', 'id')
+        )
+        vistos = set()
+        for i, attrs in enumerate(itens):
+            if not attrs or 'ticker' not in attrs:
+                continue
+            ticker = attrs['ticker']
+            if ticker in existentes or ticker in vistos:
+                erros[i] = {'ticker': [f'Ativo {ticker} já cadastrado.']}
+                itens[i] = None
+            vistos.add(ticker)
+
+
+# Serializer de lote para HistoricoDividendo; "ativo" é o id e precisa pertencer ao usuário.
+class HistoricoDividendoBulkSerializer(BulkItemSerializer):
+    ativo = serializers.IntegerField(source='ativo_id', required=False)
+
+    class Meta:
+        model = HistoricoDividendo
+        fields = ['id', 'ativo', 'data_pagamento', 'valor_por_acao', 'fonte', 'observacoes', 'data_atualizacao']
+        read_only_fields = ['data_atualizacao']
+        list_serializer_class = BulkListSerializer
+
+    # Valida posse dos ativos e pagamentos duplicados com uma consulta cada para o lote.
+    def validar_lote(self, itens, erros, instancias):
+        super().validar_lote(itens, erros, instancias)
+        atuais = {obj.id: obj for obj in instancias} if instancias is not None else {}
+
+        # Completa os campos ausentes (PATCH) com os valores atuais para checar duplicidade
+        chaves = []
+        for attrs in itens:
+            if not attrs:
+                chaves.append(None)
+                continue
+            atual = atuais.get(attrs.get('id'))
+            ativo_id = attrs.get('ativo_id', atual.ativo_id if atual else None)
+            data = attrs.get('data_pagamento', atual.data_pagamento if atual else None)
+            valor = attrs.get('valor_por_acao', atual.valor_por_acao if atual else None)
+            chaves.append((ativo_id, data, valor))
+
+        for i, chave in enumerate(chaves):
+            if chave and None in chave:
+                erros[i] = {'non_field_errors': ['ativo, data_pagamento e valor_por_acao são obrigatórios.']}
+                itens[i] = chaves[i] = None
+
+        ativos_usuario = set(
+            Ativo.objects.filter(
+                usuario_id=self.context['usuario_id'], id__in={c[0] for c in chaves if c}
+            ).values_list('id', flat=True)
+        )
+        existentes = {
+            (a, d, v): id_ for id_, a, d, v in HistoricoDividendo.objects.filter(
+                ativo_id__in=ativos_usuario, data_pagamento__in={c[1] for c in chaves if c}
+            ).values_list('id', 'ativo_id', 'data_pagamento', 'valor_por_acao')
+        }
+
+        vistos = set()
+        for i, chave in enumerate(chaves):
+            if not chave:
+                continue
+            if chave[0] not in ativos_usuario:
+                erros[i] = {'ativo': ['Ativo inválido.']}
+                itens[i] = None
+            elif chave in vistos or existentes.get(chave, itens[i].get('id')) != itens[i].get('id'):
+                erros[i] = {'non_field_errors': ['Este pagamento já está registrado para o ativo.']}
+                itens[i] = None
+            vistos.add(chave)
@@ -0,0 +1,336 @@
+"""
+Séries temporais colunares por ticker (dividendos e preços) em arquivos NumPy mapeados em memória.
+
+Cada série fica em colunas .npy no diretório do ticker (settings.PLANNER_SERIES['DIRETORIO']):
+- datas: int32, dias desde 1970-01-01, em ordem crescente;
+- valores: int64 escalado por ESCALA_DIVIDENDOS nos dividendos (exato para as 4 casas de
+  EventoDividendo.valor_por_acao) ou float64 nos preços de fechamento;
+- datas_com (só dividendos): int32, data com de cada pagamento, no mesmo formato de datas.
+
+Os eventos corporativos do ticker (planner.ajustes) ficam em uma terceira série, eventos: datas e fator
+acumulado (float64). As leituras ajustadas (dividendos_ajustados, precos_ajustados, ajustar) dividem cada
+valor pelo fator do primeiro evento com data >= a data do valor, localizado por busca binária.
+
+A data de um evento corporativo é a data com (último dia com direito), então a de um dividendo também deve
+ser: é ela que decide se o valor foi declarado na base de ações antiga. Um dividendo com data com antes do
+desdobramento e pagamento depois dele ainda está na base antiga. Por isso a série de dividendos tem uma
+coluna extra, datas_com (EventoDividendo.data_com, ou a data de pagamento quando a Brapi não a informou),
+usada só na busca do fator; somas e janelas continuam pela data de pagamento (datas).
+
+O banco continua sendo a fonte da verdade: o caminho de importação (importar_eventos_ticker) regrava
+as colunas do ticker depois de gravar os eventos, e o comando reconstruir_series refaz tudo a partir
+do banco. As gravações feitas dentro de uma transação ficam para depois do commit (gravar_apos_commit),
+para que uma transação desfeita (ex: /api/batch/) não deixe arquivos diferentes do banco; enquanto ela
+está aberta, dividendos e eventos são lidos do próprio banco.
+
+A leitura usa np.load(mmap_mode='r'): somas e buscas por janela são operações sobre os arrays mapeados,
+sem materializar objetos Python por pagamento. Colunas pequenas (até LIMITE_MMAP_BYTES, caso da maioria
+das séries de dividendos e eventos) são lidas para a memória, sem manter arquivo aberto; o cache de arrays
+abertos guarda no máximo MAX_ABERTOS colunas (LRU), e cada mapeamento descartado é fechado (com o seu
+descritor de arquivo) quando o último array que o usa é liberado.
+"""
+
+import os
+import re
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .janelas import inicio_janela, montar_resumo
+from .models import EventoCorporativo, EventoDividendo
+
+
+# Fator de escala dos dividendos (4 casas decimais) para guardá-los como inteiros.
+ESCALA_DIVIDENDOS = 10_000
+
+EPOCA = date(1970, 1, 1)
+
+_ORDINAL_EPOCA = EPOCA.toordinal()
+
+_TICKER_VALIDO = re.compile(r'^[A-Z0-9][A-Z0-9.\-]{0,19}$')
+
+# datas (int32, dias desde EPOCA) e valores (int64 escalado, ou float64 em preços e leituras ajustadas).
+Serie = namedtuple('Serie', ['datas', 'valores', 'datas_com'], defaults=[None])
+
+# Colunas até este tamanho são lidas para a memória (sem mmap nem descritor de arquivo aberto).
+LIMITE_MMAP_BYTES = 256 * 1024
+
+# Colunas guardadas no cache de arrays abertos (cada mapeamento mantém um descritor de arquivo).
+MAX_ABERTOS = 128
+
+# Arrays abertos por caminho, com a identificação do arquivo (inode, mtime) em que foram lidos, do menos
+# para o mais recentemente usado.
+_abertos: 'OrderedDict[Path, Tuple[tuple, np.ndarray]]' = OrderedDict()
+
+
+# Diretório raiz das séries.
+def diretorio() -> Path:
+    return Path(getattr(settings, 'PLANNER_SERIES', {}).get('DIRETORIO') or Path(settings.BASE_DIR) / 'series')
+
+
+# Converte uma data para dias desde EPOCA (o formato da coluna datas).
+def para_dia(data: date) -> int:
+    return data.toordinal() - _ORDINAL_EPOCA
+
+
+# Converte dias desde EPOCA para data.
+def para_data(dia: int) -> date:
+    return EPOCA + timedelta(days=int(dia))
+
+
+def _caminho(ticker: str, tipo: str, coluna: str) -> Path:
+    ticker = ticker.upper().strip()
+    # O ticker vira nome de diretório: nada de separadores ou '..'
+    if not _TICKER_VALIDO.match(ticker) or '..' in ticker:
+        raise ValueError(f'Ticker inválido: {ticker}')
+    return diretorio() / ticker / f'{tipo}.{coluna}.npy'
+
+
+# Grava uma coluna de forma atômica (arquivo temporário + os.replace): leitores com o arquivo
+# antigo mapeado continuam com ele, os novos abrem o arquivo novo.
+def _gravar_coluna(caminho: Path, valores: np.ndarray) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f'.{caminho.name}.{os.getpid()}.tmp')
+    with open(temporario, 'wb') as arquivo:
+        np.save(arquivo, valores)
+    os.replace(temporario, caminho)
+
+
+def _gravar(ticker: str, tipo: str, datas: np.ndarray, valores: np.ndarray,
+            datas_com: Optional[np.ndarray] = None) -> None:
+    # valores (e datas_com) antes de datas: _ler descarta leituras com tamanhos diferentes durante a troca
+    _gravar_coluna(_caminho(ticker, tipo, 'valores'), valores)
+    if datas_com is not None:
+        _gravar_coluna(_caminho(ticker, tipo, 'datas_com'), datas_com)
+    _gravar_coluna(_caminho(ticker, tipo, 'datas'), datas)
+
+
+def _abrir(caminho: Path) -> Optional[np.ndarray]:
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    identificacao = (info.st_ino, info.st_mtime_ns, info.st_size)
+    aberto = _abertos.get(caminho)
+    if aberto is not None and aberto[0] == identificacao:
+        _abertos.move_to_end(caminho)
+        return aberto[1]
+    array = np.load(caminho, mmap_mode='r' if info.st_size > LIMITE_MMAP_BYTES else None)
+    _abertos[caminho] = (identificacao, array)
+    _abertos.move_to_end(caminho)
+    # Sem fechar o mmap à força: séries já devolvidas podem estar em uso; o mapeamento (e o descritor)
+    # é liberado quando o array descartado deixa de ser referenciado
+    while len(_abertos) > MAX_ABERTOS:
+        _abertos.popitem(last=False)
+    return array
+
+
+def _ler(ticker: str, tipo: str) -> Optional[Serie]:
+    for _ in range(2):
+        datas = _abrir(_caminho(ticker, tipo, 'datas'))
+        valores = _abrir(_caminho(ticker, tipo, 'valores'))
+        if datas is None or valores is None:
+            return None
+        # Só dividendos têm datas_com; arquivos gravados antes da coluna existir seguem sem ela
+        datas_com = _abrir(_caminho(ticker, tipo, 'datas_com')) if tipo == 'dividendos' else None
+        if len(datas) == len(valores) and (datas_com is None or len(datas_com) == len(datas)):
+            return Serie(datas, valores, datas_com)
+    # Gravação em andamento: o chamador trata como série ausente
+    return None
+
+
+# Série de dividendos do ticker montada a partir de EventoDividendo (mesmo formato da coluna gravada).
+def _dividendos_banco(ticker: str) -> Serie:
+    linhas = list(
+        EventoDividendo.objects.filter(ticker=ticker.upper().strip())
+        .order_by('data_pagamento', 'id').values_list('data_pagamento', 'valor_por_acao', 'data_com')
+    )
+    datas = np.fromiter((d.toordinal() - _ORDINAL_EPOCA for d, _, _ in linhas), dtype=np.int32, count=len(linhas))
+    valores = np.fromiter(
+        (int(v * ESCALA_DIVIDENDOS) for _, v, _ in linhas), dtype=np.int64, count=len(linhas)
+    )
+    datas_com = np.fromiter(
+        ((c or d).toordinal() - _ORDINAL_EPOCA for d, _, c in linhas), dtype=np.int32, count=len(linhas)
+    )
+    return Serie(datas, valores, datas_com)
+
+
+# Série de eventos corporativos do ticker (datas e fator acumulado) montada a partir de EventoCorporativo.
+def _eventos_banco(ticker: str) -> Serie:
+    linhas = list(
+        EventoCorporativo.objects.filter(ticker=ticker.upper().strip()).order_by('data', 'id')
+        .values_list('data', 'fator_acumulado')
+    )
+    return Serie(
+        np.fromiter((d.toordinal() - _ORDINAL_EPOCA for d, _ in linhas), dtype=np.int32, count=len(linhas)),
+        np.fromiter((float(f) for _, f in linhas), dtype=np.float64, count=len(linhas)),
+    )
+
+
+# Dentro de uma transação ainda não confirmada, os arquivos podem estar atrasados em relação ao banco.
+def _transacao_aberta() -> bool:
+    return connection.in_atomic_block
+
+
+# Regrava a série de dividendos do ticker a partir de EventoDividendo. Retorna a quantidade de pagamentos.
+def gravar_dividendos(ticker: str) -> int:
+    serie = _dividendos_banco(ticker)
+    _gravar(ticker.upper().strip(), 'dividendos', serie.datas, serie.valores, serie.datas_com)
+    return len(serie.datas)
+
+
+# Grava a série de preços de fechamento a partir de historicalDataPrice da Brapi
+# ([{"date": <epoch em segundos>, "close": ...}, ...]). Retorna a quantidade de pontos.
+def gravar_precos(ticker: str, historico: Optional[List[Dict]]) -> int:
+    pontos = {}
+    for ponto in historico or []:
+        if not isinstance(ponto, dict) or not ponto.get('date') or not ponto.get('close'):
+            continue
+        # Um fechamento por dia; o último da lista prevalece
+        pontos[int(ponto['date']) // 86400] = float(ponto['close'])
+    if not pontos:
+        return 0
+    dias = sorted(pontos)
+    _gravar(
+        ticker, 'precos',
+        np.array(dias, dtype=np.int32),
+        np.array([pontos[d] for d in dias], dtype=np.float64),
+    )
+    return len(dias)
+
+
+# Regrava a série de eventos corporativos (datas e fator acumulado) a partir de EventoCorporativo.
+def gravar_eventos(ticker: str) -> int:
+    serie = _eventos_banco(ticker)
+    _gravar(ticker.upper().strip(), 'eventos', serie.datas, serie.valores)
+    return len(serie.datas)
+
+
+# Executa gravar(ticker, *args) depois do commit da transação atual (na hora, fora de transação).
+# Falhas de disco só são registradas: a série é regravada na próxima importação ou por reconstruir_series.
+def gravar_apos_commit(gravar, ticker: str, *args) -> None:
+    def executar():
+        try:
+            gravar(ticker, *args)
+        except OSError as e:
+            print(f"Erro ao gravar séries de {ticker}: {e}")
+    transaction.on_commit(executar)
+
+
+# Fator de ajuste de cada dia (dias desde EPOCA): o fator acumulado do primeiro evento com data >= dia,
+# ou 1 depois do último evento (ou se o ticker não tem eventos).
+def fatores(ticker: str, dias: np.ndarray) -> np.ndarray:
+    return _fatores(_eventos_banco(ticker) if _transacao_aberta() else _ler(ticker, 'eventos'), dias)
+
+
+def _fatores(eventos: Optional[Serie], dias: np.ndarray) -> np.ndarray:
+    if eventos is None or not len(eventos.datas):
+        return np.ones(len(dias))
+    return np.append(np.asarray(eventos.valores, dtype=np.float64), 1.0)[np.searchsorted(eventos.datas, dias, side='left')]
+
+
+# Dias usados na busca do fator de cada pagamento: a data com, se a série a tem.
+def _dias_ajuste(serie: Serie) -> np.ndarray:
+    return serie.datas if serie.datas_com is None else serie.datas_com
+
+
+# Valores por ação (float, em R$) levados para a base de ações atual.
+def ajustar(ticker: str, dias: np.ndarray, valores: np.ndarray) -> np.ndarray:
+    return np.asarray(valores, dtype=np.float64) / fatores(ticker, dias)
+
+
+# Série de dividendos mapeada do ticker (valores escalados por ESCALA_DIVIDENDOS), ou None se não gravada.
+# Dentro de uma transação aberta, lida do banco.
+def dividendos(ticker: str) -> Optional[Serie]:
+    if _transacao_aberta():
+        return _dividendos_banco(ticker)
+    return _ler(ticker, 'dividendos')
+
+
+# Série de preços de fechamento mapeada do ticker, ou None se não gravada.
+def precos(ticker: str) -> Optional[Serie]:
+    return _ler(ticker, 'precos')
+
+
+# Dividendos por ação (float, em R$) na base de ações atual, ou None se a série não foi gravada.
+def dividendos_ajustados(ticker: str) -> Optional[Serie]:
+    serie = dividendos(ticker)
+    if serie is None:
+        return None
+    return Serie(serie.datas, ajustar(ticker, _dias_ajuste(serie), serie.valores) / ESCALA_DIVIDENDOS, serie.datas_com)
+
+
+# Dividendos do ticker calculados direto do banco, sem ler nem gravar arquivos (disco indisponível).
+# Com ajustado=True, em R$ na base de ações atual, como dividendos_ajustados.
+def dividendos_banco(ticker: str, ajustado: bool = False) -> Serie:
+    serie = _dividendos_banco(ticker)
+    if not ajustado:
+        return serie
+    fator = _fatores(_eventos_banco(ticker), _dias_ajuste(serie))
+    return Serie(serie.datas, np.asarray(serie.valores, dtype=np.float64) / fator / ESCALA_DIVIDENDOS, serie.datas_com)
+
+
+# Preços de fechamento na base de ações atual, ou None se a série não foi gravada.
+def precos_ajustados(ticker: str) -> Optional[Serie]:
+    serie = precos(ticker)
+    if serie is None:
+        return None
+    return Serie(serie.datas, ajustar(ticker, serie.datas, serie.valores))
+
+
+# Remove as séries do ticker (ex: ticker descontinuado).
+def remover(ticker: str) -> None:
+    for tipo in ('dividendos', 'precos', 'eventos'):
+        for coluna in ('datas', 'valores'):
+            caminho = _caminho(ticker, tipo, coluna)
+            _abertos.pop(caminho, None)
+            caminho.unlink(missing_ok=True)
+
+
+# Índices [i, j) dos pontos com data em [inicio, fim].
+def fatia(serie: Serie, inicio: date, fim: date) -> Tuple[int, int]:
+    i = int(np.searchsorted(serie.datas, para_dia(inicio), side='left'))
+    j = int(np.searchsorted(serie.datas, para_dia(fim), side='right'))
+    return i, max(i, j)
+
+
+# Soma os dividendos com data em [inicio, fim] (série bruta escalada ou ajustada em R$).
+# Retorna (total por ação, quantidade de pagamentos).
+def somar(serie: Serie, inicio: date, fim: date) -> Tuple[Decimal, int]:
+    i, j = fatia(serie, inicio, fim)
+    if np.issubdtype(serie.valores.dtype, np.integer):
+        return Decimal(int(serie.valores[i:j].sum(dtype=np.int64))) / ESCALA_DIVIDENDOS, j - i
+    return Decimal(repr(float(serie.valores[i:j].sum()))), j - i
+
+
+# Último preço com data até o dia informado, ou None.
+def preco_em(serie: Serie, data: date) -> Optional[Decimal]:
+    j = int(np.searchsorted(serie.datas, para_dia(data), side='right'))
+    if j == 0:
+        return None
+    return Decimal(str(float(serie.valores[j - 1])))
+
+
+# Resumo de uma janela (mesmo formato de planner.janelas.resumo_janela) sobre a série de dividendos.
+def resumo_janela(serie: Serie, janela: str, hoje: date, preco: Optional[Decimal] = None) -> dict:
+    primeira = para_data(serie.datas[0]) if len(serie.datas) else None
+    inicio = inicio_janela(janela, hoje, primeira)
+    total, quantidade = somar(serie, inicio, hoje)
+    return montar_resumo(janela, inicio, hoje, total, quantidade, preco)
+
+
+# Total de dividendos por ação de cada ticker em [inicio, fim], lendo só as séries mapeadas
+# (tickers sem série gravada ficam de fora).
+def totais_periodo(tickers: Iterable[str], inicio: date, fim: date) -> Dict[str, Decimal]:
+    totais = {}
+    for ticker in tickers:
+        serie = dividendos(ticker)
+        if serie is not None:
+            totais[ticker] = somar(serie, inicio, fim)[0]
+    return totais
@@ -4,8 +4,11 @@ Lógica de negócio para cálculos de simulação de dividendos.
 Esta camada separa a lógica de cálculo das views, seguindo boas práticas.
 """
 
+from datetime import timedelta
 from decimal import Decimal
-from typing import Dict, Optional
+from typing import Callable, Dict, List, Optional
+
+from django.utils import timezone
 
 
 # Calcula o patrimônio alvo e o aporte mensal necessário para atingir uma meta de renda mensal em dividendos.
@@ -93,3 +96,82 @@ def calcular_yield_medio_ativos(lista_ativos: list) -> Optional[Decimal]:
     yield_medio = sum(yields) / Decimal(str(len(yields)))
     return yield_medio.quantize(Decimal('0.01'))
 
+
+
+# Executa a simulação de uma MetaRenda: usa o yield informado ou calcula a média dos ativos (selecionados ou
+# todos do usuário) pela Brapi, com fallback nos dividendos locais. Opcionalmente salva a Simulacao.
+# progresso(percentual, mensagem) é chamado a cada ativo consultado (usado pelas tarefas assíncronas).
+def simular_meta(
+    meta,
+    usuario_id: int,
+    yield_medio: Optional[Decimal] = None,
+    ativos_ids: Optional[List[int]] = None,
+    salvar: bool = False,
+    observacoes: str = '',
+    progresso: Optional[Callable[[int, str], None]] = None
+) -> Dict[str, Decimal]:
+    from .brapi_service import BrapiService
+    from .dividendos import total_dividendos_desde, yield_ticker
+    from .models import Ativo, Simulacao
+
+    # Se não fornecido, tentar calcular baseado nos ativos selecionados ou do usuário
+    if yield_medio is None:
+        if ativos_ids:
+            # Usar apenas os ativos selecionados
+            ativos = list(Ativo.objects.filter(id__in=ativos_ids, usuario_id=usuario_id))
+        else:
+            # Usar todos os ativos do usuário
+            ativos = list(Ativo.objects.filter(usuario_id=usuario_id))
+        
+        yields = []
+        
+        for indice, ativo in enumerate(ativos):
+            if progresso:
+                progresso(int(90 * indice / len(ativos)), f'Calculando yield de {ativo.ticker}')
+            # Yield do último ano sobre o histórico local (a Brapi só é consultada se ele estiver desatualizado)
+            try:
+                yield_ativo = yield_ticker(ativo.ticker, '1y')
+                if yield_ativo:
+                    yields.append(yield_ativo)
+            except Exception as e:
+                print(f"Erro ao buscar yield de {ativo.ticker}: {e}")
+                # Se falhar, calcular baseado nos dividendos locais
+                um_ano_atras = timezone.now().date() - timedelta(days=365)
+                total_dividendos = total_dividendos_desde(ativo, um_ano_atras)
+                
+                if total_dividendos > 0:
+                    # Tentar buscar preço atual da Brapi
+                    preco = BrapiService.get_current_price(ativo.ticker)
+                    if preco and preco > 0:
+                        yield_ativo = (total_dividendos / preco) * Decimal('100')
+                        yields.append(yield_ativo)
+        
+        # Calcular média dos yields ou usar padrão
+        if yields:
+            yield_medio = sum(yields) / Decimal(str(len(yields)))
+        else:
+            yield_medio = Decimal('6.0')  # Padrão se não conseguir calcular
+    
+    if progresso:
+        progresso(90, 'Calculando simulação')
+    
+    # Executar simulação
+    resultado = calcular_simulacao_dividendos(
+        renda_mensal_desejada=meta.renda_mensal_desejada,
+        anos_para_atingir=meta.anos_para_atingir,
+        inflacao_media_anual=meta.inflacao_media_anual,
+        percentual_reinvestimento=meta.percentual_reinvestimento,
+        yield_medio=yield_medio
+    )
+    
+    # Salvar simulação (opcional)
+    if salvar:
+        Simulacao.objects.create(
+            meta_renda=meta,
+            patrimonio_alvo=resultado['patrimonio_alvo'],
+            aporte_mensal=resultado['aporte_mensal'],
+            yield_medio_usado=resultado['yield_medio_usado'],
+            observacoes=observacoes
+        )
+    
+    return resultado
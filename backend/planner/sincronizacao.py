@@ -0,0 +1,147 @@
+"""
+Sincronização incremental das listagens (?since=<cursor>).
+
+O cliente guarda o cursor devolvido por uma sincronização e, na seguinte, recebe só o que mudou depois
+dele: as linhas criadas ou alteradas (por data_atualizacao/data_criacao dos modelos que compõem cada
+linha) e os ids removidos, lidos do registro de exclusões (RegistroExclusao, gravado nos sinais
+post_delete). O tamanho da resposta depende das mudanças, não do tamanho da coleção.
+
+O cursor é um instante do relógio do banco (microssegundos desde 1970-01-01 UTC), lido antes das
+consultas da resposta (instante_leitura); since=0 devolve a coleção inteira com um cursor inicial.
+Como auto_now marca o registro antes do commit, uma transação ainda aberta durante a leitura grava
+linhas com data anterior ao cursor, que só ficam visíveis depois:
+- no PostgreSQL o cursor recua até o início da transação aberta mais antiga (pg_stat_activity), então
+  essas linhas entram na sincronização seguinte;
+- nos demais bancos (SQLite) não há como ver as transações abertas: só as que duram menos que
+  MARGEM_SEGUNDOS são cobertas. Linhas de transações mais longas podem faltar até uma sincronização
+  completa (since=0).
+Cada consulta também recua MARGEM_SEGUNDOS a partir do cursor, pela diferença entre o relógio dos
+servidores da aplicação (que preenche auto_now) e o do banco. Linhas podem vir repetidas (o cliente as
+aplica como upsert).
+"""
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional, Set
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Ativo, EventoDividendo, HistoricoDividendo, MetaRenda, RegistroExclusao, Simulacao
+
+
+# Fração das exclusões que também descarta registros além da retenção (evita um DELETE extra por exclusão).
+TAXA_LIMPEZA = 0.01
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+# Cursor inválido ou expirado (mensagem exibida ao usuário).
+class CursorErro(ValueError):
+    pass
+
+
+def _config(chave: str, padrao):
+    return getattr(settings, 'PLANNER_SINCRONIZACAO', {}).get(chave, padrao)
+
+
+# Instante do relógio do banco no início da leitura de uma sincronização (base do cursor devolvido).
+# No PostgreSQL, o início da transação aberta mais antiga de outra conexão, se anterior.
+def instante_leitura() -> datetime:
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT LEAST(statement_timestamp(), COALESCE(MIN(xact_start), statement_timestamp())) "
+                "FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+            )
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT strftime('%Y-%m-%d %H:%M:%f', 'now')")
+            return datetime.fromisoformat(cursor.fetchone()[0]).replace(tzinfo=dt_timezone.utc)
+    return timezone.now()
+
+
+# Cursor (texto) de um instante.
+def gerar_cursor(momento: datetime) -> str:
+    return str((momento - _EPOCA) // timedelta(microseconds=1))
+
+
+# Instante a partir do qual a sincronização busca mudanças (já com a margem), ou None para since=0
+# (coleção inteira). Cursores mais antigos que a retenção do registro de exclusões são recusados.
+def ler_cursor(valor: str) -> Optional[datetime]:
+    try:
+        microssegundos = int(valor)
+    except (TypeError, ValueError):
+        raise CursorErro('since deve ser o cursor devolvido pela sincronização anterior (ou 0).')
+    if microssegundos <= 0:
+        return None
+
+    momento = _EPOCA + timedelta(microseconds=microssegundos)
+    if momento < timezone.now() - timedelta(days=_config('RETENCAO_DIAS', 90)):
+        raise CursorErro('Cursor expirado; sincronize novamente com since=0.')
+    return momento - timedelta(seconds=_config('MARGEM_SEGUNDOS', 5))
+
+
+# Ids de objetos do modelo removidos desde o instante (do usuário, quando o modelo tem dono).
+def removidos_desde(modelo: str, desde: datetime, usuario_id: Optional[int] = None) -> List[int]:
+    registros = RegistroExclusao.objects.filter(modelo=modelo, data_exclusao__gte=desde)
+    if usuario_id is not None:
+        registros = registros.filter(usuario_id=usuario_id)
+    return sorted(set(registros.values_list('objeto_id', flat=True)))
+
+
+# Ids dos lançamentos próprios removidos desde o instante, dentre os ativos informados.
+def dividendos_removidos(ativos_ids, desde: datetime) -> List[int]:
+    return sorted(set(RegistroExclusao.objects.filter(
+        modelo='historicodividendo', data_exclusao__gte=desde, grupo__in=[str(i) for i in ativos_ids]
+    ).values_list('objeto_id', flat=True)))
+
+
+def _grupos_desde(modelo: str, desde: datetime) -> Set[str]:
+    return set(RegistroExclusao.objects.filter(modelo=modelo, data_exclusao__gte=desde).values_list('grupo', flat=True))
+
+
+# Ativos do usuário cuja representação mudou desde o instante: o próprio ativo, seus lançamentos
+# (criados, alterados ou removidos) ou os eventos compartilhados do seu ticker.
+def ativos_alterados(usuario_id: int, desde: datetime) -> Set[int]:
+    ativos = Ativo.objects.filter(usuario_id=usuario_id)
+    ids_dividendos = {int(g) for g in _grupos_desde('historicodividendo', desde) if g.isdigit()}
+    tickers = set(
+        EventoDividendo.objects.filter(data_criacao__gte=desde).order_by().values_list('ticker', flat=True).distinct()
+    ) | _grupos_desde('eventodividendo', desde)
+    return set(ativos.filter(
+        Q(data_atualizacao__gte=desde)
+        | Q(id__in=HistoricoDividendo.objects.filter(data_atualizacao__gte=desde, ativo__usuario_id=usuario_id)
+            .values('ativo_id'))
+        | Q(id__in=ids_dividendos)
+        | Q(ticker__in=tickers)
+    ).values_list('id', flat=True))
+
+
+# Metas do usuário alteradas desde o instante, incluindo as que ganharam ou perderam simulações.
+def metas_alteradas(usuario_id: int, desde: datetime) -> Set[int]:
+    ids_simulacoes = {int(g) for g in _grupos_desde('simulacao', desde) if g.isdigit()}
+    return set(MetaRenda.objects.filter(usuario_id=usuario_id).filter(
+        Q(data_atualizacao__gte=desde)
+        | Q(id__in=Simulacao.objects.filter(data_execucao__gte=desde).values('meta_renda_id'))
+        | Q(id__in=ids_simulacoes)
+    ).values_list('id', flat=True))
+
+
+# Receptor de post_delete (conectado em apps.ready) dos modelos sincronizados.
+def ao_excluir(sender, instance, **kwargs):
+    modelo = sender._meta.model_name
+    usuario_id, grupo = getattr(instance, 'usuario_id', None), ''
+    if isinstance(instance, HistoricoDividendo):
+        grupo = str(instance.ativo_id)
+    elif isinstance(instance, Simulacao):
+        grupo = str(instance.meta_renda_id)
+    elif isinstance(instance, EventoDividendo):
+        grupo = instance.ticker
+    RegistroExclusao.objects.create(modelo=modelo, objeto_id=instance.pk, usuario_id=usuario_id, grupo=grupo)
+
+    if random.random() < TAXA_LIMPEZA:
+        RegistroExclusao.objects.filter(
+            data_exclusao__lt=timezone.now() - timedelta(days=_config('RETENCAO_DIAS', 90))
+        ).delete()
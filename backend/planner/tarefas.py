@@ -0,0 +1,227 @@
+"""
+Fila de tarefas assíncronas guardada no próprio banco (modelo Tarefa), sem broker externo.
+
+As views enfileiram a tarefa e respondem 202; os workers (comando processar_tarefas) reservam
+tarefas pendentes de forma atômica, então vários processos, em uma ou mais máquinas que
+compartilham o banco, podem consumir a mesma fila. Cada reserva tem prazo (expira_em), renovado
+a cada atualização de progresso: se o worker morrer, a tarefa volta para a fila após o prazo.
+"""
+
+import json
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Optional
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Ativo, MetaRenda, Tarefa
+
+
+# Prazo da reserva de uma tarefa sem sinal de vida do worker.
+DURACAO_RESERVA = timedelta(minutes=5)
+
+# Tentativas (reservas) antes de marcar como falha uma tarefa cujo worker sempre morre.
+MAX_TENTATIVAS = 3
+
+HANDLERS: Dict[str, Callable] = {}
+
+
+# Erro esperado de uma tarefa: a mensagem vai para o campo erro, sem traceback.
+class TarefaErro(Exception):
+    pass
+
+
+# Registra a função que executa um tipo de tarefa. Ela recebe (tarefa, progresso) e retorna o resultado.
+def registrar(tipo: str):
+    def decorador(funcao):
+        HANDLERS[tipo] = funcao
+        return funcao
+    return decorador
+
+
+# Cria uma tarefa pendente na fila.
+def enfileirar(tipo: str, usuario_id: Optional[int] = None, **parametros) -> Tarefa:
+    if tipo not in HANDLERS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    return Tarefa.objects.create(tipo=tipo, usuario_id=usuario_id, parametros=parametros)
+
+
+# Identificação do processo worker (host:pid).
+def identificacao_worker() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# Reserva a tarefa pendente mais antiga para o worker, ou None se a fila está vazia.
+# No PostgreSQL usa SELECT ... FOR UPDATE SKIP LOCKED; nos demais bancos, um UPDATE condicional
+# (só vence o worker cujo UPDATE ainda encontra a tarefa como pendente).
+def reservar(worker: str) -> Optional[Tarefa]:
+    agora = timezone.now()
+    reserva = dict(
+        status='executando', worker=worker, data_inicio=agora,
+        expira_em=agora + DURACAO_RESERVA, tentativas=F('tentativas') + 1,
+    )
+    pendentes = Tarefa.objects.filter(status='pendente').order_by('data_criacao', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            tarefa_id = pendentes.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if tarefa_id is None:
+                return None
+            Tarefa.objects.filter(id=tarefa_id).update(**reserva)
+        return Tarefa.objects.get(id=tarefa_id)
+
+    for tarefa_id in pendentes.values_list('id', flat=True)[:10]:
+        if Tarefa.objects.filter(id=tarefa_id, status='pendente').update(**reserva):
+            return Tarefa.objects.get(id=tarefa_id)
+    return None
+
+
+# Devolve à fila as tarefas cuja reserva expirou (worker interrompido); após MAX_TENTATIVAS, marca como falha.
+def recuperar_expiradas() -> int:
+    agora = timezone.now()
+    expiradas = Tarefa.objects.filter(status='executando', expira_em__lt=agora)
+    falhas = expiradas.filter(tentativas__gte=MAX_TENTATIVAS).update(
+        status='falhou', erro='Worker interrompido durante a execução.', data_conclusao=agora, expira_em=None
+    )
+    return falhas + expiradas.update(status='pendente', worker='', expira_em=None)
+
+
+# Atualiza o progresso (0-100) e renova a reserva da tarefa.
+def atualizar_progresso(tarefa: Tarefa, percentual: int, mensagem: str = '') -> None:
+    tarefa.progresso = max(0, min(100, int(percentual)))
+    tarefa.mensagem = mensagem[:200]
+    Tarefa.objects.filter(id=tarefa.id, worker=tarefa.worker).update(
+        progresso=tarefa.progresso, mensagem=tarefa.mensagem, expira_em=timezone.now() + DURACAO_RESERVA
+    )
+
+
+# Executa uma tarefa reservada e grava o resultado ou o erro.
+def executar(tarefa: Tarefa) -> Tarefa:
+    handler = HANDLERS.get(tarefa.tipo)
+    try:
+        if handler is None:
+            raise TarefaErro(f'Tipo de tarefa desconhecido: {tarefa.tipo}')
+        resultado = handler(tarefa, lambda percentual, mensagem='': atualizar_progresso(tarefa, percentual, mensagem))
+        # Mesmo encoder das respostas da API: o resultado fica idêntico ao do endpoint síncrono
+        tarefa.resultado = json.loads(json.dumps(resultado, cls=JSONEncoder))
+        tarefa.status = 'concluida'
+        tarefa.progresso = 100
+        tarefa.erro = None
+    except TarefaErro as e:
+        tarefa.status = 'falhou'
+        tarefa.erro = str(e)
+    except Exception:
+        tarefa.status = 'falhou'
+        tarefa.erro = traceback.format_exc(limit=5)
+
+    tarefa.data_conclusao = timezone.now()
+    tarefa.expira_em = None
+    # Só grava se a reserva ainda é deste worker: se ela expirou e a tarefa voltou para a fila (ou já foi
+    # reservada por outro worker), o resultado é descartado para não sobrescrever a nova execução
+    gravadas = Tarefa.objects.filter(id=tarefa.id, worker=tarefa.worker, status='executando').update(
+        resultado=tarefa.resultado, status=tarefa.status, progresso=tarefa.progresso, erro=tarefa.erro,
+        data_conclusao=tarefa.data_conclusao, expira_em=None,
+    )
+    if not gravadas:
+        tarefa.refresh_from_db()
+    return tarefa
+
+
+# Laço do worker: reserva e executa tarefas até parar() retornar True.
+# Com ate_esvaziar=True, encerra assim que a fila estiver vazia. Retorna a quantidade executada.
+def processar(parar: Callable[[], bool], intervalo: float = 1.0, ate_esvaziar: bool = False,
+              log: Optional[Callable[[str], None]] = None) -> int:
+    worker = identificacao_worker()
+    executadas = 0
+    proxima_recuperacao = 0.0
+    while not parar():
+        if time.monotonic() >= proxima_recuperacao:
+            recuperar_expiradas()
+            proxima_recuperacao = time.monotonic() + 30
+
+        tarefa = reservar(worker)
+        if tarefa is None:
+            if ate_esvaziar:
+                break
+            time.sleep(intervalo)
+            continue
+
+        # Tarefas longas: descarta conexões vencidas (CONN_MAX_AGE) ou quebradas antes e depois de cada uma,
+        # como o Django faz a cada requisição
+        inicio = time.perf_counter()
+        close_old_connections()
+        try:
+            executar(tarefa)
+        finally:
+            close_old_connections()
+        executadas += 1
+        if log:
+            log(f'[{worker}] {tarefa} em {(time.perf_counter() - inicio) * 1000:.0f}ms')
+    return executadas
+
+
+# Importa os dividendos de um ativo da Brapi (mesma lógica de POST /api/ativos/{id}/importar_dividendos_brapi/).
+@registrar('importar_dividendos_brapi')
+def _importar_dividendos_brapi(tarefa, progresso):
+    from .dividendos import importar_eventos_ticker
+
+    ativo = Ativo.objects.filter(id=tarefa.parametros.get('ativo_id'), usuario_id=tarefa.usuario_id).first()
+    if ativo is None:
+        raise TarefaErro('Ativo não encontrado.')
+
+    progresso(10, f'Consultando dividendos de {ativo.ticker} na Brapi')
+    resultado = importar_eventos_ticker(ativo.ticker, nome=ativo.nome_empresa, setor=ativo.setor)
+    if resultado is None:
+        raise TarefaErro(f'Não foram encontrados dividendos para {ativo.ticker}')
+    return {'mensagem': f'Importação concluída para {ativo.ticker}', **resultado}
+
+
+# Executa o backtest de uma meta (mesma lógica de POST /api/metas-renda/{id}/backtest/).
+@registrar('backtest')
+def _backtest(tarefa, progresso):
+    from .backtest import BacktestErro, executar_backtest, parametros_backtest
+
+    meta = MetaRenda.objects.filter(id=tarefa.parametros.get('meta_id'), usuario_id=tarefa.usuario_id).first()
+    if meta is None:
+        raise TarefaErro('Meta não encontrada.')
+
+    progresso(10, 'Executando backtest')
+    try:
+        return executar_backtest(meta, tarefa.usuario_id, **parametros_backtest(tarefa.parametros))
+    except BacktestErro as e:
+        raise TarefaErro(str(e))
+
+
+# Executa a simulação de uma meta (mesma lógica de POST /api/metas-renda/{id}/simular/).
+@registrar('simular')
+def _simular(tarefa, progresso):
+    from .services import simular_meta
+
+    parametros = tarefa.parametros
+    meta = MetaRenda.objects.filter(id=parametros.get('meta_id'), usuario_id=tarefa.usuario_id).first()
+    if meta is None:
+        raise TarefaErro('Meta não encontrada.')
+
+    yield_medio = parametros.get('yield_medio')
+    if yield_medio is not None:
+        try:
+            yield_medio = Decimal(str(yield_medio))
+        except (InvalidOperation, ValueError):
+            yield_medio = None
+
+    return simular_meta(
+        meta,
+        usuario_id=tarefa.usuario_id,
+        yield_medio=yield_medio,
+        ativos_ids=parametros.get('ativos_ids') or [],
+        salvar=bool(parametros.get('salvar')),
+        observacoes=parametros.get('observacoes', ''),
+        progresso=progresso,
+    )
@@ -0,0 +1,177 @@
+"""
+Atualizações em tempo real (Server-Sent Events) de cotações e de tarefas assíncronas.
+
+Cada processo ASGI mantém pollers compartilhados: um laço por ticker consulta a Brapi e
+distribui a cotação para todas as conexões que acompanham aquele ticker (N usuários
+assistindo ITUB4 custam uma única consulta por intervalo), e um único laço consulta as
+tarefas de todos os usuários conectados. Os laços só existem enquanto houver assinantes.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+from typing import Dict, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .brapi_service import BrapiService
+from .models import Tarefa
+
+
+CONFIG_PADRAO = {
+    'INTERVALO_COTACOES': 30.0,
+    'INTERVALO_TAREFAS': 1.0,
+    'INTERVALO_PING': 15.0,
+    'DURACAO_MAXIMA': 300.0,
+}
+
+
+# Lê uma opção de settings.PLANNER_TEMPO_REAL, com os valores padrão acima.
+def config(chave: str) -> float:
+    return getattr(settings, 'PLANNER_TEMPO_REAL', {}).get(chave, CONFIG_PADRAO[chave])
+
+
+# Formata um evento no protocolo SSE.
+def formatar_evento(tipo: str, dados: Dict) -> str:
+    return f'event: {tipo}\ndata: {json.dumps(dados, default=str, ensure_ascii=False)}\n\n'
+
+
+# Base dos pollers: tópicos (ticker, usuário) -> filas das conexões assinantes.
+class _PollerCompartilhado:
+
+    def __init__(self):
+        self.assinantes: Dict[object, Set[asyncio.Queue]] = {}
+
+    def assinar(self, topico, fila: asyncio.Queue) -> None:
+        self.assinantes.setdefault(topico, set()).add(fila)
+
+    def cancelar(self, topico, fila: asyncio.Queue) -> None:
+        filas = self.assinantes.get(topico)
+        if filas is not None:
+            filas.discard(fila)
+            if not filas:
+                del self.assinantes[topico]
+
+    def publicar(self, topico, evento: str) -> None:
+        for fila in list(self.assinantes.get(topico, ())):
+            fila.put_nowait(evento)
+
+
+# Um laço de consulta por ticker; a última cotação é reenviada a quem assina depois.
+class PollerCotacoes(_PollerCompartilhado):
+
+    def __init__(self):
+        super().__init__()
+        self.lacos: Dict[str, asyncio.Task] = {}
+        self.ultimas: Dict[str, str] = {}
+
+    def assinar(self, ticker: str, fila: asyncio.Queue) -> None:
+        super().assinar(ticker, fila)
+        if ticker in self.ultimas:
+            fila.put_nowait(self.ultimas[ticker])
+        laco = self.lacos.get(ticker)
+        if laco is None or laco.done():
+            self.lacos[ticker] = asyncio.get_running_loop().create_task(self._consultar(ticker))
+
+    def cancelar(self, ticker: str, fila: asyncio.Queue) -> None:
+        super().cancelar(ticker, fila)
+        if ticker not in self.assinantes:
+            laco = self.lacos.pop(ticker, None)
+            if laco is not None:
+                laco.cancel()
+            self.ultimas.pop(ticker, None)
+
+    async def _consultar(self, ticker: str) -> None:
+        anterior = None
+        while ticker in self.assinantes:
+            try:
+                # A Brapi é consultada com requests (bloqueante): roda fora do event loop
+                dados = await asyncio.to_thread(BrapiService.get_quote, ticker, '1d', False)
+            except Exception as e:
+                print(f"Erro ao consultar cotação de {ticker}: {e}")
+                dados = None
+            if dados:
+                cotacao = {
+                    'ticker': ticker,
+                    'preco': dados.get('regularMarketPrice') or dados.get('price'),
+                    'variacao_percentual': dados.get('regularMarketChangePercent'),
+                    'horario': dados.get('regularMarketTime'),
+                }
+                if cotacao != anterior:
+                    anterior = cotacao
+                    self.ultimas[ticker] = formatar_evento('cotacao', cotacao)
+                    self.publicar(ticker, self.ultimas[ticker])
+            await asyncio.sleep(config('INTERVALO_COTACOES'))
+
+
+# Um único laço consulta as tarefas ativas (ou recém-concluídas) de todos os usuários conectados
+# e publica apenas as que mudaram de status, progresso ou mensagem.
+class PollerTarefas(_PollerCompartilhado):
+
+    CAMPOS = ['id', 'usuario_id', 'tipo', 'status', 'progresso', 'mensagem', 'resultado', 'erro']
+
+    def __init__(self):
+        super().__init__()
+        self.laco: Optional[asyncio.Task] = None
+        self.vistos: Dict[int, tuple] = {}
+
+    def assinar(self, usuario_id: int, fila: asyncio.Queue) -> None:
+        super().assinar(usuario_id, fila)
+        if self.laco is None or self.laco.done():
+            self.laco = asyncio.get_running_loop().create_task(self._consultar())
+
+    def _buscar(self, usuarios, desde):
+        return list(
+            Tarefa.objects.filter(usuario_id__in=usuarios)
+            .filter(Q(status__in=['pendente', 'executando']) | Q(data_conclusao__gte=desde))
+            .values(*self.CAMPOS)
+        )
+
+    async def _consultar(self) -> None:
+        buscar = sync_to_async(self._buscar)
+        desde = timezone.now()
+        while self.assinantes:
+            agora = timezone.now()
+            # Pequena margem para não perder conclusões gravadas durante a consulta anterior
+            tarefas = await buscar(list(self.assinantes), desde - timedelta(seconds=1))
+            desde = agora
+            atuais = {}
+            for tarefa in tarefas:
+                estado = (tarefa['status'], tarefa['progresso'], tarefa['mensagem'])
+                atuais[tarefa['id']] = estado
+                if self.vistos.get(tarefa['id']) != estado:
+                    self.publicar(tarefa['usuario_id'], formatar_evento('tarefa', tarefa))
+            self.vistos = atuais
+            await asyncio.sleep(config('INTERVALO_TAREFAS'))
+        self.vistos = {}
+
+
+_cotacoes = PollerCotacoes()
+_tarefas = PollerTarefas()
+
+
+# Gera o fluxo SSE de uma conexão: cotações dos tickers e tarefas do usuário, com ping periódico.
+# O fluxo termina após DURACAO_MAXIMA segundos; o EventSource do navegador reconecta sozinho
+# (o Django 4.2 não avisa a view quando o cliente desconecta, então isso limita conexões órfãs).
+async def fluxo_eventos(usuario_id: int, tickers):
+    fila = asyncio.Queue()
+    for ticker in tickers:
+        _cotacoes.assinar(ticker, fila)
+    _tarefas.assinar(usuario_id, fila)
+
+    loop = asyncio.get_running_loop()
+    fim = loop.time() + config('DURACAO_MAXIMA')
+    try:
+        yield 'retry: 3000\n\n'
+        while loop.time() < fim:
+            try:
+                yield await asyncio.wait_for(fila.get(), timeout=config('INTERVALO_PING'))
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+    finally:
+        for ticker in tickers:
+            _cotacoes.cancelar(ticker, fila)
+        _tarefas.cancelar(usuario_id, fila)
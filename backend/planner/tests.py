@@ -0,0 +1,888 @@
+"""
+Testes do app planner.
+
+- Listagens: a quantidade de consultas SQL não cresce com o número de linhas (sem N+1).
+- Fila de tarefas: a conclusão depende de o worker ainda deter a reserva.
+- Profiler: requisições lentas são sempre registradas.
+- Sincronização incremental: cursor lido do relógio do banco.
+- Importação de CSV: relatório por linha, duplicados e valores inválidos.
+- Otimização: pesos contra busca exaustiva e validação dos parâmetros.
+- Backtest: solução fechada do DRIP contra o laço mês a mês.
+- Séries colunares: cache de arrays abertos limitado; arquivos gravados só depois do commit.
+- Indicadores: CAGR, regularidade e sequências; disco indisponível calcula direto do banco.
+- Ajuste por desdobramento: fator localizado pela data com do dividendo (ou de pagamento, sem ela).
+- Busca textual: só itens do dono, sem acentos, termos com sintaxe FTS tratados como texto.
+- Exportação: conteúdo CSV/NDJSON, filtros e instantes no fuso local.
+- Autocomplete de tickers: prefixo de ticker antes do nome, acentos, limite e índice sem consultas.
+- Cache condicional: 304 com o ETag atual, ETag novo após escrita, exclusão ou evento compartilhado.
+- Operações em lote: erros por item, tudo ou nada (ou atomico=0) e posse dos registros.
+- Requisições compostas (/api/batch/): reversão, rotas recusadas, parâmetros e pré-carregamento da Brapi.
+"""
+
+import csv
+import gc
+import itertools
+import json
+import io
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import catalogo, series
+from .ajustes import gravar_eventos_corporativos
+from .backtest import evoluir_cotas
+from .dividendos import arrays_consolidados, importar_eventos_ticker, inicio_ano_dividendos, serie_dividendos, total_dividendos_desde
+from .indicadores import calcular, indicadores_tickers
+from .middleware import ProfilerMiddleware
+from .models import Ativo, EventoDividendo, HistoricoDividendo, MetaRenda, PerfilRequisicao, Simulacao, Tarefa
+from .otimizacao import OtimizacaoErro, otimizar_pesos
+from .sincronizacao import instante_leitura
+from .tarefas import HANDLERS, enfileirar, executar, registrar, reservar
+
+
+# Base: usuário autenticado e contagem de consultas de uma requisição GET.
+class ConsultasTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create(username='investidor')
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    # Número de consultas de um GET (a resposta precisa ser 200).
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(contexto.captured_queries)
+
+
+# GET /api/metas-renda/: metas e simulações aninhadas com consultas constantes.
+class MetasRendaConsultasTest(ConsultasTestCase):
+
+    def criar_metas(self, quantidade, simulacoes_por_meta):
+        for i in range(quantidade):
+            meta = MetaRenda.objects.create(
+                usuario=self.usuario, nome=f'Meta {i}', renda_mensal_desejada=Decimal('5000'), anos_para_atingir=10
+            )
+            Simulacao.objects.bulk_create([
+                Simulacao(meta_renda=meta, patrimonio_alvo=Decimal('1000000'), aporte_mensal=Decimal('2000'),
+                          yield_medio_usado=Decimal('6.00') if j % 2 else None)
+                for j in range(simulacoes_por_meta)
+            ])
+
+    def test_consultas_constantes(self):
+        self.criar_metas(1, 1)
+        consultas = self.contar_consultas('/api/metas-renda/')
+
+        self.criar_metas(20, 8)
+        with self.assertNumQueries(consultas):
+            response = self.client.get('/api/metas-renda/')
+        self.assertEqual(response.data['count'], 21)
+        self.assertTrue(all(len(meta['simulacoes']) <= 5 for meta in response.data['results']))
+
+
+# GET /api/historico-dividendos/: página da união (lançamentos próprios + eventos) com consultas constantes.
+class HistoricoDividendosConsultasTest(ConsultasTestCase):
+
+    # Lançamentos e eventos em datas distintas (eventos na data de um lançamento próprio ficam ocultos).
+    def criar_dividendos(self, tickers, por_ticker):
+        inicio = date(2000, 1, 1)
+        for ticker in tickers:
+            ativo = Ativo.objects.create(usuario=self.usuario, ticker=ticker, nome_empresa=f'Empresa {ticker}')
+            HistoricoDividendo.objects.bulk_create([
+                HistoricoDividendo(ativo=ativo, data_pagamento=inicio + timedelta(days=i), valor_por_acao=Decimal('0.5'))
+                for i in range(por_ticker)
+            ])
+            EventoDividendo.objects.bulk_create([
+                EventoDividendo(ticker=ticker, data_pagamento=inicio - timedelta(days=i + 1), valor_por_acao=Decimal('0.7'))
+                for i in range(por_ticker)
+            ])
+
+    def test_consultas_constantes(self):
+        self.criar_dividendos(['ITUB4'], 2)
+        consultas = self.contar_consultas('/api/historico-dividendos/')
+
+        self.criar_dividendos([f'TST{i}' for i in range(10)], 500)
+        with self.assertNumQueries(consultas):
+            response = self.client.get('/api/historico-dividendos/')
+        self.assertEqual(response.data['count'], 4 + 10 * 1000)
+        self.assertEqual(len(response.data['results']), 100)
+
+
+# GET /api/ativos/: total_dividendos_ano anotado na consulta da página (sem consultas por ativo).
+class AtivosConsultasTest(ConsultasTestCase):
+
+    def criar_ativos(self, tickers):
+        hoje = date.today()
+        for ticker in tickers:
+            ativo = Ativo.objects.create(usuario=self.usuario, ticker=ticker, nome_empresa=f'Empresa {ticker}')
+            HistoricoDividendo.objects.create(ativo=ativo, data_pagamento=hoje - timedelta(days=30), valor_por_acao=Decimal('0.5'))
+            EventoDividendo.objects.bulk_create([
+                # Sobrescrito pelo lançamento próprio da mesma data: não entra no total
+                EventoDividendo(ticker=ticker, data_pagamento=hoje - timedelta(days=30), valor_por_acao=Decimal('9')),
+                EventoDividendo(ticker=ticker, data_pagamento=hoje - timedelta(days=60), valor_por_acao=Decimal('0.25')),
+                # Fora da janela de um ano
+                EventoDividendo(ticker=ticker, data_pagamento=hoje - timedelta(days=400), valor_por_acao=Decimal('1')),
+            ])
+
+    def test_consultas_constantes(self):
+        self.criar_ativos(['ITUB4'])
+        consultas = self.contar_consultas('/api/ativos/')
+
+        self.criar_ativos([f'TST{i}' for i in range(20)])
+        with self.assertNumQueries(consultas):
+            response = self.client.get('/api/ativos/')
+        self.assertEqual(response.data['count'], 21)
+        self.assertTrue(all(ativo['total_dividendos_ano'] == 0.75 for ativo in response.data['results']))
+
+    def test_total_anotado_igual_ao_calculado(self):
+        self.criar_ativos(['ITUB4'])
+        ativo = Ativo.objects.get(ticker='ITUB4')
+        response = self.client.get(f'/api/ativos/{ativo.id}/')
+        self.assertEqual(response.data['total_dividendos_ano'], float(total_dividendos_desde(ativo, inicio_ano_dividendos())))
+
+    def test_ticker_normalizado(self):
+        response = self.client.post('/api/ativos/', {'usuario': self.usuario.id, 'ticker': ' itub4 ', 'nome_empresa': 'Itaú'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['ticker'], 'ITUB4')
+        self.assertEqual(Ativo.objects.create(usuario=self.usuario, ticker='petr4 ', nome_empresa='Petrobras').ticker, 'PETR4')
+
+
+# Conclusão de tarefas: só o worker que ainda detém a reserva grava o resultado.
+class TarefasTest(TestCase):
+
+    def setUp(self):
+        registrar('teste')(lambda tarefa, progresso: {'ok': True})
+        self.addCleanup(HANDLERS.pop, 'teste', None)
+
+    def test_conclui_tarefa_reservada(self):
+        enfileirar('teste')
+        tarefa = executar(reservar('worker-a'))
+        self.assertEqual(tarefa.status, 'concluida')
+        self.assertEqual(Tarefa.objects.get(id=tarefa.id).resultado, {'ok': True})
+
+    def test_descarta_resultado_de_reserva_perdida(self):
+        enfileirar('teste')
+        tarefa = reservar('worker-a')
+        # A reserva expirou e a tarefa foi reservada por outro worker
+        Tarefa.objects.filter(id=tarefa.id).update(status='pendente', worker='')
+        reservar('worker-b')
+
+        tarefa = executar(tarefa)
+        self.assertEqual((tarefa.status, tarefa.worker, tarefa.resultado), ('executando', 'worker-b', None))
+
+
+# ProfilerMiddleware: requisições acima do limiar são salvas mesmo sem amostragem.
+@override_settings(PLANNER_PROFILER={'HABILITADO': True, 'LIMIAR_MS': 0, 'TAXA_AMOSTRAGEM': 0.0})
+class ProfilerTest(TestCase):
+
+    def test_requisicao_lenta_salva_sem_amostragem(self):
+        response = ProfilerMiddleware(lambda request: HttpResponse(MetaRenda.objects.count()))(RequestFactory().get('/api/x/'))
+        self.assertEqual(response.status_code, 200)
+        perfil = PerfilRequisicao.objects.get()
+        self.assertEqual((perfil.motivo, bytes(perfil.estatisticas)), ('lento', b''))
+        self.assertIn('COUNT', perfil.consultas_sql[0]['sql'].upper())
+
+
+# Sincronização incremental: cursor pelo relógio do banco e mudanças depois dele.
+class SincronizacaoTest(ConsultasTestCase):
+
+    def test_cursor_do_banco(self):
+        self.assertLess(abs(instante_leitura() - timezone.now()), timedelta(seconds=2))
+
+    def test_alteracoes_desde_cursor(self):
+        ativo = Ativo.objects.create(usuario=self.usuario, ticker='ITUB4', nome_empresa='Itaú')
+        completo = self.client.get('/api/ativos/', {'since': 0}).data
+        self.assertTrue(completo['completo'])
+
+        Ativo.objects.create(usuario=self.usuario, ticker='PETR4', nome_empresa='Petrobras')
+        removido = ativo.id
+        ativo.delete()
+        delta = self.client.get('/api/ativos/', {'since': completo['cursor']}).data
+        self.assertIn('PETR4', [a['ticker'] for a in delta['alterados']])
+        self.assertEqual(delta['removidos'], [removido])
+
+
+# POST /api/historico-dividendos/importar_arquivo/: relatório por linha, duplicados e valores inválidos.
+class ImportarArquivoTest(ConsultasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ativo = Ativo.objects.create(usuario=self.usuario, ticker='ITUB4', nome_empresa='Itaú')
+
+    def importar(self, conteudo):
+        arquivo = SimpleUploadedFile('extrato.csv', conteudo.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/api/historico-dividendos/importar_arquivo/', {'arquivo': arquivo}, format='multipart')
+
+    def test_arquivo_valido(self):
+        response = self.importar('ticker;data;valor\nITUB4 - ITAU;15/03/2024;0,1234\nitub4;2024-04-15;R$ 1.000,50\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['importados'], response.data['total_erros']), (2, 0))
+        self.assertEqual(
+            sorted(self.ativo.historico_dividendos.values_list('valor_por_acao', flat=True)),
+            [Decimal('0.1234'), Decimal('1000.5000')]
+        )
+
+    def test_relatorio_de_erros_com_numero_da_linha(self):
+        response = self.importar(
+            'ticker,data,valor\nITUB4,2024-01-10,0.5\nITUB4,31/02/2024,0.5\nITUB4,2024-01-11,-1\nITUB4,2024-01-12,abc\n'
+        )
+        self.assertEqual(response.data['importados'], 1)
+        self.assertEqual([e['linha'] for e in response.data['erros']], [3, 4, 5])
+
+    def test_duplicados_ignorados(self):
+        conteudo = 'ticker,data,valor\nITUB4,2024-01-10,0.5\nITUB4,2024-01-10,0.5\n'
+        self.assertEqual(self.importar(conteudo).data['importados'], 1)
+        response = self.importar(conteudo)
+        self.assertEqual((response.data['importados'], response.data['duplicados']), (0, 2))
+        self.assertEqual(HistoricoDividendo.objects.count(), 1)
+
+    def test_ticker_desconhecido_e_de_outro_usuario(self):
+        outro = User.objects.create(username='outro')
+        Ativo.objects.create(usuario=outro, ticker='PETR4', nome_empresa='Petrobras')
+        response = self.importar('ticker,data,valor\nVALE3,2024-01-10,0.5\nPETR4,2024-01-10,0.5\n')
+        self.assertEqual((response.data['importados'], response.data['total_erros']), (0, 2))
+        self.assertIn('não cadastrado', response.data['erros'][0]['erro'])
+
+    def test_valores_nao_finitos_e_linhas_ilegiveis(self):
+        response = self.importar(
+            'ticker,data,valor\nITUB4,2024-01-10,NaN\nITUB4,2024-01-11,Infinity\nITUB4,2024-01-12,1e100\n'
+            'ITUB4,2024-01-13,"' + 'x' * 200000 + '"\nITUB4\x00,2024-01-14,0.5\nITUB4,2024-01-15,0.5\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['importados'], 1)
+        self.assertEqual([e['linha'] for e in response.data['erros']], [2, 3, 4, 5, 6])
+
+    def test_cabecalho_sem_colunas_obrigatorias(self):
+        response = self.importar('ticker,valor\nITUB4,0.5\n')
+        self.assertEqual(response.status_code, 400)
+
+
+# Otimização da carteira: pesos do guloso (λ = 0) e da bisseção KKT (λ > 0) contra busca exaustiva.
+class OtimizacaoTest(ConsultasTestCase):
+
+    # Melhor objetivo Σ w·y − λ Σ (w·s)² numa grade do simplex com passo 0,005, respeitando os limites.
+    def busca_exaustiva(self, yields, desvios, limites, grupos, limites_grupo, aversao):
+        passos = np.arange(0, 1.0001, 0.005)
+        melhor = -np.inf
+        for w in itertools.product(passos, repeat=len(yields) - 1):
+            pesos = np.array([*w, 1 - sum(w)])
+            if pesos[-1] < -1e-9 or (pesos > limites + 1e-9).any():
+                continue
+            if (np.bincount(grupos, weights=pesos, minlength=len(limites_grupo)) > limites_grupo + 1e-9).any():
+                continue
+            melhor = max(melhor, pesos @ yields - aversao * ((pesos * desvios) ** 2).sum())
+        return melhor
+
+    def verificar(self, yields, desvios, limites, grupos, limites_grupo, aversao):
+        yields, desvios, limites = np.array(yields), np.array(desvios), np.array(limites)
+        grupos, limites_grupo = np.array(grupos), np.array(limites_grupo, dtype=float)
+        pesos = otimizar_pesos(yields, desvios, limites, grupos, limites_grupo, aversao)
+        self.assertAlmostEqual(pesos.sum(), 1, places=6)
+        self.assertTrue((pesos <= limites + 1e-6).all() and (pesos >= -1e-9).all())
+        self.assertTrue((np.bincount(grupos, weights=pesos, minlength=len(limites_grupo)) <= limites_grupo + 1e-6).all())
+        objetivo = pesos @ yields - aversao * ((pesos * np.maximum(desvios, 0.01)) ** 2).sum()
+        self.assertGreaterEqual(objetivo, self.busca_exaustiva(yields, np.maximum(desvios, 0.01), limites, grupos, limites_grupo, aversao) - 1e-3)
+        return pesos
+
+    def test_guloso_com_limites_aninhados(self):
+        # Setor 0 (ativos 0 e 1) limitado a 60%: o melhor ativo do setor fica com 50% e o outro com o restante do setor
+        pesos = self.verificar([12, 10, 6], [0, 0, 0], [0.5, 0.5, 1], [0, 0, 1], [0.6, np.inf], 0)
+        np.testing.assert_allclose(pesos, [0.5, 0.1, 0.4], atol=1e-9)
+
+    def test_kkt_com_aversao_ao_risco(self):
+        self.verificar([8, 6], [4, 1], [1, 1], [0, 1], [np.inf, np.inf], 0.5)
+        self.verificar([12, 10, 6], [6, 2, 1], [0.7, 0.7, 0.7], [0, 0, 1], [0.8, np.inf], 0.2)
+
+    def test_limites_impossiveis(self):
+        with self.assertRaises(OtimizacaoErro):
+            otimizar_pesos(np.array([5.0, 6.0]), np.zeros(2), np.array([0.3, 0.3]), np.array([0, 1]), np.array([np.inf, np.inf]))
+
+    def test_parametros_invalidos(self):
+        meta = MetaRenda.objects.create(usuario=self.usuario, nome='Meta', renda_mensal_desejada=Decimal('1000'), anos_para_atingir=5)
+        for corpo in ({'ativos_ids': 'abc'}, {'ativos_ids': [1, 'x']}, {'ativos_ids': [None]},
+                      {'limite_ativo': 'NaN'}, {'limite_ativo': [10]}, {'aversao_risco': 'Infinity'},
+                      {'aversao_risco': 'abc'}, {'limites_setor': {'Bancos': 'x'}}, {'limites_setor': [1]}):
+            response = self.client.post(f'/api/metas-renda/{meta.id}/otimizar/', corpo, format='json')
+            self.assertEqual(response.status_code, 400, corpo)
+
+
+# Backtest: solução fechada do DRIP contra o laço mês a mês e validação dos parâmetros.
+class BacktestTest(ConsultasTestCase):
+
+    def test_cotas_iguais_ao_laco(self):
+        rnd = np.random.default_rng(7)
+        precos = rnd.uniform(5, 50, size=(3, 60))
+        dividendos = np.where(rnd.random((3, 60)) < 0.3, rnd.uniform(0, 2, size=(3, 60)), 0)
+        pesos, aporte, reinvestimento = np.array([0.5, 0.3, 0.2]), 1000.0, 0.8
+
+        esperado, cotas = np.zeros((3, 60)), np.zeros(3)
+        for m in range(60):
+            # Dividendos do mês sobre as cotas do mês anterior, parte reinvestida, mais a compra do aporte
+            cotas = cotas + cotas * dividendos[:, m] * reinvestimento / precos[:, m] + aporte * pesos / precos[:, m]
+            esperado[:, m] = cotas
+
+        obtido = evoluir_cotas(1 + reinvestimento * dividendos / precos, aporte * pesos[:, None] / precos)
+        np.testing.assert_allclose(obtido, esperado, rtol=1e-10)
+
+    def test_parametros_invalidos(self):
+        meta = MetaRenda.objects.create(usuario=self.usuario, nome='Meta', renda_mensal_desejada=Decimal('1000'), anos_para_atingir=5)
+        for corpo in ({'aporte_mensal': 'NaN'}, {'aporte_mensal': 'Infinity'}, {'aporte_mensal': 'abc'},
+                      {'ativos_ids': 'abc'}, {'ativos_ids': [1, 'x']}, {'ativos_ids': [None]},
+                      {'pesos': {'ITUB4': 'NaN'}}, {'data_inicio': '01/02/2020'}):
+            response = self.client.post(f'/api/metas-renda/{meta.id}/backtest/', corpo, format='json')
+            self.assertEqual(response.status_code, 400, corpo)
+
+
+# Séries colunares em um diretório temporário (nunca no diretório configurado).
+class SeriesTestCase(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = override_settings(PLANNER_SERIES={'DIRETORIO': diretorio.name})
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        series._abertos.clear()
+        self.addCleanup(series._abertos.clear)
+
+
+# Cache de colunas mapeadas: limitado, sem acumular descritores de arquivo.
+class SeriesCacheTest(SeriesTestCase):
+
+    @unittest.skipUnless(os.path.isdir('/proc/self/fd'), 'Contagem de descritores só no Linux')
+    def test_descritores_limitados(self):
+        historico = [{'date': 86400 * d, 'close': 10.0 + d} for d in range(1, 50)]
+        for i in range(300):
+            series.gravar_precos(f'TST{i}', historico)
+        antes = len(os.listdir('/proc/self/fd'))
+        with mock.patch.object(series, 'LIMITE_MMAP_BYTES', 0):
+            for i in range(300):
+                self.assertEqual(len(series.precos(f'TST{i}').datas), 49)
+        gc.collect()
+        self.assertLessEqual(len(series._abertos), series.MAX_ABERTOS)
+        self.assertLessEqual(len(os.listdir('/proc/self/fd')) - antes, series.MAX_ABERTOS)
+
+    def test_colunas_pequenas_em_memoria(self):
+        series.gravar_precos('ITUB4', [{'date': 86400, 'close': 10.0}])
+        self.assertNotIsInstance(series.precos('ITUB4').valores, np.memmap)
+
+
+# Importação da Brapi: as séries só vão para o disco depois do commit; antes disso são lidas do banco.
+class SeriesAposCommitTest(SeriesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        dados = {'regularMarketPrice': 10.0, 'historicalDataPrice': [{'date': 86400 * 19000, 'close': 10.0}]}
+        dividendos = [
+            {'data_pagamento': '2024-03-15', 'valor_por_acao': '0.50'},
+            {'data_pagamento': '2024-06-15', 'valor_por_acao': '0.60', 'data_com': '2024-06-01'},
+        ]
+        for nome, retorno in (('get_quote', dados), ('get_dividends', dividendos), ('get_stock_events', [])):
+            patcher = mock.patch(f'planner.dividendos.BrapiService.{nome}', return_value=retorno)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_arquivos_gravados_no_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            importar_eventos_ticker('TST4')
+            self.assertIsNone(series._ler('TST4', 'dividendos'))
+            self.assertEqual(len(series.dividendos('TST4').datas), 2)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(list(series._ler('TST4', 'dividendos').valores), [5000, 6000])
+        self.assertEqual(len(series._ler('TST4', 'precos').datas), 1)
+
+    def test_transacao_desfeita_nao_grava(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                importar_eventos_ticker('TST4')
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertFalse(EventoDividendo.objects.filter(ticker='TST4').exists())
+
+    def test_reimportacao_preenche_data_com(self):
+        EventoDividendo.objects.create(ticker='TST4', data_pagamento=date(2024, 6, 15), valor_por_acao=Decimal('0.6'))
+        relatorio = importar_eventos_ticker('TST4')
+        self.assertEqual(relatorio['importados'], 1)
+        self.assertEqual(
+            EventoDividendo.objects.get(ticker='TST4', data_pagamento=date(2024, 6, 15)).data_com, date(2024, 6, 1)
+        )
+
+
+# Indicadores de dividendos: totais anuais dos anos completos anteriores ao de referência.
+class IndicadoresTest(SeriesTestCase):
+
+    def pagamentos(self, por_grupo):
+        grupos, dias, valores = [], [], []
+        for grupo, lista in enumerate(por_grupo):
+            for dia, valor in lista:
+                grupos.append(grupo)
+                dias.append((dia - date(1970, 1, 1)).days)
+                valores.append(valor)
+        return np.array(grupos, dtype=np.int64), np.array(dias), np.array(valores), len(por_grupo)
+
+    def test_cagr_regularidade_e_sequencias(self):
+        crescente = [(date(ano, 6, 1), ano - 2019.0) for ano in range(2020, 2025)]
+        irregular = [(date(2020, 6, 1), 2.0), (date(2022, 6, 1), 2.0), (date(2023, 6, 1), 1.0),
+                     (date(2024, 3, 1), 1.5), (date(2024, 9, 1), 1.5), (date(2025, 1, 1), 9.0)]
+        a, b = calcular(*self.pagamentos([crescente, irregular]), ano_referencia=2025)
+
+        self.assertEqual(a['cagr_5a'], round((5 ** (1 / 4) - 1) * 100, 2))
+        self.assertEqual(a['regularidade_5a'], 1.0)
+        self.assertEqual(a['anos_consecutivos_pagando'], 5)
+        self.assertEqual(a['anos_consecutivos_crescendo'], 4)
+        self.assertEqual(a['total_ultimo_ano'], 5.0)
+
+        # 2021 sem pagamento, 2023 caiu; o pagamento de 2025 (ano corrente) fica de fora
+        self.assertEqual(b['regularidade_5a'], 0.8)
+        self.assertEqual(b['anos_consecutivos_pagando'], 3)
+        self.assertEqual(b['anos_consecutivos_crescendo'], 1)
+        self.assertEqual(b['pagamentos_por_ano'], 1.0)
+        self.assertEqual(b['total_ultimo_ano'], 3.0)
+        self.assertEqual(b['cagr_5a'], round((1.5 ** (1 / 4) - 1) * 100, 2))
+
+    def test_cagr_indefinido_sem_pagamento_no_inicio(self):
+        [indicadores] = calcular(*self.pagamentos([[(date(2024, 6, 1), 1.0)]]), ano_referencia=2025)
+        self.assertIsNone(indicadores['cagr_5a'])
+        self.assertEqual(indicadores['anos_consecutivos_pagando'], 1)
+
+    def test_disco_indisponivel_calcula_do_banco(self):
+        EventoDividendo.objects.bulk_create([
+            EventoDividendo(ticker='TST4', data_pagamento=date(ano, 6, 1), valor_por_acao=Decimal(ano - 2019))
+            for ano in range(2020, 2025)
+        ])
+        with mock.patch.object(series, '_transacao_aberta', return_value=False), \
+                mock.patch.object(series, '_abrir', side_effect=PermissionError('sem acesso')), \
+                mock.patch.object(series, '_gravar', side_effect=PermissionError('sem acesso')):
+            serie = serie_dividendos('TST4', ajustado=True)
+            indicadores = indicadores_tickers(['TST4'], 2025)['TST4']
+        self.assertEqual(list(serie.valores), [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(indicadores['anos_consecutivos_crescendo'], 4)
+        self.assertIsNone(series._ler('TST4', 'dividendos'))
+
+
+# Fatores de desdobramento: a base de ações de cada dividendo é decidida pela data com.
+class AjusteDesdobramentoTest(SeriesTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.usuario = User.objects.create_user('investidor')
+        self.ativo = Ativo.objects.create(usuario=self.usuario, ticker='TST4', nome_empresa='Teste')
+        EventoDividendo.objects.bulk_create([
+            # data com antes do desdobramento 1:2, pagamento depois: ainda na base antiga
+            EventoDividendo(ticker='TST4', data_pagamento=date(2024, 6, 20), valor_por_acao=Decimal('1.0'),
+                            data_com=date(2024, 6, 5)),
+            EventoDividendo(ticker='TST4', data_pagamento=date(2024, 6, 25), valor_por_acao=Decimal('0.6'),
+                            data_com=date(2024, 6, 15)),
+            # sem data com: vale a data de pagamento
+            EventoDividendo(ticker='TST4', data_pagamento=date(2024, 3, 1), valor_por_acao=Decimal('1.0')),
+            EventoDividendo(ticker='TST4', data_pagamento=date(2024, 6, 12), valor_por_acao=Decimal('0.8')),
+        ])
+        gravar_eventos_corporativos('TST4', [{'data': date(2024, 6, 10), 'tipo': 'desdobramento', 'fator': Decimal('2')}])
+        # ordem por data de pagamento: 03-01, 06-12, 06-20, 06-25
+        self.esperado = [0.5, 0.8, 0.5, 0.6]
+
+    def test_serie_ajustada_pela_data_com(self):
+        self.assertEqual(list(series.dividendos_ajustados('TST4').valores), self.esperado)
+        self.assertEqual(list(series.dividendos_banco('TST4', ajustado=True).valores), self.esperado)
+
+    def test_serie_gravada_ajustada_pela_data_com(self):
+        series.gravar_eventos('TST4')
+        series.gravar_dividendos('TST4')
+        with mock.patch.object(series, '_transacao_aberta', return_value=False):
+            serie = series.dividendos_ajustados('TST4')
+        self.assertEqual(list(serie.valores), self.esperado)
+        self.assertEqual(list(serie.datas), sorted(serie.datas))
+
+    def test_arrays_consolidados_ajustados(self):
+        _, _, valores = arrays_consolidados(self.usuario.id, [self.ativo.id], ajustado=True)
+        self.assertEqual(sorted(valores), sorted(self.esperado))
+
+
+# Busca de ativos e metas (FTS5 no SQLite): isolamento por dono, acentos e sintaxe do FTS no termo.
+class BuscaTest(ConsultasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.outro = User.objects.create(username='outro')
+        for usuario in (self.usuario, self.outro):
+            Ativo.objects.create(usuario=usuario, ticker='ITUB4', nome_empresa='Itaú Unibanco', setor='Bancos')
+            MetaRenda.objects.create(usuario=usuario, nome='Aposentadoria Antecipada',
+                                     renda_mensal_desejada=Decimal('8000'), anos_para_atingir=15)
+        Ativo.objects.create(usuario=self.usuario, ticker='PETR4', nome_empresa='Petrobras', setor='Petróleo')
+        MetaRenda.objects.create(usuario=self.usuario, nome='Reserva 2030',
+                                 renda_mensal_desejada=Decimal('1500'), anos_para_atingir=5)
+
+    def buscar(self, rota, termo):
+        response = self.client.get(rota, {'search': termo})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_somente_itens_do_dono(self):
+        ativos = self.buscar('/api/ativos/', 'itub')
+        self.assertEqual([a['ticker'] for a in ativos], ['ITUB4'])
+        self.assertEqual(Ativo.objects.get(id=ativos[0]['id']).usuario, self.usuario)
+        metas = self.buscar('/api/metas-renda/', 'apos')
+        self.assertEqual([MetaRenda.objects.get(id=m['id']).usuario for m in metas], [self.usuario])
+
+    def test_acentos_ignorados(self):
+        self.assertEqual([a['ticker'] for a in self.buscar('/api/ativos/', 'itau')], ['ITUB4'])
+        self.assertEqual([a['ticker'] for a in self.buscar('/api/ativos/', 'petroleo')], ['PETR4'])
+
+    def test_sintaxe_fts_no_termo(self):
+        for termo in ['"', 'itau" OR dono : "u', '*', 'NEAR(itau unibanco)', 'ita AND -', "'; DROP TABLE x; --"]:
+            for ativo in self.buscar('/api/ativos/', termo):
+                self.assertEqual(Ativo.objects.get(id=ativo['id']).usuario, self.usuario)
+        self.assertEqual(self.buscar('/api/ativos/', '"'), [])
+
+    def test_termo_numerico_combinado_com_nome(self):
+        self.assertEqual([m['nome'] for m in self.buscar('/api/metas-renda/', '5000')], ['Aposentadoria Antecipada'])
+        # "2030" não atinge a renda mínima, mas está no nome
+        self.assertEqual([m['nome'] for m in self.buscar('/api/metas-renda/', '2030')],
+                         ['Reserva 2030', 'Aposentadoria Antecipada'])
+        for termo in ['1.2.3', 'NaN', '1e400', '9' * 30]:
+            self.assertEqual(self.buscar('/api/metas-renda/', termo), [])
+
+
+# GET /api/historico-dividendos/exportar/: histórico consolidado do usuário em streaming.
+class ExportacaoTest(ConsultasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.itub = Ativo.objects.create(usuario=self.usuario, ticker='ITUB4', nome_empresa='Itaú')
+        petr = Ativo.objects.create(usuario=self.usuario, ticker='PETR4', nome_empresa='Petrobras')
+        outro = User.objects.create(username='outro')
+        Ativo.objects.create(usuario=outro, ticker='VALE3', nome_empresa='Vale')
+        HistoricoDividendo.objects.create(ativo=self.itub, data_pagamento=date(2024, 1, 15), valor_por_acao=Decimal('0.5'),
+                                          observacoes='JCP, "bruto"')
+        HistoricoDividendo.objects.create(ativo=petr, data_pagamento=date(2024, 3, 1), valor_por_acao=Decimal('1.25'))
+        EventoDividendo.objects.create(ticker='ITUB4', data_pagamento=date(2024, 2, 1), valor_por_acao=Decimal('0.3'))
+        EventoDividendo.objects.create(ticker='VALE3', data_pagamento=date(2024, 2, 1), valor_por_acao=Decimal('2'))
+        # 02:30 UTC é 23:30 do dia anterior em America/Sao_Paulo
+        HistoricoDividendo.objects.update(data_criacao=datetime.fromisoformat('2024-01-10T02:30:00+00:00'))
+
+    def exportar(self, **params):
+        response = self.client.get('/api/historico-dividendos/exportar/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        linhas = list(csv.DictReader(io.StringIO(self.exportar(formato='csv'))))
+        self.assertEqual([(l['ticker'], l['data_pagamento'], l['valor_por_acao'], l['fonte']) for l in linhas], [
+            ('PETR4', '2024-03-01', '1.2500', 'manual'),
+            ('ITUB4', '2024-02-01', '0.3000', 'api'),
+            ('ITUB4', '2024-01-15', '0.5000', 'manual'),
+        ])
+        self.assertEqual(linhas[2]['observacoes'], 'JCP, "bruto"')
+        self.assertEqual(linhas[2]['data_criacao'], '2024-01-09T23:30:00-03:00')
+
+    def test_ndjson_com_filtros(self):
+        linhas = [json.loads(l) for l in self.exportar(formato='ndjson', ativo=self.itub.id,
+                                                         data_inicio='2024-01-20').splitlines()]
+        self.assertEqual(len(linhas), 1)
+        self.assertEqual(linhas[0]['ticker'], 'ITUB4')
+        self.assertEqual(linhas[0]['valor_por_acao'], '0.3000')
+        self.assertIsNone(linhas[0]['id'])
+        linhas = [json.loads(l) for l in self.exportar(formato='ndjson', data_fim='2024-01-31').splitlines()]
+        self.assertEqual([l['data_criacao'] for l in linhas], ['2024-01-09T23:30:00-03:00'])
+
+    def test_formato_invalido(self):
+        response = self.client.get('/api/historico-dividendos/exportar/', {'formato': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+# GET /api/tickers/autocomplete/: índice em memória do catálogo.
+class AutocompleteTest(ConsultasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        catalogo.gravar_catalogo([
+            {'stock': 'ITUB4', 'name': 'Itaú Unibanco PN'},
+            {'stock': 'ITSA4', 'name': 'Itaúsa PN'},
+            {'stock': 'BBDC4', 'name': 'Bradesco PN'},
+            {'stock': 'PETR4', 'name': 'Petrobras PN'},
+            {'stock': 'PRIO3', 'name': 'Petro Rio ON'},
+        ])
+        catalogo.invalidar_indice()
+        self.addCleanup(catalogo.invalidar_indice)
+
+    def sugerir(self, termo, **params):
+        response = self.client.get('/api/tickers/autocomplete/', {'q': termo, **params})
+        self.assertEqual(response.status_code, 200)
+        return [r['ticker'] for r in response.json()['resultados']]
+
+    def test_ticker_antes_do_nome(self):
+        self.assertEqual(self.sugerir('pet'), ['PETR4', 'PRIO3'])
+        self.assertEqual(self.sugerir('it'), ['ITSA4', 'ITUB4'])
+
+    def test_acentos_e_palavras_do_nome(self):
+        self.assertEqual(self.sugerir('itaú'), ['ITUB4', 'ITSA4'])
+        self.assertEqual(self.sugerir('brad'), ['BBDC4'])
+        self.assertEqual(self.sugerir('  '), [])
+
+    def test_limite(self):
+        self.assertEqual(len(self.sugerir('p', limite=1)), 1)
+        self.assertEqual(len(self.sugerir('p', limite='x')), 5)
+        self.assertEqual(len(self.sugerir('p', limite=0)), 1)
+
+    def test_sem_consultas_e_recarga_apos_mudanca(self):
+        self.sugerir('pet')
+        self.assertEqual(self.contar_consultas('/api/tickers/autocomplete/?q=pet'), 0)
+        catalogo.gravar_catalogo([{'stock': 'PETR3', 'name': 'Petrobras ON'}])
+        catalogo.invalidar_indice()
+        self.assertEqual(self.sugerir('petr'), ['PETR3', 'PETR4', 'PRIO3'])
+
+
+# ETag/If-None-Match das listagens (CacheCondicionalMixin).
+class CacheCondicionalTest(ConsultasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meta = MetaRenda.objects.create(usuario=self.usuario, nome='Meta', renda_mensal_desejada=Decimal('1000'),
+                                             anos_para_atingir=5)
+        MetaRenda.objects.create(usuario=self.usuario, nome='Outra', renda_mensal_desejada=Decimal('2000'),
+                                 anos_para_atingir=5)
+
+    def etag(self, rota='/api/metas-renda/'):
+        response = self.client.get(rota)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        return response['ETag']
+
+    def test_nao_modificado(self):
+        etag = self.etag()
+        response = self.client.get('/api/metas-renda/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        # Comparação fraca: o ETag sem o prefixo W/ também vale
+        self.assertEqual(self.client.get('/api/metas-renda/', HTTP_IF_NONE_MATCH=etag[2:]).status_code, 304)
+        self.assertEqual(self.client.get('/api/metas-renda/', HTTP_IF_NONE_MATCH='W/"outro"').status_code, 200)
+
+    def test_etag_muda_apos_escrita(self):
+        etag = self.etag()
+        response = self.client.patch(f'/api/metas-renda/{self.meta.id}/', {'nome': 'Meta nova'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        novo = self.etag()
+        self.assertNotEqual(novo, etag)
+        self.assertEqual(self.client.get('/api/metas-renda/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Exclusão não avança a maior data de atualização, mas muda a quantidade
+        self.assertEqual(self.client.delete(f'/api/metas-renda/{self.meta.id}/').status_code, 204)
+        self.assertNotIn(self.etag(), (etag, novo))
+
+    def test_etag_por_usuario_e_por_consulta(self):
+        etag = self.etag()
+        self.assertNotEqual(self.etag('/api/metas-renda/?search=meta'), etag)
+        outro = APIClient()
+        outro.force_authenticate(User.objects.create(username='outro'))
+        self.assertEqual(outro.get('/api/metas-renda/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_evento_compartilhado_muda_etag_dos_ativos(self):
+        Ativo.objects.create(usuario=self.usuario, ticker='ITUB4', nome_empresa='Itaú')
+        etag = self.etag('/api/ativos/')
+        EventoDividendo.objects.create(ticker='ITUB4', data_pagamento=date(2024, 1, 15), valor_por_acao=Decimal('0.5'))
+        self.assertNotEqual(self.etag('/api/ativos/'), etag)
+
+
+# POST/PATCH/DELETE em /api/ativos/bulk/ e /api/historico-dividendos/bulk/.
+class BulkTest(ConsultasTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.outro = User.objects.create(username='outro')
+        self.itub = Ativo.objects.create(usuario=self.usuario, ticker='ITUB4', nome_empresa='Itaú')
+        self.alheio = Ativo.objects.create(usuario=self.outro, ticker='PETR4', nome_empresa='Petrobras')
+        self.pagamento = HistoricoDividendo.objects.create(ativo=self.itub, data_pagamento=date(2024, 1, 15),
+                                                           valor_por_acao=Decimal('0.5'))
+        self.pagamento_alheio = HistoricoDividendo.objects.create(ativo=self.alheio, data_pagamento=date(2024, 1, 15),
+                                                                  valor_por_acao=Decimal('1.0'))
+
+    def enviar(self, metodo, rota, corpo, atomico=True):
+        url = f'/api/{rota}/bulk/' + ('' if atomico else '?atomico=0')
+        return getattr(self.client, metodo)(url, corpo, format='json')
+
+    def test_criar_ativos_erros_por_item(self):
+        corpo = [
+            {'ticker': 'bbdc4', 'nome_empresa': 'Bradesco'},
+            {'ticker': 'BBDC4', 'nome_empresa': 'Repetido no lote'},
+            {'ticker': 'ITUB4', 'nome_empresa': 'Já cadastrado'},
+            {'nome_empresa': 'Sem ticker'},
+        ]
+        response = self.enviar('post', 'ativos', corpo)
+        self.assertEqual(response.status_code, 400)
+        erros = response.json()['erros']
+        self.assertEqual(erros[0], {})
+        self.assertEqual(set(erros[1]) | set(erros[2]) | set(erros[3]), {'ticker'})
+        self.assertFalse(Ativo.objects.filter(ticker='BBDC4').exists())
+
+        response = self.enviar('post', 'ativos', corpo, atomico=False)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['criados'], 1)
+        self.assertEqual([e['indice'] for e in response.json()['erros']], [1, 2, 3])
+        self.assertEqual(Ativo.objects.get(ticker='BBDC4').usuario, self.usuario)
+
+    def test_atualizar_ativos_so_do_usuario(self):
+        corpo = [{'id': self.itub.id, 'setor': 'Bancos'}, {'id': self.alheio.id, 'setor': 'Invadido'}]
+        response = self.enviar('patch', 'ativos', corpo)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.json()['erros'][1])
+        self.itub.refresh_from_db()
+        self.assertIsNone(self.itub.setor)
+
+        response = self.enviar('patch', 'ativos', corpo, atomico=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['atualizados'], 1)
+        self.itub.refresh_from_db()
+        self.alheio.refresh_from_db()
+        self.assertEqual(self.itub.setor, 'Bancos')
+        self.assertIsNone(self.alheio.setor)
+
+    def test_remover_ativos_so_do_usuario(self):
+        corpo = {'ids': [self.itub.id, self.alheio.id]}
+        response = self.enviar('delete', 'ativos', corpo)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['nao_encontrados'], [self.alheio.id])
+        self.assertEqual(Ativo.objects.count(), 2)
+
+        response = self.enviar('delete', 'ativos', corpo, atomico=False)
+        self.assertEqual(response.json(), {'removidos': 1, 'nao_encontrados': [self.alheio.id]})
+        self.assertEqual(list(Ativo.objects.values_list('id', flat=True)), [self.alheio.id])
+
+        self.assertEqual(self.enviar('delete', 'ativos', {'ids': ['1']}).status_code, 400)
+
+    def test_criar_pagamentos_erros_por_item(self):
+        corpo = [
+            {'ativo': self.itub.id, 'data_pagamento': '2024-02-15', 'valor_por_acao': '0.6'},
+            {'ativo': self.itub.id, 'data_pagamento': '2024-02-15', 'valor_por_acao': '0.6'},
+            {'ativo': self.itub.id, 'data_pagamento': '2024-01-15', 'valor_por_acao': '0.5'},
+            {'ativo': self.alheio.id, 'data_pagamento': '2024-03-15', 'valor_por_acao': '1.0'},
+            {'ativo': self.itub.id, 'data_pagamento': 'ontem', 'valor_por_acao': '0.6'},
+        ]
+        response = self.enviar('post', 'historico-dividendos', corpo)
+        self.assertEqual(response.status_code, 400)
+        erros = response.json()['erros']
+        self.assertEqual(erros[0], {})
+        self.assertIn('non_field_errors', erros[1])
+        self.assertIn('non_field_errors', erros[2])
+        self.assertIn('ativo', erros[3])
+        self.assertIn('data_pagamento', erros[4])
+        self.assertEqual(HistoricoDividendo.objects.count(), 2)
+
+        response = self.enviar('post', 'historico-dividendos', corpo, atomico=False)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['criados'], 1)
+        self.assertEqual([e['indice'] for e in response.json()['erros']], [1, 2, 3, 4])
+        self.assertFalse(HistoricoDividendo.objects.filter(ativo=self.alheio, data_pagamento=date(2024, 3, 15)).exists())
+
+    def test_atualizar_e_remover_pagamentos_so_do_usuario(self):
+        corpo = [{'id': self.pagamento.id, 'valor_por_acao': '0.55'},
+                 {'id': self.pagamento_alheio.id, 'valor_por_acao': '9'}]
+        response = self.enviar('patch', 'historico-dividendos', corpo, atomico=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e['indice'] for e in response.json()['erros']], [1])
+        self.pagamento.refresh_from_db()
+        self.pagamento_alheio.refresh_from_db()
+        self.assertEqual(self.pagamento.valor_por_acao, Decimal('0.55'))
+        self.assertEqual(self.pagamento_alheio.valor_por_acao, Decimal('1.0'))
+
+        # Mover o pagamento para um ativo de outro usuário também é recusado
+        response = self.enviar('patch', 'historico-dividendos', [{'id': self.pagamento.id, 'ativo': self.alheio.id}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ativo', response.json()['erros'][0])
+
+        response = self.enviar('delete', 'historico-dividendos', {'ids': [self.pagamento.id, self.pagamento_alheio.id]})
+        self.assertEqual(response.status_code, 400)
+        response = self.enviar('delete', 'historico-dividendos', {'ids': [self.pagamento.id, self.pagamento_alheio.id]},
+                               atomico=False)
+        self.assertEqual(response.json()['removidos'], 1)
+        self.assertTrue(HistoricoDividendo.objects.filter(id=self.pagamento_alheio.id).exists())
+
+
+# POST /api/batch/: sub-requisições na mesma transação.
+class LoteTest(ConsultasTestCase):
+
+    def lote(self, requisicoes, **extras):
+        response = self.client.post('/api/batch/', {'requisicoes': requisicoes, **extras}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def criar_ativo(self, ticker):
+        return {'metodo': 'POST', 'caminho': 'ativos/',
+                'corpo': {'usuario': self.usuario.id, 'ticker': ticker, 'nome_empresa': ticker}}
+
+    def test_atomico_desfaz_gravacoes_anteriores(self):
+        resultado = self.lote([
+            self.criar_ativo('ITUB4'),
+            {'metodo': 'PATCH', 'caminho': '/api/ativos/999999/', 'corpo': {'setor': 'Bancos'}},
+            self.criar_ativo('PETR4'),
+        ])
+        self.assertTrue(resultado['revertido'])
+        self.assertEqual([r['status'] for r in resultado['respostas']], [201, 404, 424])
+        self.assertEqual([r['id'] for r in resultado['respostas']], [0, 1, 2])
+        self.assertFalse(Ativo.objects.exists())
+
+    def test_nao_atomico_desfaz_so_a_que_falhou(self):
+        resultado = self.lote([
+            self.criar_ativo('ITUB4'),
+            self.criar_ativo('ITUB4'),
+            self.criar_ativo('PETR4'),
+        ], atomico=False)
+        self.assertFalse(resultado['revertido'])
+        self.assertEqual([r['status'] for r in resultado['respostas']], [201, 400, 201])
+        self.assertEqual(sorted(Ativo.objects.values_list('ticker', flat=True)), ['ITUB4', 'PETR4'])
+
+    def test_rotas_recusadas(self):
+        response = self.client.post('/api/batch/', {'requisicoes': [{'caminho': '/admin/'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('erro', response.json())
+        resultado = self.lote([
+            {'caminho': '/api/batch/', 'metodo': 'POST', 'corpo': {'requisicoes': [{'caminho': 'ativos/'}]}},
+            {'caminho': '/api/nao-existe/'},
+        ], atomico=False)
+        self.assertEqual([r['status'] for r in resultado['respostas']], [400, 404])
+
+    def test_parametros_somados_a_consulta(self):
+        ativo = Ativo.objects.create(usuario=self.usuario, ticker='ITUB4', nome_empresa='Itaú')
+        outro = Ativo.objects.create(usuario=self.usuario, ticker='PETR4', nome_empresa='Petrobras')
+        for a, dia in ((ativo, 10), (ativo, 20), (outro, 20)):
+            HistoricoDividendo.objects.create(ativo=a, data_pagamento=date(2024, 1, dia), valor_por_acao=Decimal('0.5'))
+        resultado = self.lote([{
+            'id': 'filtrado', 'caminho': f'historico-dividendos/?ativo={ativo.id}',
+            'parametros': {'data_inicio': '2024-01-15'},
+        }])
+        [resposta] = resultado['respostas']
+        self.assertEqual(resposta['id'], 'filtrado')
+        self.assertEqual([(d['ativo'], d['data_pagamento']) for d in resposta['corpo']['results']],
+                         [(ativo.id, '2024-01-20')])
+
+    def test_brapi_pre_carregada_em_paralelo(self):
+        def responder(url, params=None, **kwargs):
+            ticker = url.rsplit('/', 1)[-1]
+            resultado = {'symbol': ticker, 'longName': f'Empresa {ticker}', 'regularMarketPrice': 10.0}
+            return mock.Mock(status_code=200, json=mock.Mock(return_value={'results': [resultado]}))
+
+        busca = {'metodo': 'POST', 'caminho': 'ativos/buscar_dados_brapi/'}
+        with mock.patch('planner.brapi_service.requests.get', side_effect=responder) as chamada:
+            resultado = self.lote([
+                {**busca, 'corpo': {'ticker': 'ITUB4'}},
+                {**busca, 'corpo': {'ticker': 'PETR4'}},
+                {**busca, 'corpo': {'ticker': 'ITUB4'}},
+            ])
+        self.assertEqual([r['status'] for r in resultado['respostas']], [200, 200, 200])
+        # Uma chamada por ticker distinto, todas no pré-carregamento (nenhuma durante as sub-requisições)
+        self.assertEqual(sorted(c.args[0].rsplit('/', 1)[-1] for c in chamada.call_args_list), ['ITUB4', 'PETR4'])
@@ -8,7 +8,13 @@ from .views import (
     AtivoViewSet,
     HistoricoDividendoViewSet,
     MetaRendaViewSet,
-    SimulacaoViewSet
+    SimulacaoViewSet,
+    PerfilRequisicaoViewSet,
+    TickerCatalogoViewSet,
+    TarefaViewSet,
+    DashboardViewSet,
+    LoteViewSet,
+    eventos
 )
 
 # Criar router do DRF
@@ -17,8 +23,14 @@ router.register(r'ativos', AtivoViewSet, basename='ativo')
 router.register(r'historico-dividendos', HistoricoDividendoViewSet, basename='historico-dividendo')
 router.register(r'metas-renda', MetaRendaViewSet, basename='meta-renda')
 router.register(r'simulacoes', SimulacaoViewSet, basename='simulacao')
+router.register(r'tickers', TickerCatalogoViewSet, basename='ticker')
+router.register(r'perfis', PerfilRequisicaoViewSet, basename='perfil')
+router.register(r'jobs', TarefaViewSet, basename='tarefa')
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'batch', LoteViewSet, basename='batch')
 
 urlpatterns = [
+    path('eventos/', eventos, name='eventos'),
     path('', include(router.urls)),
 ]
 
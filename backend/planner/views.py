@@ -7,50 +7,133 @@ Todas as operações CRUD e busca são implementadas aqui, não no Django Admin.
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch, Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import datetime, timedelta
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from typing import Optional
 import requests
 
-from .models import Ativo, HistoricoDividendo, MetaRenda, Simulacao
+from .models import (
+    Ativo, EventoDividendo, HistoricoDividendo, MetaRenda, Simulacao, PerfilRequisicao, TickerCatalogo, Tarefa
+)
 from .serializers import (
     AtivoSerializer, HistoricoDividendoSerializer,
-    MetaRendaSerializer, SimulacaoSerializer
+    MetaRendaSerializer, SimulacaoSerializer, PerfilRequisicaoSerializer,
+    AtivoBulkSerializer, HistoricoDividendoBulkSerializer, TickerCatalogoSerializer,
+    DividendoConsolidadoSerializer, TarefaSerializer, SIMULACOES_POR_META
 )
-from .services import calcular_simulacao_dividendos, calcular_yield_medio_ativos
+from .services import calcular_yield_medio_ativos, simular_meta
 from .brapi_service import BrapiService
+from .mixins import BulkMixin, CacheCondicionalMixin, SincronizacaoMixin, versao_queryset
+from .exportacao import gerar_csv, gerar_ndjson
+from .busca import buscar
+from .catalogo import obter_indice
+from .importacao import ArquivoInvalidoError, importar_dividendos_csv
+from .dividendos import (
+    anotar_total_dividendos, dividendos_usuario, importar_eventos_ticker, inicio_ano_dividendos,
+    resumo_janelas_ticker, total_dividendos_desde,
+)
+from .janelas import JANELAS_VALIDAS
+from .tarefas import enfileirar
+from .tempo_real import fluxo_eventos
+from .painel import marcar_painel, obter_painel
+from .indicadores import indicadores_usuario, ordenar
+from .backtest import BacktestErro, executar_backtest, parametros_backtest
+from .otimizacao import OtimizacaoErro, otimizar_meta
+from .lote import LoteErro, executar_lote, validar_lote
+from .sincronizacao import ativos_alterados, dividendos_removidos, metas_alteradas, removidos_desde
+
+
+# Indica se o cliente pediu execução assíncrona (?assincrono=1 ou cabeçalho "Prefer: respond-async").
+def _quer_assincrono(request):
+    return (
+        request.query_params.get('assincrono') in ('1', 'true')
+        or 'respond-async' in request.headers.get('Prefer', '')
+    )
+
+
+# Resposta 202 para uma tarefa enfileirada, apontando para GET /api/jobs/{id}/.
+def _resposta_tarefa(request, tarefa):
+    url = request.build_absolute_uri(f'/api/jobs/{tarefa.id}/')
+    response = Response(
+        {'id': tarefa.id, 'status': tarefa.status, 'url': url},
+        status=status.HTTP_202_ACCEPTED
+    )
+    response['Location'] = url
+    return response
 
 
 # ViewSet para CRUD completo de Ativos, incluindo busca por ticker ou nome.
-class AtivoViewSet(viewsets.ModelViewSet):
+class AtivoViewSet(BulkMixin, CacheCondicionalMixin, SincronizacaoMixin, viewsets.ModelViewSet):
     serializer_class = AtivoSerializer
+    bulk_serializer_class = AtivoBulkSerializer
     # permission_classes = [IsAuthenticated]  # Desabilitado para facilitar testes
 
     # Filtra ativos do usuário logado.
     def get_queryset(self):
         # Por enquanto, usar usuário padrão (id=1) se não autenticado
         user_id = self.request.user.id if self.request.user.is_authenticated else 1
-        queryset = Ativo.objects.filter(usuario_id=user_id)
+        # Dividendos aninhados carregados em uma consulta para toda a página (não uma por ativo)
+        queryset = Ativo.objects.filter(usuario_id=user_id).select_related('usuario').prefetch_related(
+            Prefetch(
+                'historico_dividendos',
+                queryset=HistoricoDividendo.objects.only(*CAMPOS_HISTORICO).order_by('-data_pagamento', '-data_criacao')
+            )
+        )
+        # total_dividendos_ano de todos os ativos na mesma consulta da página
+        queryset = anotar_total_dividendos(queryset, inicio_ano_dividendos())
         
-        # Busca por ticker ou nome
+        # Busca indexada por ticker, nome ou setor (prefixos, ordenada por relevância)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(ticker__icontains=search) |
-                Q(nome_empresa__icontains=search) |
-                Q(setor__icontains=search)
-            )
+            queryset, ordenacao = buscar(queryset, 'ativo', search, user_id)
+            return queryset.order_by(*ordenacao, 'ticker')
         
         return queryset.order_by('ticker')
 
+    # Versão da coleção: ativos do usuário, dividendos aninhados e eventos compartilhados (total_dividendos_ano).
+    def versoes_colecao(self):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        ativos = Ativo.objects.filter(usuario_id=user_id)
+        return [
+            versao_queryset(ativos, 'data_atualizacao'),
+            versao_queryset(HistoricoDividendo.objects.filter(ativo__usuario_id=user_id), 'data_atualizacao'),
+            versao_queryset(EventoDividendo.objects.filter(ticker__in=ativos.values('ticker')), 'data_criacao'),
+        ]
+
+    # Sincronização incremental: ativos alterados (inclusive pelos dividendos aninhados) e removidos.
+    # Endpoint: GET /api/ativos/?since=<cursor>
+    def alteracoes_desde(self, desde):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        if desde is None:
+            return {'alterados': self.get_queryset(), 'removidos': []}
+        return {
+            'alterados': self.get_queryset().filter(id__in=ativos_alterados(user_id, desde)),
+            'removidos': removidos_desde('ativo', desde, user_id),
+        }
+
+    # Gravações em lote não disparam sinais: marca a carteira do painel manualmente.
+    def apos_bulk(self):
+        marcar_painel([self.request.user.id if self.request.user.is_authenticated else 1], carteira=True)
+
     # Associa o ativo ao usuário logado ao criar.
     def perform_create(self, serializer):
         # Por enquanto, usar usuário padrão (id=1) se não autenticado
         user = self.request.user if self.request.user.is_authenticated else User.objects.get(id=1)
         serializer.save(usuario=user)
+
+    # Operações em lote validam tickers contra os ativos do usuário. Endpoint: /api/ativos/bulk/
+    def get_bulk_context(self):
+        return {'usuario_id': self.request.user.id if self.request.user.is_authenticated else 1}
+
+    def get_bulk_save_kwargs(self):
+        return {'usuario_id': self.request.user.id if self.request.user.is_authenticated else 1}
     
     # Busca dados de uma ação na API Brapi e retorna informações. Endpoint: POST /api/ativos/buscar_dados_brapi/
     @action(detail=False, methods=['post'])
@@ -94,7 +177,8 @@ class AtivoViewSet(viewsets.ModelViewSet):
             
             # Buscar dividendos e yield
             try:
-                dividendos = BrapiService.get_dividends(ticker, range_days="1y")
+                # Reaproveita a resposta de get_quote (já traz os dividendos do período)
+                dividendos = BrapiService.get_dividends(ticker, dados=dados)
                 print(f"Dividendos obtidos: {len(dividendos) if dividendos else 0}")
             except Exception as e:
                 print(f"Erro ao buscar dividendos: {e}")
@@ -198,91 +282,232 @@ class AtivoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    # Importa dividendos de um ativo da API Brapi. Endpoint: POST /api/ativos/{id}/importar_dividendos_brapi/
+    # Indicadores de crescimento e consistência dos dividendos de todos os ativos do usuário
+    # (CAGR, regularidade, sequências, volatilidade e yield do último ano completo).
+    # Endpoint: GET /api/ativos/analytics/?ordenar=-cagr_5a
+    @action(detail=False, methods=['get'], url_path='analytics')
+    def indicadores(self, request):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        itens = indicadores_usuario(user_id)
+        
+        campo = request.query_params.get('ordenar')
+        if campo:
+            try:
+                itens = ordenar(itens, campo)
+            except ValueError as e:
+                return Response({'erro': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'total': len(itens), 'ativos': itens})
+    
+    # Importa dividendos de um ativo da API Brapi para o armazenamento compartilhado por ticker
+    # (uma única cópia para todos os usuários). Endpoint: POST /api/ativos/{id}/importar_dividendos_brapi/
+    # Com ?assincrono=1 enfileira a importação e responde 202 com o id da tarefa.
     @action(detail=True, methods=['post'])
     def importar_dividendos_brapi(self, request, pk=None):
         ativo = self.get_object()
         
-        # Buscar dividendos na Brapi
-        dividendos = BrapiService.get_dividends(ativo.ticker, range_days="1y")
+        if _quer_assincrono(request):
+            tarefa = enfileirar('importar_dividendos_brapi', usuario_id=ativo.usuario_id, ativo_id=ativo.id)
+            return _resposta_tarefa(request, tarefa)
+        
+        resultado = importar_eventos_ticker(ativo.ticker, nome=ativo.nome_empresa, setor=ativo.setor)
         
-        if not dividendos:
+        if resultado is None:
             return Response(
                 {'erro': f'Não foram encontrados dividendos para {ativo.ticker}'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Importar dividendos (evitar duplicatas)
-        importados = 0
-        duplicados = 0
-        
-        for div in dividendos:
-            # Verificar se já existe
-            existe = HistoricoDividendo.objects.filter(
-                ativo=ativo,
-                data_pagamento=div['data_pagamento']
-            ).exists()
-            
-            if not existe:
-                HistoricoDividendo.objects.create(
-                    ativo=ativo,
-                    data_pagamento=div['data_pagamento'],
-                    valor_por_acao=div['valor_por_acao'],
-                    fonte=div['fonte'],
-                    observacoes=f'Importado automaticamente da Brapi em {timezone.now().strftime("%d/%m/%Y %H:%M")}'
-                )
-                importados += 1
-            else:
-                duplicados += 1
-        
         return Response({
             'mensagem': f'Importação concluída para {ativo.ticker}',
-            'importados': importados,
-            'duplicados': duplicados,
-            'total_encontrados': len(dividendos)
+            **resultado
         }, status=status.HTTP_200_OK)
+    
+    # Dividendos e yield anualizado do ativo em várias janelas, fatiadas do histórico local
+    # (a Brapi só é consultada se o histórico do ticker estiver ausente ou desatualizado).
+    # Endpoint: GET /api/ativos/{id}/janelas/?janelas=3m,1y,5y,ytd
+    @action(detail=True, methods=['get'])
+    def janelas(self, request, pk=None):
+        ativo = self.get_object()
+        janelas = [j.strip().lower() for j in request.query_params.get('janelas', '3m,1y,5y,ytd').split(',') if j.strip()]
+        
+        invalidas = [j for j in janelas if j not in JANELAS_VALIDAS]
+        if invalidas or not janelas:
+            return Response(
+                {'erro': f'Janelas inválidas: {", ".join(invalidas)}. Use: {", ".join(JANELAS_VALIDAS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resumos = resumo_janelas_ticker(ativo.ticker, janelas, nome=ativo.nome_empresa, setor=ativo.setor)
+        return Response({'ativo': ativo.id, 'ticker': ativo.ticker, 'janelas': resumos})
+
+
+# Colunas de HistoricoDividendo lidas pelo ViewSet (o ativo relacionado traz só id, ticker e nome).
+CAMPOS_HISTORICO = [
+    'id', 'ativo', 'data_pagamento', 'valor_por_acao', 'fonte', 'observacoes', 'data_criacao', 'data_atualizacao'
+]
 
 
 # ViewSet para CRUD completo de Histórico de Dividendos, incluindo filtros por ativo e intervalo de datas.
-class HistoricoDividendoViewSet(viewsets.ModelViewSet):
+class HistoricoDividendoViewSet(BulkMixin, CacheCondicionalMixin, SincronizacaoMixin, viewsets.ModelViewSet):
     serializer_class = HistoricoDividendoSerializer
+    bulk_serializer_class = HistoricoDividendoBulkSerializer
     # permission_classes = [IsAuthenticated]  # Desabilitado para facilitar testes
 
-    # Filtra dividendos dos ativos do usuário logado.
+    # Filtra dividendos dos ativos do usuário logado. A listagem (e a exportação) usa o histórico consolidado:
+    # lançamentos próprios + eventos compartilhados dos tickers do usuário; as demais ações só os próprios.
     def get_queryset(self):
         # Por enquanto, usar usuário padrão (id=1) se não autenticado
         user_id = self.request.user.id if self.request.user.is_authenticated else 1
-        ativos_usuario = Ativo.objects.filter(usuario_id=user_id)
-        queryset = HistoricoDividendo.objects.filter(ativo__in=ativos_usuario)
+        ativo_id, data_inicio, data_fim = self._filtros()
+
+        if self.action in ('list', 'exportar'):
+            return dividendos_usuario(user_id, ativo_id=ativo_id, data_inicio=data_inicio, data_fim=data_fim)
+
+        # Posse pelo JOIN com o ativo (não por subconsulta) e ticker/nome carregados na mesma consulta
+        queryset = HistoricoDividendo.objects.filter(ativo__usuario_id=user_id).select_related('ativo').only(
+            *CAMPOS_HISTORICO, 'ativo__id', 'ativo__ticker', 'ativo__nome_empresa'
+        )
         
-        # Filtro por ativo
-        ativo_id = self.request.query_params.get('ativo', None)
         if ativo_id:
             queryset = queryset.filter(ativo_id=ativo_id)
-        
-        # Filtro por data inicial
-        data_inicio = self.request.query_params.get('data_inicio', None)
         if data_inicio:
-            try:
-                data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d').date()
-                queryset = queryset.filter(data_pagamento__gte=data_inicio)
-            except ValueError:
-                pass
-        
-        # Filtro por data final
-        data_fim = self.request.query_params.get('data_fim', None)
+            queryset = queryset.filter(data_pagamento__gte=data_inicio)
         if data_fim:
-            try:
-                data_fim = datetime.strptime(data_fim, '%Y-%m-%d').date()
-                queryset = queryset.filter(data_pagamento__lte=data_fim)
-            except ValueError:
-                pass
+            queryset = queryset.filter(data_pagamento__lte=data_fim)
         
         return queryset.order_by('-data_pagamento', '-data_criacao')
 
+    # Lê os filtros da query string: ativo, data_inicio e data_fim (datas inválidas são ignoradas).
+    def _filtros(self):
+        params = self.request.query_params
+        ativo_id = params.get('ativo', None)
+        if ativo_id is not None and not str(ativo_id).isdigit():
+            ativo_id = None
+        datas = []
+        for nome in ('data_inicio', 'data_fim'):
+            try:
+                datas.append(datetime.strptime(params[nome], '%Y-%m-%d').date() if params.get(nome) else None)
+            except ValueError:
+                datas.append(None)
+        return ativo_id, datas[0], datas[1]
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return DividendoConsolidadoSerializer
+        return HistoricoDividendoSerializer
+
+    # Operações em lote só aceitam ativos do usuário. Endpoint: /api/historico-dividendos/bulk/
+    def get_bulk_context(self):
+        return {'usuario_id': self.request.user.id if self.request.user.is_authenticated else 1}
+
+    # Gravações em lote não disparam sinais: marca a carteira do painel manualmente.
+    def apos_bulk(self):
+        marcar_painel([self.request.user.id if self.request.user.is_authenticated else 1], carteira=True)
+
+    # Versão da coleção: dividendos do usuário, eventos compartilhados dos seus tickers e ativos (ticker/nome exibidos em cada linha).
+    def versoes_colecao(self):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        ativos = Ativo.objects.filter(usuario_id=user_id)
+        return [
+            versao_queryset(HistoricoDividendo.objects.filter(ativo__usuario_id=user_id), 'data_atualizacao'),
+            versao_queryset(EventoDividendo.objects.filter(ticker__in=ativos.values('ticker')), 'data_criacao'),
+            versao_queryset(ativos, 'data_atualizacao'),
+        ]
+
+    # Sincronização incremental por ativo: as linhas de eventos compartilhados não têm id próprio e aparecem
+    # ou somem conforme os lançamentos do usuário, então cada ativo afetado volta com todas as suas linhas.
+    # O cliente descarta as linhas dos ativos em "ativos" e aplica "alterados"; "removidos" lista os
+    # lançamentos próprios excluídos. Endpoint: GET /api/historico-dividendos/?since=<cursor>
+    def alteracoes_desde(self, desde):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        ativo_id, data_inicio, data_fim = self._filtros()
+        if desde is None:
+            ativos = Ativo.objects.filter(usuario_id=user_id)
+            if ativo_id:
+                ativos = ativos.filter(id=ativo_id)
+            return {'alterados': self.get_queryset(), 'removidos': [], 'ativos': sorted(ativos.values_list('id', flat=True))}
+
+        afetados = ativos_alterados(user_id, desde) | set(removidos_desde('ativo', desde, user_id))
+        if ativo_id:
+            afetados &= {int(ativo_id)}
+        return {
+            'alterados': dividendos_usuario(user_id, data_inicio=data_inicio, data_fim=data_fim, ativos_ids=sorted(afetados)),
+            'removidos': dividendos_removidos(afetados, desde),
+            'ativos': sorted(afetados),
+        }
+
+    # Exporta o histórico filtrado em streaming, com memória constante. Endpoint: GET /api/historico-dividendos/exportar/?formato=csv|ndjson
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'ndjson'):
+            return Response(
+                {'erro': 'Formato inválido. Use csv ou ndjson.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        campos = ['id', 'ticker', 'data_pagamento', 'valor_por_acao', 'fonte', 'observacoes', 'data_criacao']
+        colunas = ['r_id', 'r_ticker', 'r_data', 'r_valor', 'r_fonte', 'r_observacoes', 'r_criacao']
+        # Histórico consolidado em values() + iterator(): linhas lidas do cursor em blocos,
+        # sem instâncias de modelo nem cache do queryset
+        linhas = (
+            dict(zip(campos, (linha[c] for c in colunas)))
+            for linha in self.get_queryset().iterator(chunk_size=2000)
+        )
+
+        if formato == 'csv':
+            response = StreamingHttpResponse(gerar_csv(linhas, campos), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(gerar_ndjson(linhas, campos), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="historico_dividendos.{formato}"'
+        return response
+
+    # Importa dividendos de um CSV (multipart, campo "arquivo") em lotes, com relatório de erros por linha. Endpoint: POST /api/historico-dividendos/importar_arquivo/
+    @action(detail=False, methods=['post'])
+    def importar_arquivo(self, request):
+        arquivo = request.FILES.get('arquivo')
+        if not arquivo:
+            return Response(
+                {'erro': 'Envie o arquivo CSV no campo "arquivo".'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        delimitador = request.data.get('delimitador') or None
+        if delimitador not in (None, ',', ';'):
+            return Response(
+                {'erro': 'Delimitador inválido. Use "," ou ";".'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        try:
+            relatorio = importar_dividendos_csv(
+                arquivo.file,
+                usuario_id=user_id,
+                delimitador=delimitador,
+                observacao=f'Importado do arquivo {arquivo.name} em {timezone.now().strftime("%d/%m/%Y %H:%M")}'
+            )
+        except ArquivoInvalidoError as e:
+            return Response({'erro': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(relatorio, status=status.HTTP_200_OK)
+
+
+# Termo de busca como valor de renda (ex: "5000" ou "2500.50"), ou None se não for um número
+# finito que caiba em MetaRenda.renda_mensal_desejada.
+def _valor_busca(termo: str) -> Optional[Decimal]:
+    try:
+        valor = Decimal(termo.strip())
+    except InvalidOperation:
+        return None
+    if not valor.is_finite() or abs(valor) >= Decimal(10) ** 10:
+        return None
+    return valor
+
 
 # ViewSet para CRUD completo de Metas de Renda, incluindo busca por nome ou valor de renda.
-class MetaRendaViewSet(viewsets.ModelViewSet):
+class MetaRendaViewSet(CacheCondicionalMixin, SincronizacaoMixin, viewsets.ModelViewSet):
     serializer_class = MetaRendaSerializer
     # permission_classes = [IsAuthenticated]  # Desabilitado para facilitar testes
 
@@ -290,18 +515,47 @@ class MetaRendaViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Por enquanto, usar usuário padrão (id=1) se não autenticado
         user_id = self.request.user.id if self.request.user.is_authenticated else 1
-        queryset = MetaRenda.objects.filter(usuario_id=user_id)
+        # Últimas N simulações de todas as metas em uma única consulta (ROW_NUMBER() OVER (PARTITION BY meta_renda))
+        queryset = MetaRenda.objects.filter(usuario_id=user_id).select_related('usuario').prefetch_related(
+            Prefetch(
+                'simulacoes',
+                queryset=Simulacao.objects.order_by('-data_execucao', '-id')[:SIMULACOES_POR_META],
+                to_attr='simulacoes_recentes'
+            )
+        )
         
-        # Busca por nome
+        # Busca indexada por nome; um termo numérico também traz as metas com renda mínima >= valor
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) |
-                Q(renda_mensal_desejada__gte=Decimal(search)) if search.replace('.', '').isdigit() else Q()
-            )
+            valor = _valor_busca(search)
+            por_nome, ordenacao = buscar(queryset, 'metarenda', search, user_id)
+            if valor is None:
+                return por_nome.order_by(*ordenacao, '-data_criacao')
+            return queryset.filter(
+                Q(renda_mensal_desejada__gte=valor) | Q(id__in=por_nome.values('id'))
+            ).order_by('-data_criacao')
         
         return queryset.order_by('-data_criacao')
 
+    # Versão da coleção: metas do usuário e simulações aninhadas na listagem.
+    def versoes_colecao(self):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        return [
+            versao_queryset(MetaRenda.objects.filter(usuario_id=user_id), 'data_atualizacao'),
+            versao_queryset(Simulacao.objects.filter(meta_renda__usuario_id=user_id), 'data_execucao'),
+        ]
+
+    # Sincronização incremental: metas alteradas (inclusive pelas simulações aninhadas) e removidas.
+    # Endpoint: GET /api/metas-renda/?since=<cursor>
+    def alteracoes_desde(self, desde):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        if desde is None:
+            return {'alterados': self.get_queryset(), 'removidos': []}
+        return {
+            'alterados': self.get_queryset().filter(id__in=metas_alteradas(user_id, desde)),
+            'removidos': removidos_desde('metarenda', desde, user_id),
+        }
+
     # Associa a meta ao usuário logado ao criar.
     def perform_create(self, serializer):
         # Por enquanto, usar usuário padrão (id=1) se não autenticado
@@ -309,6 +563,7 @@ class MetaRendaViewSet(viewsets.ModelViewSet):
         serializer.save(usuario=user)
 
     # Executa uma simulação baseada em uma MetaRenda, aceita yield_medio opcional e lista de ativos_ids.
+    # Com ?assincrono=1 enfileira a simulação e responde 202 com o id da tarefa.
     @action(detail=True, methods=['post'])
     def simular(self, request, pk=None):
         meta = self.get_object()
@@ -318,72 +573,82 @@ class MetaRendaViewSet(viewsets.ModelViewSet):
         if yield_medio:
             try:
                 yield_medio = Decimal(str(yield_medio))
-            except (ValueError, TypeError):
+            except (ValueError, TypeError, ArithmeticError):
                 yield_medio = None
+        else:
+            yield_medio = None
         
         # Obter lista de ativos selecionados (opcional)
         ativos_ids = request.data.get('ativos_ids', [])
         user_id = request.user.id if request.user.is_authenticated else 1
+        salvar = request.data.get('salvar', False)
+        observacoes = request.data.get('observacoes', '')
         
-        # Se não fornecido, tentar calcular baseado nos ativos selecionados ou do usuário
-        if yield_medio is None:
-            if ativos_ids:
-                # Usar apenas os ativos selecionados
-                ativos = Ativo.objects.filter(id__in=ativos_ids, usuario_id=user_id)
-            else:
-                # Usar todos os ativos do usuário
-                ativos = Ativo.objects.filter(usuario_id=user_id)
-            
-            yields = []
-            
-            for ativo in ativos:
-                # Tentar buscar yield da Brapi
-                try:
-                    yield_ativo = BrapiService.calculate_yield(ativo.ticker, range_days="1y")
-                    if yield_ativo:
-                        yields.append(yield_ativo)
-                except Exception as e:
-                    print(f"Erro ao buscar yield de {ativo.ticker}: {e}")
-                    # Se falhar, calcular baseado nos dividendos locais
-                    um_ano_atras = timezone.now().date() - timedelta(days=365)
-                    dividendos = HistoricoDividendo.objects.filter(
-                        ativo=ativo,
-                        data_pagamento__gte=um_ano_atras
-                    )
-                    total_dividendos = sum(d.valor_por_acao for d in dividendos)
-                    
-                    if total_dividendos > 0:
-                        # Tentar buscar preço atual da Brapi
-                        preco = BrapiService.get_current_price(ativo.ticker)
-                        if preco and preco > 0:
-                            yield_ativo = (total_dividendos / preco) * Decimal('100')
-                            yields.append(yield_ativo)
-            
-            # Calcular média dos yields ou usar padrão
-            if yields:
-                yield_medio = sum(yields) / Decimal(str(len(yields)))
-            else:
-                yield_medio = Decimal('6.0')  # Padrão se não conseguir calcular
+        if _quer_assincrono(request):
+            tarefa = enfileirar(
+                'simular', usuario_id=meta.usuario_id, meta_id=meta.id,
+                yield_medio=str(yield_medio) if yield_medio is not None else None,
+                ativos_ids=ativos_ids, salvar=bool(salvar), observacoes=observacoes
+            )
+            return _resposta_tarefa(request, tarefa)
         
-        # Executar simulação
-        resultado = calcular_simulacao_dividendos(
-            renda_mensal_desejada=meta.renda_mensal_desejada,
-            anos_para_atingir=meta.anos_para_atingir,
-            inflacao_media_anual=meta.inflacao_media_anual,
-            percentual_reinvestimento=meta.percentual_reinvestimento,
-            yield_medio=yield_medio
+        resultado = simular_meta(
+            meta, user_id, yield_medio=yield_medio, ativos_ids=ativos_ids,
+            salvar=salvar, observacoes=observacoes
         )
         
-        # Salvar simulação (opcional)
-        salvar = request.data.get('salvar', False)
-        if salvar:
-            Simulacao.objects.create(
-                meta_renda=meta,
-                patrimonio_alvo=resultado['patrimonio_alvo'],
-                aporte_mensal=resultado['aporte_mensal'],
-                yield_medio_usado=resultado['yield_medio_usado'],
-                observacoes=request.data.get('observacoes', '')
+        return Response(resultado, status=status.HTTP_200_OK)
+    
+    # Backtest da meta com os preços e dividendos históricos guardados (aportes mensais + reinvestimento).
+    # Endpoint: POST /api/metas-renda/{id}/backtest/
+    # Corpo: {"ativos_ids": [...], "aporte_mensal": "1500", "data_inicio": "2010-01-01", "data_fim": "...", "pesos": {"ITUB4": 0.6}}
+    # Com ?assincrono=1 enfileira o backtest e responde 202 com o id da tarefa.
+    @action(detail=True, methods=['post'])
+    def backtest(self, request, pk=None):
+        meta = self.get_object()
+        user_id = request.user.id if request.user.is_authenticated else 1
+        
+        try:
+            parametros = parametros_backtest(request.data)
+        except BacktestErro as e:
+            return Response({'erro': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if _quer_assincrono(request):
+            tarefa = enfileirar(
+                'backtest', usuario_id=meta.usuario_id, meta_id=meta.id,
+                **{campo: request.data.get(campo) for campo in ('ativos_ids', 'aporte_mensal', 'data_inicio', 'data_fim', 'pesos')}
+            )
+            return _resposta_tarefa(request, tarefa)
+        
+        try:
+            resultado = executar_backtest(meta, user_id, **parametros)
+        except BacktestErro as e:
+            return Response({'erro': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(resultado, status=status.HTTP_200_OK)
+    
+    # Alocação entre os ativos que atinge a meta com o menor aporte mensal, com limites por ativo e por setor.
+    # Endpoint: POST /api/metas-renda/{id}/otimizar/
+    # Corpo: {"ativos_ids": [...], "limite_ativo": 25, "limite_setor": 40, "limites_setor": {"Financeiro": 30},
+    #         "aversao_risco": 0, "salvar": false}
+    @action(detail=True, methods=['post'])
+    def otimizar(self, request, pk=None):
+        meta = self.get_object()
+        user_id = request.user.id if request.user.is_authenticated else 1
+        dados = request.data
+        
+        # Os parâmetros são validados (tipos e faixas) em otimizar_meta
+        try:
+            resultado = otimizar_meta(
+                meta, user_id, ativos_ids=dados.get('ativos_ids') or None,
+                limite_ativo=dados.get('limite_ativo') or 100,
+                limite_setor=dados.get('limite_setor') or 100,
+                limites_setor=dados.get('limites_setor') or {},
+                aversao_risco=dados.get('aversao_risco') or 0,
+                salvar=bool(dados.get('salvar', False)), observacoes=dados.get('observacoes', ''),
             )
+        except OtimizacaoErro as e:
+            return Response({'erro': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(resultado, status=status.HTTP_200_OK)
 
@@ -397,8 +662,7 @@ class SimulacaoViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Por enquanto, usar usuário padrão (id=1) se não autenticado
         user_id = self.request.user.id if self.request.user.is_authenticated else 1
-        metas_usuario = MetaRenda.objects.filter(usuario_id=user_id)
-        queryset = Simulacao.objects.filter(meta_renda__in=metas_usuario)
+        queryset = Simulacao.objects.filter(meta_renda__usuario_id=user_id).select_related('meta_renda')
         
         # Filtro por meta
         meta_id = self.request.query_params.get('meta', None)
@@ -407,3 +671,111 @@ class SimulacaoViewSet(viewsets.ModelViewSet):
         
         return queryset.order_by('-data_execucao')
 
+
+
+# ViewSet somente leitura dos perfis de requisições capturados pelo ProfilerMiddleware (apenas admin).
+class PerfilRequisicaoViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = PerfilRequisicaoSerializer
+    permission_classes = [IsAdminUser]
+    queryset = PerfilRequisicao.objects.select_related('usuario').defer('estatisticas')
+
+    # Baixa o perfil em formato .prof (pstats/snakeviz) ou texto. Endpoint: GET /api/perfis/{id}/download/?formato=prof|txt
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        perfil = self.get_object()
+        formato = request.query_params.get('formato', 'prof')
+
+        if formato == 'txt':
+            consultas = '\n'.join(f"[{q['tempo']}s] {q['sql']}" for q in perfil.consultas_sql)
+            conteudo = f"{perfil}\n\n{perfil.resumo}\n\nConsultas SQL ({len(perfil.consultas_sql)}):\n{consultas}\n"
+            response = HttpResponse(conteudo, content_type='text/plain; charset=utf-8')
+        elif not perfil.estatisticas:
+            return Response({'erro': 'Requisição lenta registrada sem cProfile; use formato=txt.'}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            response = HttpResponse(bytes(perfil.estatisticas), content_type='application/octet-stream')
+            formato = 'prof'
+
+        response['Content-Disposition'] = f'attachment; filename="perfil_{perfil.id}.{formato}"'
+        return response
+
+
+# ViewSet somente leitura do catálogo global de tickers, com autocomplete servido de um índice em memória.
+class TickerCatalogoViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = TickerCatalogoSerializer
+    queryset = TickerCatalogo.objects.all()
+    lookup_field = 'ticker'
+
+    # Sugere tickers por prefixo do código ou do nome, sem consultar o banco nem a Brapi. Endpoint: GET /api/tickers/autocomplete/?q=PET&limite=10
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        termo = request.query_params.get('q', '')
+        try:
+            limite = min(max(int(request.query_params.get('limite', 10)), 1), 50)
+        except ValueError:
+            limite = 10
+
+        return Response({'resultados': obter_indice().buscar(termo, limite)}, status=status.HTTP_200_OK)
+
+
+# ViewSet (somente leitura) das tarefas assíncronas do usuário. Endpoint: GET /api/jobs/{id}/
+class TarefaViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = TarefaSerializer
+
+    # Apenas as tarefas do usuário logado.
+    def get_queryset(self):
+        user_id = self.request.user.id if self.request.user.is_authenticated else 1
+        return Tarefa.objects.filter(usuario_id=user_id)
+
+
+
+# Painel pré-calculado do usuário (carteira, renda dos últimos 12 meses, yield, próximos pagamentos e
+# última simulação de cada meta). Endpoint: GET /api/dashboard/
+class DashboardViewSet(viewsets.ViewSet):
+
+    def list(self, request):
+        user_id = request.user.id if request.user.is_authenticated else 1
+        return Response(obter_painel(user_id), status=status.HTTP_200_OK)
+
+# Requisição composta: executa várias chamadas à API (planner.lote) em uma transação e devolve todas as
+# respostas juntas. Corpo: {"requisicoes": [{"id", "metodo", "caminho", "parametros", "corpo"}], "atomico": true}
+# Endpoint: POST /api/batch/
+class LoteViewSet(viewsets.ViewSet):
+
+    def create(self, request):
+        user_id = request.user.id if request.user.is_authenticated else 1
+        dados = request.data if isinstance(request.data, dict) else {'requisicoes': request.data}
+        try:
+            itens = validar_lote(dados.get('requisicoes'))
+        except LoteErro as e:
+            return Response({'erro': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        atomico = dados.get('atomico', True) not in (False, 0, '0', 'false')
+        respostas, revertido = executar_lote(request, itens, user_id, atomico=atomico)
+        return Response({'respostas': respostas, 'revertido': revertido}, status=status.HTTP_200_OK)
+
+
+# Fluxo Server-Sent Events com cotações dos tickers do usuário e o progresso das suas tarefas.
+# Requer o servidor ASGI (ex: uvicorn dividendos_planner.asgi:application).
+# Endpoint: GET /api/eventos/?tickers=ITUB4,PETR4 (sem o parâmetro, todos os tickers do usuário)
+async def eventos(request):
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'erro': 'O fluxo de eventos exige o servidor ASGI (dividendos_planner.asgi).'},
+            status=501
+        )
+
+    user_id = await sync_to_async(lambda: request.user.id if request.user.is_authenticated else 1)()
+    tickers = await sync_to_async(
+        lambda: sorted(set(Ativo.objects.filter(usuario_id=user_id).values_list('ticker', flat=True)))
+    )()
+
+    filtro = request.GET.get('tickers')
+    if filtro:
+        pedidos = {t.strip().upper() for t in filtro.split(',') if t.strip()}
+        tickers = [t for t in tickers if t in pedidos]
+
+    response = StreamingHttpResponse(fluxo_eventos(user_id, tickers), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Desativa o buffer de proxies (nginx) para os eventos chegarem na hora
+    response['X-Accel-Buffering'] = 'no'
+    return response
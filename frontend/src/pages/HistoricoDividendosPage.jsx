@@ -204,7 +204,7 @@ function HistoricoDividendosPage() {
             </thead>
             <tbody>
               {historico.map((item) => (
-                <tr key={item.id}>
+                <tr key={item.id ?? `${item.ativo}-${item.data_pagamento}-${item.valor_por_acao}`}>
                   <td>
                     <strong>{item.ativo_ticker || item.ativo}</strong>
                     {item.ativo_nome && <div style={{ fontSize: '0.875rem', color: '#666' }}>{item.ativo_nome}</div>}
@@ -213,6 +213,8 @@ function HistoricoDividendosPage() {
                   <td>{formatarMoeda(item.valor_por_acao)}</td>
                   <td>{item.fonte === 'manual' ? 'Manual' : 'API'}</td>
                   <td>
+                    {/* Dividendos da Brapi são compartilhados entre usuários e não podem ser editados */}
+                    {item.editavel !== false && (
                     <div className="d-flex gap-1">
                       <button
                         className="btn btn-secondary btn-sm"
@@ -227,6 +229,7 @@ function HistoricoDividendosPage() {
                         Excluir
                       </button>
                     </div>
+                    )}
                   </td>
                 </tr>
               ))}
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react'
-import { metasRendaAPI, ativosAPI } from '../services/api'
+import { metasRendaAPI, loteAPI } from '../services/api'
 import './SimulacaoPage.css'
 
 function SimulacaoPage() {
@@ -14,29 +14,33 @@ function SimulacaoPage() {
   const [salvarSimulacao, setSalvarSimulacao] = useState(false)
 
   useEffect(() => {
-    carregarMetas()
-    carregarAtivos()
+    carregarDados()
   }, [])
 
-  const carregarMetas = async () => {
+  // Metas e ativos em uma única requisição composta
+  const carregarDados = async () => {
     try {
-      const response = await metasRendaAPI.listar()
-      setMetas(response.data.results || response.data)
+      const response = await loteAPI.executar([
+        { id: 'metas', caminho: '/api/metas-renda/' },
+        { id: 'ativos', caminho: '/api/ativos/' },
+      ], false)
+      const [metasResp, ativosResp] = response.data.respostas
+      if (metasResp.status === 200) {
+        setMetas(metasResp.corpo.results || metasResp.corpo)
+      } else {
+        setError('Erro ao carregar metas. Certifique-se de que o backend está rodando.')
+      }
+      if (ativosResp.status === 200) {
+        setAtivos(ativosResp.corpo.results || ativosResp.corpo)
+      } else {
+        console.error('Erro ao carregar ativos:', ativosResp.corpo)
+      }
     } catch (err) {
       setError('Erro ao carregar metas. Certifique-se de que o backend está rodando.')
       console.error(err)
     }
   }
 
-  const carregarAtivos = async () => {
-    try {
-      const response = await ativosAPI.listar()
-      setAtivos(response.data.results || response.data)
-    } catch (err) {
-      console.error('Erro ao carregar ativos:', err)
-    }
-  }
-
   const handleSimular = async () => {
     if (!metaSelecionada) {
       alert('Selecione uma meta para simular')
@@ -56,19 +60,29 @@ function SimulacaoPage() {
       let yieldCalculado = parseFloat(yieldMedio) || null
       
       if (!yieldCalculado && ativosSelecionados.length > 0) {
-        // Tentar buscar yields reais da Brapi
+        // Tentar buscar yields reais da Brapi (todas as consultas em um lote, feitas em paralelo no backend)
         const yields = []
-        for (const ativoId of ativosSelecionados) {
+        const tickers = ativosSelecionados
+          .map(ativoId => ativos.find(a => a.id === ativoId))
+          .filter(Boolean)
+          .map(ativo => ativo.ticker)
+        if (tickers.length > 0) {
           try {
-            const ativo = ativos.find(a => a.id === ativoId)
-            if (ativo) {
-              const dadosBrapi = await ativosAPI.buscarDadosBrapi(ativo.ticker)
-              if (dadosBrapi.data.yield_anual) {
-                yields.push(dadosBrapi.data.yield_anual)
+            const response = await loteAPI.executar(tickers.map(ticker => ({
+              id: ticker,
+              metodo: 'POST',
+              caminho: '/api/ativos/buscar_dados_brapi/',
+              corpo: { ticker },
+            })), false)
+            for (const resposta of response.data.respostas) {
+              if (resposta.status === 200 && resposta.corpo.yield_anual) {
+                yields.push(resposta.corpo.yield_anual)
+              } else if (resposta.status !== 200) {
+                console.warn(`Erro ao buscar yield de ${resposta.id}:`, resposta.corpo)
               }
             }
           } catch (err) {
-            console.warn(`Erro ao buscar yield de ${ativoId}:`, err)
+            console.warn('Erro ao buscar yields:', err)
           }
         }
         
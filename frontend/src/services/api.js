@@ -47,11 +47,24 @@ export const ativosAPI = {
     return api.get('/ativos/', { params })
   },
   obter: (id) => api.get(`/ativos/${id}/`),
+  // Sincronização incremental: since = cursor da resposta anterior (0 = coleção inteira).
+  // Resposta: { cursor, alterados, removidos }
+  sincronizar: (since = 0) => api.get('/ativos/', { params: { since } }),
   criar: (dados) => api.post('/ativos/', dados),
   atualizar: (id, dados) => api.put(`/ativos/${id}/`, dados),
   deletar: (id) => api.delete(`/ativos/${id}/`),
   buscarDadosBrapi: (ticker) => api.post('/ativos/buscar_dados_brapi/', { ticker }),
   importarDividendosBrapi: (id) => api.post(`/ativos/${id}/importar_dividendos_brapi/`),
+  // Enfileira a importação; acompanhe com jobsAPI.obter(resposta.data.id)
+  importarDividendosBrapiAssincrono: (id) => api.post(`/ativos/${id}/importar_dividendos_brapi/`, null, { params: { assincrono: 1 } }),
+  // Dividendos e yield por janela (ex: ['3m', '1y', '5y', 'ytd']), calculados sobre o histórico local
+  janelas: (id, janelas) => api.get(`/ativos/${id}/janelas/`, { params: janelas ? { janelas: janelas.join(',') } : {} }),
+  // CAGR, regularidade, sequências e volatilidade dos dividendos de todos os ativos (ordenar: ex. '-cagr_5a')
+  indicadores: (ordenar) => api.get('/ativos/analytics/', { params: ordenar ? { ordenar } : {} }),
+  // Operações em lote (atomico = false grava os itens válidos e retorna os erros dos demais)
+  criarEmLote: (itens, atomico = true) => api.post('/ativos/bulk/', itens, { params: { atomico: atomico ? 1 : 0 } }),
+  atualizarEmLote: (itens, atomico = true) => api.patch('/ativos/bulk/', itens, { params: { atomico: atomico ? 1 : 0 } }),
+  deletarEmLote: (ids, atomico = true) => api.delete('/ativos/bulk/', { data: { ids }, params: { atomico: atomico ? 1 : 0 } }),
 }
 
 // ========== HISTÓRICO DE DIVIDENDOS ==========
@@ -64,9 +77,28 @@ export const historicoDividendosAPI = {
     return api.get('/historico-dividendos/', { params })
   },
   obter: (id) => api.get(`/historico-dividendos/${id}/`),
+  // Resposta: { cursor, ativos, alterados, removidos }; descarte as linhas dos ativos listados e aplique alterados
+  sincronizar: (since = 0, filtros = {}) => api.get('/historico-dividendos/', { params: { ...filtros, since } }),
   criar: (dados) => api.post('/historico-dividendos/', dados),
   atualizar: (id, dados) => api.put(`/historico-dividendos/${id}/`, dados),
   deletar: (id) => api.delete(`/historico-dividendos/${id}/`),
+  criarEmLote: (itens, atomico = true) => api.post('/historico-dividendos/bulk/', itens, { params: { atomico: atomico ? 1 : 0 } }),
+  atualizarEmLote: (itens, atomico = true) => api.patch('/historico-dividendos/bulk/', itens, { params: { atomico: atomico ? 1 : 0 } }),
+  deletarEmLote: (ids, atomico = true) => api.delete('/historico-dividendos/bulk/', { data: { ids }, params: { atomico: atomico ? 1 : 0 } }),
+  exportar: (formato = 'csv', filtros = {}) => {
+    const params = { formato }
+    if (filtros.ativo) params.ativo = filtros.ativo
+    if (filtros.data_inicio) params.data_inicio = filtros.data_inicio
+    if (filtros.data_fim) params.data_fim = filtros.data_fim
+    return api.get('/historico-dividendos/exportar/', { params, responseType: 'blob' })
+  },
+  importarArquivo: (arquivo) => {
+    const formData = new FormData()
+    formData.append('arquivo', arquivo)
+    return api.post('/historico-dividendos/importar_arquivo/', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    })
+  },
 }
 
 // ========== METAS DE RENDA ==========
@@ -76,10 +108,23 @@ export const metasRendaAPI = {
     return api.get('/metas-renda/', { params })
   },
   obter: (id) => api.get(`/metas-renda/${id}/`),
+  sincronizar: (since = 0) => api.get('/metas-renda/', { params: { since } }),
   criar: (dados) => api.post('/metas-renda/', dados),
   atualizar: (id, dados) => api.put(`/metas-renda/${id}/`, dados),
   deletar: (id) => api.delete(`/metas-renda/${id}/`),
   simular: (id, dados) => api.post(`/metas-renda/${id}/simular/`, dados),
+  // Enfileira a simulação; acompanhe com jobsAPI.obter(resposta.data.id)
+  simularAssincrono: (id, dados) => api.post(`/metas-renda/${id}/simular/`, dados, { params: { assincrono: 1 } }),
+  // Backtest com preços e dividendos históricos guardados: { ativos_ids, aporte_mensal, data_inicio, data_fim, pesos }
+  backtest: (id, dados) => api.post(`/metas-renda/${id}/backtest/`, dados),
+  // Pesos que minimizam o aporte: { ativos_ids, limite_ativo, limite_setor, limites_setor, aversao_risco, salvar }
+  otimizar: (id, dados) => api.post(`/metas-renda/${id}/otimizar/`, dados),
+}
+
+// ========== CATÁLOGO DE TICKERS ==========
+export const tickersAPI = {
+  autocomplete: (q, limite = 10) => api.get('/tickers/autocomplete/', { params: { q, limite } }),
+  obter: (ticker) => api.get(`/tickers/${ticker}/`),
 }
 
 // ========== SIMULAÇÕES ==========
@@ -93,5 +138,32 @@ export const simulacoesAPI = {
   deletar: (id) => api.delete(`/simulacoes/${id}/`),
 }
 
+// ========== PAINEL ==========
+// Resumo pré-calculado: carteira, renda dos últimos 12 meses, próximos pagamentos e última simulação por meta
+export const dashboardAPI = {
+  obter: () => api.get('/dashboard/'),
+}
+
+// ========== TAREFAS ASSÍNCRONAS ==========
+export const jobsAPI = {
+  listar: () => api.get('/jobs/'),
+  obter: (id) => api.get(`/jobs/${id}/`),
+}
+
+// ========== REQUISIÇÕES COMPOSTAS ==========
+// Várias chamadas em uma única requisição: requisicoes = [{ id, metodo, caminho, parametros, corpo }].
+// Resposta: { respostas: [{ id, status, corpo }], revertido }. Com atomico = true um erro desfaz todas as gravações.
+export const loteAPI = {
+  executar: (requisicoes, atomico = true) => api.post('/batch/', { requisicoes, atomico }),
+}
+
+// ========== EVENTOS EM TEMPO REAL (SSE) ==========
+// Abre o fluxo de cotações e de progresso das tarefas; escute os eventos 'cotacao' e 'tarefa'.
+// Exige o backend rodando em modo ASGI (uvicorn dividendos_planner.asgi:application).
+export const abrirFluxoEventos = (tickers = []) => {
+  const params = tickers.length ? `?tickers=${encodeURIComponent(tickers.join(','))}` : ''
+  return new EventSource(`${API_BASE_URL}/eventos/${params}`, { withCredentials: true })
+}
+
 export default api
 